@@ -0,0 +1,304 @@
+"""Section index of build-log.txt files, with per-section fetching.
+
+A ci-operator build-log.txt is split at its phase, step, build and container
+log markers; the build-log.txt of a step at openshift-install progress
+messages and openshift-tests milestones. Every section records its byte and
+line range, so a single section can be fetched with an HTTP range request
+instead of handing the whole log to the model.
+"""
+
+import re
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+# ci-operator lines start with a level and a timestamp: INFO[2025-07-01T10:00:00Z]
+_CI_OPERATOR = r'^[A-Z]+\[[^\]]*\] '
+
+# Markers starting a new section: (kind, pattern with a "name" group)
+_SECTION_MARKERS = [
+    ("phase", re.compile(_CI_OPERATOR + r'Running multi-stage phase (?P<name>\S+)')),
+    ("test", re.compile(_CI_OPERATOR + r'Running multi-stage test (?P<name>\S+)')),
+    ("step", re.compile(_CI_OPERATOR + r'Running step (?P<name>\S+?)\.?\s*$')),
+    ("build", re.compile(_CI_OPERATOR + r'Building (?P<name>\S+?)\s*$')),
+    ("container", re.compile(_CI_OPERATOR + r'Logs for container (?P<name>\S+ in pod \S+?):?\s*$')),
+    ("install", re.compile(r'msg="(?P<name>Creating infrastructure resources|Waiting up to \S+ (?:\([^)]*\) )?'
+                           r'for [^".]+|Destroying the bootstrap resources|Install complete!)')),
+    ("tests", re.compile(r'^(?P<name>started): \(?\d+/\d+/\d+\)? "')),
+    ("summary", re.compile(r'^(?P<name>Failing tests):')),
+]
+# Results of steps and builds, closing the section of the same name
+_RESULT_MARKER = re.compile(_CI_OPERATOR + r'(?:Step|Build) (?P<name>\S+) (?P<status>succeeded|failed) '
+                            r'after (?P<duration>[^\s.]+(?:\.\d+\w+)?)')
+# Literals of which one is present in every marker line
+_MARKER_LITERALS = (b"Running ", b"Building ", b"Logs for container", b'msg="', b"started: ", b"Failing tests:",
+                    b" succeeded after ", b" failed after ")
+_ERROR_LITERALS = (b"level=error", b"level=fatal", b"ERRO[", b"FATA[")
+
+# Kinds only starting a section at their first marker
+# (openshift-tests prints one started: line per test)
+_SINGLE_SECTION_KINDS = ("tests", "summary")
+
+# Default size of the section text returned by fetch_section_async
+MAX_SECTION_BYTES = 256 * 1024
+# Share of MAX_SECTION_BYTES kept from the start of a section that is too large, the rest comes from its end
+SECTION_HEAD_RATIO = 0.2
+
+# Indexes kept in memory and the age after which they are rebuilt
+MAX_CACHED_INDEXES = 32
+INDEX_MAX_AGE = 300
+# Bytes of a streamed log handed to the indexer thread at once
+INDEX_FEED_BYTES = 4 * 1024 * 1024
+
+
+class BuildLogIndexer:
+    """Builds a section index while a log is fed in arbitrary chunks of bytes."""
+
+    def __init__(self):
+        self.sections: List[Dict[str, Any]] = []
+        self._buffer = b""
+        self._offset = 0
+        self._line = 0
+        self._kinds_seen = set()
+        self._new_section("preamble", "preamble", 0, 1)
+
+    def _new_section(self, kind: str, name: str, offset: int, line: int) -> None:
+        if self.sections:
+            self.sections[-1]["end"] = offset
+            self.sections[-1]["end_line"] = line - 1
+        self.sections.append({
+            "id": len(self.sections),
+            "kind": kind,
+            "name": name,
+            "phase": self._current_phase(),
+            "status": None,
+            "duration": None,
+            "errors": 0,
+            "start": offset,
+            "end": None,
+            "start_line": line,
+            "end_line": None,
+        })
+
+    def _current_phase(self) -> Optional[str]:
+        for section in reversed(self.sections):
+            if section["kind"] == "phase":
+                return section["name"]
+        return None
+
+    def feed(self, data: bytes) -> None:
+        self._buffer += data
+        lines = self._buffer.split(b"\n")
+        self._buffer = lines.pop()
+        for line in lines:
+            self._feed_line(line)
+            self._offset += len(line) + 1
+
+    def close(self) -> List[Dict[str, Any]]:
+        """Process the last, unterminated line and return the sections."""
+        if self._buffer:
+            self._feed_line(self._buffer)
+            self._offset += len(self._buffer)
+            self._buffer = b""
+        self.sections[-1]["end"] = self._offset
+        self.sections[-1]["end_line"] = self._line
+        for section in self.sections:
+            section["size"] = section["end"] - section["start"]
+        # Drop an empty preamble when the log starts with a marker
+        if len(self.sections) > 1 and self.sections[0]["size"] == 0:
+            self.sections.pop(0)
+            for index, section in enumerate(self.sections):
+                section["id"] = index
+        return self.sections
+
+    def _feed_line(self, raw: bytes) -> None:
+        self._line += 1
+        if any(literal in raw for literal in _ERROR_LITERALS):
+            self.sections[-1]["errors"] += 1
+        if not any(literal in raw for literal in _MARKER_LITERALS):
+            return
+        line = raw.decode("utf-8", errors="replace").rstrip("\r")
+
+        match = _RESULT_MARKER.search(line)
+        if match:
+            for section in reversed(self.sections):
+                if section["name"] == match.group("name") and section["kind"] in ("step", "build"):
+                    section["status"] = match.group("status")
+                    section["duration"] = match.group("duration")
+                    break
+            return
+
+        for kind, pattern in _SECTION_MARKERS:
+            match = pattern.match(line)
+            if not match:
+                continue
+            if kind in _SINGLE_SECTION_KINDS:
+                if kind in self._kinds_seen:
+                    return
+                self._kinds_seen.add(kind)
+            self._new_section(kind, match.group("name"), self._offset, self._line)
+            return
+
+
+def index_build_log(data: bytes) -> List[Dict[str, Any]]:
+    """Index a complete log."""
+    indexer = BuildLogIndexer()
+    indexer.feed(data)
+    return indexer.close()
+
+
+def find_section(sections: List[Dict[str, Any]], section: str) -> Optional[Dict[str, Any]]:
+    """Resolve a section id, name (or a substring of it), or "failed".
+
+    "failed" selects the first failed step or build, falling back to the
+    section with the most error lines and then to the last section.
+    """
+    if not sections:
+        return None
+    section = str(section).strip()
+    if section == "failed":
+        failed = [s for s in sections if s["status"] == "failed"]
+        if failed:
+            return failed[0]
+        with_errors = [s for s in sections if s["errors"]]
+        if with_errors:
+            return max(with_errors, key=lambda s: s["errors"])
+        return sections[-1]
+    if section.isdigit():
+        index = int(section)
+        return sections[index] if index < len(sections) else None
+    for candidate in sections:
+        if candidate["name"] == section:
+            return candidate
+    for candidate in sections:
+        if section in candidate["name"]:
+            return candidate
+    return None
+
+
+def section_text(data: bytes, max_bytes: int = MAX_SECTION_BYTES) -> str:
+    """Decode a section, keeping its head and tail when it is larger than max_bytes."""
+    if len(data) <= max_bytes:
+        return data.decode("utf-8", errors="replace")
+    head = int(max_bytes * SECTION_HEAD_RATIO)
+    tail = max_bytes - head
+    omitted = len(data) - head - tail
+    return (data[:head].decode("utf-8", errors="replace")
+            + f"\n... [{omitted} bytes omitted] ...\n"
+            + data[-tail:].decode("utf-8", errors="replace"))
+
+
+def format_sections(sections: List[Dict[str, Any]]) -> str:
+    """Render a section index as a compact table."""
+    lines = []
+    for section in sections:
+        line = f"   [{section['id']}] {section['kind']} {section['name']}"
+        details = []
+        if section["status"]:
+            details.append(section["status"] + (f" after {section['duration']}" if section["duration"] else ""))
+        if section["errors"]:
+            details.append(f"{section['errors']} error lines")
+        details.append(f"lines {section['start_line']}-{section['end_line']}")
+        details.append(f"{section['size']} bytes")
+        lines.append(f"{line} ({', '.join(details)})")
+    return "\n".join(lines) + "\n"
+
+
+_indexes: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_indexes_lock = threading.Lock()
+# Lookups of load_index_async answered from memory or not
+CACHE_STATS = {"hits": 0, "misses": 0}
+
+
+def cache_index(url: str, sections: List[Dict[str, Any]]) -> None:
+    """Remember the index of the log at url, e.g. one built in another process, for later section fetches."""
+    with _indexes_lock:
+        _indexes[url] = {"sections": sections, "time": time.monotonic()}
+        _indexes.move_to_end(url)
+        while len(_indexes) > MAX_CACHED_INDEXES:
+            _indexes.popitem(last=False)
+
+
+def index_log_content(url: str, data: bytes) -> List[Dict[str, Any]]:
+    """Index a log that was already downloaded and remember the index for later section fetches."""
+    sections = index_build_log(data)
+    cache_index(url, sections)
+    return sections
+
+
+async def load_index_async(client: httpx.AsyncClient, url: str,
+                           index: Optional[Callable[[bytes], Awaitable[List[Dict[str, Any]]]]] = None
+                           ) -> List[Dict[str, Any]]:
+    """Return the section index of the log at url, streaming it once if it isn't known yet.
+
+    The log is indexed off the event loop: by index when given (e.g. on a
+    worker process, it gets the whole log), otherwise on a thread fed
+    INDEX_FEED_BYTES at a time as the log streams in. Indexes are rebuilt
+    after INDEX_MAX_AGE seconds since the log of a running job keeps growing.
+    """
+    with _indexes_lock:
+        cached = _indexes.get(url)
+        if cached is not None and time.monotonic() - cached["time"] < INDEX_MAX_AGE:
+            _indexes.move_to_end(url)
+            CACHE_STATS["hits"] += 1
+            return cached["sections"]
+        CACHE_STATS["misses"] += 1
+
+    if index is not None:
+        response = await client.get(url)
+        response.raise_for_status()
+        sections = await index(response.content)
+        cache_index(url, sections)
+        return sections
+
+    indexer = BuildLogIndexer()
+    pending = bytearray()
+    async with client.stream("GET", url) as response:
+        response.raise_for_status()
+        async for chunk in response.aiter_bytes():
+            pending += chunk
+            if len(pending) >= INDEX_FEED_BYTES:
+                await asyncio.to_thread(indexer.feed, bytes(pending))
+                pending.clear()
+    if pending:
+        await asyncio.to_thread(indexer.feed, bytes(pending))
+    sections = await asyncio.to_thread(indexer.close)
+    cache_index(url, sections)
+    return sections
+
+
+async def fetch_section_async(client: httpx.AsyncClient, url: str, section: Dict[str, Any],
+                              max_bytes: int = MAX_SECTION_BYTES) -> str:
+    """Fetch the text of one section with a range request.
+
+    Servers ignoring the range header answer with the whole log, which is
+    then sliced locally.
+    """
+    if section["size"] == 0:
+        return ""
+    if section["size"] > max_bytes:
+        # Only the head and the tail of the section are returned
+        head = int(max_bytes * SECTION_HEAD_RATIO)
+        tail_start = section["end"] - (max_bytes - head)
+        ranges = [(section["start"], section["start"] + head), (tail_start, section["end"])]
+    else:
+        ranges = [(section["start"], section["end"])]
+
+    parts = []
+    for start, end in ranges:
+        response = await client.get(url, headers={"Range": f"bytes={start}-{end - 1}"})
+        response.raise_for_status()
+        if response.status_code == 206:
+            parts.append(response.content)
+        else:
+            parts.append(response.content[start:end])
+    if len(parts) == 1:
+        return section_text(parts[0], max_bytes)
+    omitted = section["size"] - sum(len(part) for part in parts)
+    return (parts[0].decode("utf-8", errors="replace")
+            + f"\n... [{omitted} bytes omitted] ...\n"
+            + parts[1].decode("utf-8", errors="replace"))
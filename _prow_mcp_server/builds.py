@@ -0,0 +1,113 @@
+"""Status rows of many builds of a Prow job, fetched concurrently.
+
+The builds of a job are the numeric directories of its gcsweb listing. A row
+combines the prowjob.json (state, target, start and completion time) and the
+finished.json (result) of a build, both fetched at once and with a bounded
+number of fetches in flight across builds.
+"""
+
+import re
+import asyncio
+from typing import Any, Dict, Iterable, List, Optional
+
+import httpx
+from dateutil.parser import parse as parse_date
+
+# Concurrent fetches of a batch and the number of builds it covers at most
+FETCH_CONCURRENCY = 16
+MAX_BUILDS = 200
+
+_BUILD_HREF = re.compile(r'href="[^"]*?/(\d+)/?"')
+
+
+async def list_build_ids(client: httpx.AsyncClient, job_url: str) -> List[str]:
+    """Build IDs found in the gcsweb listing of a job, oldest first."""
+    response = await client.get(job_url.rstrip("/") + "/")
+    response.raise_for_status()
+    return sorted(set(_BUILD_HREF.findall(response.text)), key=int)
+
+
+def select_build_ids(build_ids: Iterable[str], first: str = "", last: str = "",
+                     count: int = 0) -> List[str]:
+    """The build IDs between first and last (both included, either may be empty), then the count most recent."""
+    selected = [build_id for build_id in build_ids
+                if (not first or int(build_id) >= int(first)) and (not last or int(build_id) <= int(last))]
+    return selected[-count:] if count > 0 else selected
+
+
+async def _fetch_json(client: httpx.AsyncClient, url: str,
+                      headers: Optional[Dict[str, str]] = None) -> Optional[Dict[str, Any]]:
+    """JSON document at url, None when it does not exist."""
+    response = await client.get(url, headers=headers)
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    return response.json()
+
+
+def _target(prowjob: Dict[str, Any]) -> Optional[str]:
+    for container in prowjob.get("spec", {}).get("pod_spec", {}).get("containers", []):
+        for arg in container.get("args", []):
+            if arg.startswith("--target="):
+                return arg[len("--target="):]
+    return None
+
+
+def build_row(build_id: str, prowjob: Optional[Dict[str, Any]], finished: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Compact status of a build from its prowjob.json and finished.json, either may be missing."""
+    prowjob = prowjob or {}
+    status = prowjob.get("status", {})
+    state = status.get("state")
+    if state is None and finished is not None:
+        state = "success" if finished.get("passed") else "failure"
+    started = status.get("startTime")
+    completed = status.get("completionTime")
+    duration = None
+    if started and completed:
+        duration = int((parse_date(completed) - parse_date(started)).total_seconds())
+    return {
+        "build_id": build_id,
+        "state": state or "unknown",
+        "result": (finished or {}).get("result"),
+        "target": _target(prowjob),
+        "started": started,
+        "finished": completed,
+        "duration_seconds": duration,
+    }
+
+
+async def fetch_build_rows(client: httpx.AsyncClient, job_url: str, build_ids: List[str],
+                           concurrency: int = FETCH_CONCURRENCY,
+                           headers: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+    """Rows of the builds in the given order; a build that could not be fetched has an "error"."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(url: str) -> Optional[Dict[str, Any]]:
+        async with semaphore:
+            return await _fetch_json(client, url, headers)
+
+    async def row(build_id: str) -> Dict[str, Any]:
+        base_url = f"{job_url.rstrip('/')}/{build_id}"
+        try:
+            prowjob, finished = await asyncio.gather(fetch(f"{base_url}/prowjob.json"),
+                                                     fetch(f"{base_url}/finished.json"))
+        except Exception as e:
+            return {"build_id": build_id, "state": "unknown", "error": str(e)}
+        if prowjob is None and finished is None:
+            return {"build_id": build_id, "state": "unknown", "error": "No prowjob.json or finished.json"}
+        return build_row(build_id, prowjob, finished)
+
+    return list(await asyncio.gather(*(row(build_id) for build_id in build_ids)))
+
+
+def summarize_rows(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Builds per state and the pass rate of the completed ones."""
+    states: Dict[str, int] = {}
+    for row in rows:
+        states[row["state"]] = states.get(row["state"], 0) + 1
+    completed = states.get("success", 0) + states.get("failure", 0) + states.get("error", 0)
+    return {
+        "builds": len(rows),
+        "states": states,
+        "pass_rate": round(states.get("success", 0) / completed, 3) if completed else None,
+    }
@@ -0,0 +1,243 @@
+"""Local SQLite index of the build history of Prow jobs.
+
+Every build of an indexed job has a row with its state, result, target,
+start and end time and, for failed builds, the first ci-operator step that
+failed (read from artifacts/junit_operator.xml). An update only fetches the
+builds listed after the last indexed one, plus the indexed builds that were
+still running, so trend questions (pass rate, when did it start failing,
+streaks) are answered from the local database instead of build after build
+over the network.
+"""
+
+import os
+import re
+import time
+import asyncio
+import sqlite3
+import tempfile
+import threading
+import xml.etree.ElementTree as ET
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+import builds
+
+DB_PATH = os.environ.get("MCP_JOB_HISTORY_DB",
+                         os.path.join(tempfile.gettempdir(), "prow_mcp_server", "job_history.sqlite"))
+# Builds indexed the first time a job is seen, the most recent ones
+INITIAL_BUILDS = int(os.environ.get("MCP_JOB_HISTORY_INITIAL_BUILDS", "200"))
+
+# States of builds that will not change anymore; the others are fetched again on the next update
+FINAL_STATES = ("success", "failure", "error", "aborted")
+# States counted by pass rates and streaks
+COMPLETED_STATES = ("success", "failure", "error")
+
+# ci-operator testcase of a step: "Run multi-stage test e2e-aws - e2e-aws-ipi-install-install container test"
+_STEP_TESTCASE = re.compile(r' - (?P<step>\S+) container test$')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS builds (
+    job_name TEXT NOT NULL,
+    build_id INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    result TEXT,
+    target TEXT,
+    started TEXT,
+    finished TEXT,
+    duration_seconds INTEGER,
+    failing_step TEXT,
+    indexed_at REAL NOT NULL,
+    PRIMARY KEY (job_name, build_id)
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    job_name TEXT PRIMARY KEY,
+    last_build_id INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+_COLUMNS = ("build_id", "state", "result", "target", "started", "finished", "duration_seconds", "failing_step")
+
+
+class JobHistory:
+    """Build rows of the indexed jobs, stored in a SQLite database."""
+
+    def __init__(self, path: str = DB_PATH):
+        self.path = path
+        self._schema_ready = False
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._schema_ready:
+            with self._lock:
+                if not self._schema_ready:
+                    os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                    with sqlite3.connect(self.path, timeout=30) as connection:
+                        connection.execute("PRAGMA journal_mode=WAL")
+                        connection.executescript(_SCHEMA)
+                    self._schema_ready = True
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def last_build_id(self, job_name: str) -> Optional[int]:
+        with self._connect() as connection:
+            row = connection.execute("SELECT last_build_id FROM jobs WHERE job_name = ?", (job_name,)).fetchone()
+        return row["last_build_id"] if row else None
+
+    def unfinished_build_ids(self, job_name: str) -> List[str]:
+        placeholders = ", ".join("?" * len(FINAL_STATES))
+        with self._connect() as connection:
+            rows = connection.execute(
+                f"SELECT build_id FROM builds WHERE job_name = ? AND state NOT IN ({placeholders})",
+                (job_name, *FINAL_STATES)).fetchall()
+        return [str(row["build_id"]) for row in rows]
+
+    def store(self, job_name: str, rows: List[Dict[str, Any]], last_build_id: Optional[int]) -> None:
+        now = time.time()
+        with self._connect() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO builds (job_name, build_id, state, result, target, started, finished, "
+                "duration_seconds, failing_step, indexed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(job_name, int(row["build_id"]), row["state"], row.get("result"), row.get("target"),
+                  row.get("started"), row.get("finished"), row.get("duration_seconds"), row.get("failing_step"), now)
+                 for row in rows])
+            if last_build_id is not None:
+                connection.execute(
+                    "INSERT INTO jobs (job_name, last_build_id, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(job_name) DO UPDATE SET last_build_id = MAX(last_build_id, excluded.last_build_id), "
+                    "updated_at = excluded.updated_at", (job_name, last_build_id, now))
+
+    def last_passing_build_id(self, job_name: str, before_build_id: str) -> Optional[str]:
+        """The most recent indexed build of a job that passed, among those older than before_build_id."""
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT build_id FROM builds WHERE job_name = ? AND state = 'success' AND build_id < ? "
+                "ORDER BY build_id DESC LIMIT 1", (job_name, int(before_build_id))).fetchone()
+        return str(row["build_id"]) if row else None
+
+    def builds(self, job_name: str, limit: int = 0) -> List[Dict[str, Any]]:
+        """The indexed builds of a job, oldest first, only the limit most recent ones when limit is set."""
+        query = f"SELECT {', '.join(_COLUMNS)} FROM builds WHERE job_name = ? ORDER BY build_id DESC"
+        parameters: tuple = (job_name,)
+        if limit > 0:
+            query += " LIMIT ?"
+            parameters += (limit,)
+        with self._connect() as connection:
+            rows = connection.execute(query, parameters).fetchall()
+        return [{**dict(row), "build_id": str(row["build_id"])} for row in reversed(rows)]
+
+
+HISTORY = JobHistory()
+# One update per job at a time
+_update_locks: Dict[str, asyncio.Lock] = {}
+
+
+async def fetch_failing_step(client: httpx.AsyncClient, build_url: str) -> Optional[str]:
+    """First failed ci-operator step of a build according to its junit_operator.xml, None when unknown."""
+    try:
+        response = await client.get(f"{build_url}/artifacts/junit_operator.xml")
+        if response.status_code != 200:
+            return None
+        root = ET.fromstring(response.content)
+    except (httpx.HTTPError, ET.ParseError):
+        return None
+    failed = [testcase.get("name", "") for testcase in root.iter("testcase") if testcase.find("failure") is not None]
+    for name in failed:
+        match = _STEP_TESTCASE.search(name)
+        if match:
+            return match.group("step")
+    return failed[0] if failed else None
+
+
+async def update_job(client: httpx.AsyncClient, job_url: str, job_name: str, history: JobHistory = HISTORY,
+                     headers: Optional[Dict[str, str]] = None) -> Dict[str, int]:
+    """Index the builds listed after the last indexed one and refresh those that were still running."""
+    lock = _update_locks.setdefault(job_name, asyncio.Lock())
+    async with lock:
+        listed = await builds.list_build_ids(client, job_url)
+        last = history.last_build_id(job_name)
+        new = [build_id for build_id in listed if last is None or int(build_id) > last]
+        if last is None:
+            new = new[-INITIAL_BUILDS:]
+        unfinished = set(history.unfinished_build_ids(job_name)) & set(listed)
+        to_fetch = sorted(set(new) | unfinished, key=int)
+
+        rows = await builds.fetch_build_rows(client, job_url, to_fetch, headers=headers)
+        failed = [row for row in rows if row["state"] in ("failure", "error")]
+        steps = await asyncio.gather(*(fetch_failing_step(client, f"{job_url.rstrip('/')}/{row['build_id']}")
+                                       for row in failed))
+        for row, step in zip(failed, steps):
+            row["failing_step"] = step
+        history.store(job_name, rows, int(new[-1]) if new else None)
+        return {"listed": len(listed), "new": len(new), "refreshed": len(to_fetch) - len(new)}
+
+
+def _compact(row: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if row is None:
+        return None
+    return {key: row[key] for key in ("build_id", "state", "started", "failing_step")}
+
+
+def pass_rate(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    completed = [row for row in rows if row["state"] in COMPLETED_STATES]
+    passed = sum(1 for row in completed if row["state"] == "success")
+    steps: Dict[str, int] = {}
+    for row in completed:
+        if row["state"] != "success" and row.get("failing_step"):
+            steps[row["failing_step"]] = steps.get(row["failing_step"], 0) + 1
+    return {
+        "builds": len(rows),
+        "completed": len(completed),
+        "passed": passed,
+        "pass_rate": round(passed / len(completed), 3) if completed else None,
+        "failing_steps": dict(sorted(steps.items(), key=lambda item: -item[1])),
+    }
+
+
+def streaks(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Runs of consecutive passes and failures among the completed builds."""
+    runs: List[Dict[str, Any]] = []
+    for row in rows:
+        if row["state"] not in COMPLETED_STATES:
+            continue
+        outcome = "pass" if row["state"] == "success" else "fail"
+        if runs and runs[-1]["outcome"] == outcome:
+            runs[-1]["length"] += 1
+            runs[-1]["last_build_id"] = row["build_id"]
+        else:
+            runs.append({"outcome": outcome, "length": 1, "first_build_id": row["build_id"],
+                         "last_build_id": row["build_id"]})
+    longest_failure = max((run for run in runs if run["outcome"] == "fail"), key=lambda run: run["length"],
+                          default=None)
+    completed = sum(run["length"] for run in runs)
+    return {
+        "current": runs[-1] if runs else None,
+        "longest_failure": longest_failure,
+        # Share of consecutive builds with a different outcome, high for flaky jobs
+        "flip_rate": round((len(runs) - 1) / (completed - 1), 3) if completed > 1 else None,
+        "recent": runs[-10:],
+    }
+
+
+def first_failure(rows: List[Dict[str, Any]], step: str = "") -> Dict[str, Any]:
+    """Start of the current run of failures, optionally of failures at a given step, and the last pass before it."""
+    completed = [row for row in rows if row["state"] in COMPLETED_STATES]
+
+    def failing(row: Dict[str, Any]) -> bool:
+        return row["state"] != "success" and (not step or row.get("failing_step") == step)
+
+    if not completed or not failing(completed[-1]):
+        return {"failing": False, "last_build": _compact(completed[-1] if completed else None)}
+    index = len(completed) - 1
+    while index > 0 and failing(completed[index - 1]):
+        index -= 1
+    return {
+        "failing": True,
+        "failing_since": _compact(completed[index]),
+        "failures": len(completed) - index,
+        "last_pass": _compact(next((row for row in reversed(completed[:index]) if row["state"] == "success"), None)),
+        # The run may go back further than the indexed builds
+        "complete": index > 0,
+    }
@@ -0,0 +1,100 @@
+"""Drain templates of a failed build that its last passing build does not explain.
+
+Both logs are mined separately into template sets (template, number of
+chunks, first chunk). A template of the failed build matches a template of
+the baseline when they have the same number of tokens and at least
+MATCH_SIMILARITY of their tokens are equal or a wildcard. Templates without
+a match are new; matched templates whose share of the log grew by
+FREQUENCY_RATIO or more are reported as more frequent.
+
+Template sets of finished builds never change, they are kept in memory so
+that several failed builds are compared to the same baseline without mining
+it again.
+"""
+
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+MATCH_SIMILARITY = 0.7
+FREQUENCY_RATIO = 5.0
+# Chunks a template needs in the failed build to be reported as more frequent
+MIN_COUNT = 3
+# Clusters mined per log, far more than the patterns of get_build_logs
+MAX_CLUSTERS = 2000
+
+MAX_CACHED_TEMPLATE_SETS = 16
+
+_template_sets: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_template_sets_lock = threading.Lock()
+# Lookups of cached_template_set answered from memory or not
+CACHE_STATS = {"hits": 0, "misses": 0}
+
+
+def cached_template_set(url: str) -> Optional[Dict[str, Any]]:
+    with _template_sets_lock:
+        template_set = _template_sets.get(url)
+        if template_set is None:
+            CACHE_STATS["misses"] += 1
+            return None
+        _template_sets.move_to_end(url)
+        CACHE_STATS["hits"] += 1
+        return template_set
+
+
+def cache_template_set(url: str, template_set: Dict[str, Any]) -> None:
+    with _template_sets_lock:
+        _template_sets[url] = template_set
+        _template_sets.move_to_end(url)
+        while len(_template_sets) > MAX_CACHED_TEMPLATE_SETS:
+            _template_sets.popitem(last=False)
+
+
+def diff_template_sets(failed: Dict[str, Any], baseline: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Templates of failed that are new or much more frequent than in baseline, new ones first, in log order.
+
+    The baseline templates are indexed by (number of tokens, position,
+    token), so a failed template is only compared with the templates sharing
+    tokens with it instead of with every baseline template.
+    """
+    wildcard = failed["wildcard"]
+    postings: Dict[Tuple[int, int, str], List[int]] = {}
+    counts: List[int] = []
+    count_by_length: Dict[int, int] = {}
+    for template in baseline["templates"]:
+        tokens = template["template"].split()
+        for position, token in enumerate(tokens):
+            postings.setdefault((len(tokens), position, token), []).append(len(counts))
+        counts.append(template["count"])
+        count_by_length[len(tokens)] = count_by_length.get(len(tokens), 0) + template["count"]
+
+    differences = []
+    for template in failed["templates"]:
+        tokens = template["template"].split()
+        length = len(tokens)
+        required = MATCH_SIMILARITY * length
+        wildcards = sum(1 for token in tokens if token == wildcard)
+        if wildcards >= required:
+            # Matches every baseline template of its length
+            baseline_count = count_by_length.get(length, 0)
+        else:
+            # Positions agreeing with each baseline template: equal tokens or a wildcard on either side
+            agreeing = Counter()
+            for position, token in enumerate(tokens):
+                if token == wildcard:
+                    continue
+                agreeing.update(postings.get((length, position, token), ()))
+                agreeing.update(postings.get((length, position, wildcard), ()))
+            baseline_count = sum(counts[index] for index, agree in agreeing.items()
+                                 if wildcards + agree >= required)
+        if baseline_count == 0:
+            change = "new"
+        else:
+            share = template["count"] / max(failed["chunks"], 1)
+            baseline_share = baseline_count / max(baseline["chunks"], 1)
+            if template["count"] < MIN_COUNT or share < FREQUENCY_RATIO * baseline_share:
+                continue
+            change = "more_frequent"
+        differences.append({**template, "baseline_count": baseline_count, "change": change})
+    differences.sort(key=lambda template: (template["change"] != "new", template["line_number"] or 0))
+    return differences
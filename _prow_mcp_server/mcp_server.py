@@ -1,32 +1,56 @@
 import os
 import asyncio
-from typing import Any, Optional, Dict
+from typing import Any, Optional, Dict, List
 from dateutil.parser import parse as parse_date
 
 from drain import DrainExtractor
+import build_log
+import builds
+import job_history
+import log_diff
+from build_log import cache_index, fetch_section_async, find_section, index_build_log, load_index_async, section_text
+import metrics
+from metrics import http_client, instrument, observe_drain
+from workers import WORKERS, WorkerPoolBusy, analyze_log, mine_templates
+from result_store import DEFAULT_PAGE_BYTES, DEFAULT_PAGE_SIZE, STORE, make_cursor, page_bytes, page_items, resolve_cursor
 
-import httpx
 from mcp.server.fastmcp import FastMCP
+from starlette.requests import Request
+from starlette.responses import Response
 
 mcp = FastMCP("prow-mcp-server")
+metrics.register_cache("build_log_index", build_log.CACHE_STATS)
+metrics.register_cache("result_store", STORE.stats)
+metrics.register_cache("template_set", log_diff.CACHE_STATS)
 
-GCS_URL = "https://gcsweb-ci.apps.ci.l2s4.p1.openshiftapps.com/gcs/test-platform-results/logs"
 
-_drain_extractor: Optional['DrainExtractor'] = None
+@mcp.custom_route("/metrics", methods=["GET"])
+async def metrics_endpoint(request: Request) -> Response:
+    """Prometheus metrics, served next to the MCP endpoint by the sse and streamable-http transports."""
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
 
-async def make_request(
-    url: str, method: str = "GET", data: dict[str, Any] = None
-) -> dict[str, Any] | None:
+# gcsweb base of the job artifacts, GCS_URL points it at a replay server (benchmarks/gcs_replay.py)
+GCS_URL = os.environ.get("GCS_URL", "https://gcsweb-ci.apps.ci.l2s4.p1.openshiftapps.com/gcs/test-platform-results/logs")
+
+# Options of the DrainExtractor built by the workers for every log
+_drain_options: Optional[Dict[str, Any]] = None
+
+def _request_headers() -> dict[str, str]:
     api_key = os.environ.get("API_KEY")
     if api_key:
-        headers = {
+        return {
             "Authorization": f"Bearer {api_key}",
             "Accept": "application/json",
         }
-    else:
-        headers = {}
+    return {}
+
 
-    async with httpx.AsyncClient() as client:
+async def make_request(
+    url: str, method: str = "GET", data: dict[str, Any] = None
+) -> dict[str, Any] | None:
+    headers = _request_headers()
+
+    async with http_client() as client:
         if method.upper() == "GET":
             response = await client.request(method, url, headers=headers, params=data)
         else:
@@ -37,6 +61,7 @@ async def make_request(
 
 
 @mcp.tool()
+@instrument
 async def get_job_metadata(job_name: str, build_id: str) -> dict: 
     """Get the metadata and status for a specific Prow job name and build id.
     
@@ -73,6 +98,101 @@ async def get_job_metadata(job_name: str, build_id: str) -> dict:
     except Exception as e:
         return {"error": f"Failed to fetch job info: {str(e)}"}
 
+@mcp.tool()
+@instrument
+async def get_builds_metadata(job_name: str, build_ids: Optional[List[str]] = None, first_build_id: str = "",
+                              last_build_id: str = "", last_n: int = 0) -> dict:
+    """Get the status of many builds of a job in one call.
+
+    Builds are either listed in build_ids, or taken from the builds of the job
+    between first_build_id and last_build_id (both included, either may be
+    empty), keeping the last_n most recent when last_n is set. Use last_n alone
+    for "the last N builds". At most 200 builds are covered, the most recent ones.
+
+    Args:
+        job_name: The name of the job
+        build_ids: Build IDs to report on
+        first_build_id: Oldest build ID of a range
+        last_build_id: Newest build ID of a range
+        last_n: Number of most recent builds to report on
+
+    Returns:
+        Dictionary with one row per build, oldest first (build_id, state, result, target,
+        started, finished, duration_seconds, or error), and a summary of the states and the
+        pass rate, or error information
+    """
+    job_url = f"{GCS_URL}/{job_name}"
+    try:
+        async with http_client() as client:
+            if build_ids:
+                selected = sorted({str(build_id).strip() for build_id in build_ids if str(build_id).strip().isdigit()},
+                                  key=int)
+            elif first_build_id or last_build_id or last_n > 0:
+                selected = builds.select_build_ids(await builds.list_build_ids(client, job_url),
+                                                   first_build_id, last_build_id, last_n)
+            else:
+                return {"error": "Give build_ids, a range of build IDs or last_n"}
+            truncated = len(selected) > builds.MAX_BUILDS
+            selected = selected[-builds.MAX_BUILDS:]
+            rows = await builds.fetch_build_rows(client, job_url, selected, headers=_request_headers())
+    except Exception as e:
+        return {"error": f"Failed to fetch builds of {job_name}: {str(e)}"}
+    return {"job_name": job_name, "builds": rows, "summary": builds.summarize_rows(rows), "truncated": truncated}
+
+
+JOB_HISTORY_QUERIES = ("summary", "pass_rate", "first_failure", "streaks", "builds")
+
+
+@mcp.tool()
+@instrument
+async def query_job_history(job_name: str, query: str = "summary", limit: int = 100, step: str = "",
+                            refresh: bool = True) -> dict:
+    """Answer trend questions about a job from its local build history index.
+
+    The index is brought up to date first (only builds newer than the last
+    indexed one, and builds that were still running, are fetched), then the
+    question is answered locally.
+
+    Args:
+        job_name: The name of the job
+        query: One of 'summary' (all of the below but the builds), 'pass_rate' (with the
+               most frequent failing steps), 'first_failure' (first build of the current
+               run of failures and the last passing build before it), 'streaks' (current
+               and longest runs, flip rate) or 'builds' (the rows themselves)
+        limit: Number of most recent builds the answer covers
+        step: With first_failure, only count failures at this ci-operator step
+        refresh: Update the index from gcsweb first; False answers from the index as is
+
+    Returns:
+        Dictionary containing the answer and the update counts, or error information
+    """
+    if query not in JOB_HISTORY_QUERIES:
+        return {"error": f"Unknown query '{query}', use one of {', '.join(JOB_HISTORY_QUERIES)}"}
+    update = None
+    if refresh:
+        try:
+            async with http_client() as client:
+                update = await job_history.update_job(client, f"{GCS_URL}/{job_name}", job_name,
+                                                      headers=_request_headers())
+        except Exception as e:
+            return {"error": f"Failed to update the history of {job_name}: {str(e)}"}
+    rows = job_history.HISTORY.builds(job_name, limit)
+    if not rows:
+        return {"error": f"No indexed builds of {job_name}", "update": update}
+
+    answer: Dict[str, Any] = {"job_name": job_name, "update": update,
+                              "first_build_id": rows[0]["build_id"], "last_build_id": rows[-1]["build_id"]}
+    if query in ("summary", "pass_rate"):
+        answer["pass_rate"] = job_history.pass_rate(rows)
+    if query in ("summary", "first_failure"):
+        answer["first_failure"] = job_history.first_failure(rows, step)
+    if query in ("summary", "streaks"):
+        answer["streaks"] = job_history.streaks(rows)
+    if query == "builds":
+        answer["builds"] = rows
+    return answer
+
+
 async def initialize_drain_extractor(verbose: bool = False, context: bool = False, max_clusters: int = 8) -> Dict[str, Any]:
     """Initialize a DrainExtractor instance with specified parameters.
     
@@ -84,9 +204,12 @@ async def initialize_drain_extractor(verbose: bool = False, context: bool = Fals
     Returns:
         Dictionary containing initialization status and configuration
     """
-    global _drain_extractor
+    global _drain_options
     try:
-        _drain_extractor = DrainExtractor(verbose=verbose, context=context, max_clusters=max_clusters)
+        options = {"verbose": verbose, "context": context, "max_clusters": max_clusters}
+        # Fail here on a bad configuration rather than in a worker
+        DrainExtractor(**options)
+        _drain_options = options
         return {
             "status": "success",
             "message": "DrainExtractor initialized successfully",
@@ -102,27 +225,113 @@ async def initialize_drain_extractor(verbose: bool = False, context: bool = Fals
             "message": f"Failed to initialize DrainExtractor: {str(e)}"
         }
 
+async def _template_set(client, log_url: str) -> Dict[str, Any]:
+    """All Drain templates of a build log, mined on a worker unless they are cached."""
+    template_set = log_diff.cached_template_set(log_url)
+    if template_set is None:
+        response = await client.get(log_url)
+        response.raise_for_status()
+        template_set = await WORKERS.run(mine_templates, response.content, log_diff.MAX_CLUSTERS)
+        log_diff.cache_template_set(log_url, template_set)
+    return template_set
+
+
+async def _diff_build_logs(job_name: str, build_id: str, baseline_build_id: str, page_size: int,
+                           owner: tuple) -> dict:
+    """First page of the templates of a build that are new or much more frequent than in the baseline."""
+    async with http_client() as client:
+        if not baseline_build_id:
+            try:
+                await job_history.update_job(client, f"{GCS_URL}/{job_name}", job_name, headers=_request_headers())
+            except Exception as e:
+                return {"error": f"Failed to update the history of {job_name}: {str(e)}"}
+            baseline_build_id = job_history.HISTORY.last_passing_build_id(job_name, build_id)
+            if baseline_build_id is None:
+                return {"error": f"No passing build of {job_name} before {build_id} in its history, "
+                                 f"pass baseline_build_id"}
+        try:
+            failed, baseline = await asyncio.gather(
+                _template_set(client, f"{GCS_URL}/{job_name}/{build_id}/build-log.txt"),
+                _template_set(client, f"{GCS_URL}/{job_name}/{baseline_build_id}/build-log.txt"))
+        except WorkerPoolBusy as e:
+            return {"error": str(e)}
+        except Exception as e:
+            return {"error": f"Failed to fetch logs: {str(e)}"}
+
+    try:
+        # Comparing thousands of templates takes a while, off the event loop too
+        differences = await WORKERS.run(log_diff.diff_template_sets, failed, baseline)
+    except WorkerPoolBusy as e:
+        return {"error": str(e)}
+    result_id = STORE.put(owner, differences)
+    page = page_items(result_id, differences, 0, page_size)
+    return {
+        "build_id": build_id,
+        "job_name": job_name,
+        "baseline_build_id": baseline_build_id,
+        "logs": page["items"],
+        "total_patterns": page["total"],
+        "next_cursor": page["next_cursor"],
+        "templates": len(failed["templates"]),
+        "baseline_templates": len(baseline["templates"]),
+        "artifacts_url": f"{GCS_URL}/{job_name}/{build_id}/artifacts"
+    }
+
+
 @mcp.tool()
-async def get_build_logs(job_name: str, build_id: str) -> dict:
+@instrument
+async def get_build_logs(job_name: str, build_id: str, page_size: int = DEFAULT_PAGE_SIZE, cursor: str = "",
+                         diff: bool = False, baseline_build_id: str = "") -> dict:
     """Get the logs for a specific build ID and job name.
     
+    The Drain patterns of the log are returned page_size at a time. When more
+    are left, "next_cursor" is set: call the tool again with the same job and
+    build and that cursor to get the next page without mining the log again.
+
+    With diff, only the templates of the log that are missing from the log of
+    the last passing build of the job (or baseline_build_id), or much more
+    frequent than there, are returned, with the number of chunks they cover in
+    both logs and the first chunk they match. Most of a failed build's log is
+    also in a passing one; what is left usually shows what went wrong.
+    
     Args:
         job_name: The name of the job
         build_id: The build ID to get logs for
+        page_size: Number of patterns per page
+        cursor: The next_cursor of the previous page, empty for the first page
+        diff: Only return the templates that the baseline build does not explain
+        baseline_build_id: Build to compare with in diff mode, the last passing
+                           build before build_id when empty
         
     Returns:
         Dictionary containing the job logs or error information
     """
-    global _drain_extractor
-    
-    if _drain_extractor is None:
+    owner = ("get_build_logs", job_name, build_id)
+    if cursor:
+        try:
+            result_id, pattern_results, offset, _ = resolve_cursor(cursor, owner)
+        except ValueError as e:
+            return {"error": str(e)}
+        page = page_items(result_id, pattern_results, offset, page_size)
+        return {
+            "build_id": build_id,
+            "job_name": job_name,
+            "logs": page["items"],
+            "offset": page["offset"],
+            "total_patterns": page["total"],
+            "next_cursor": page["next_cursor"]
+        }
+    if diff:
+        return await _diff_build_logs(job_name, build_id, baseline_build_id, page_size, owner)
+
+    if _drain_options is None:
         # Initialize with default settings if not already initialized
         init_result = await initialize_drain_extractor()
         if init_result["status"] == "error":
             return init_result
     
     try:
-        if _drain_extractor is None:
+        if _drain_options is None:
             return {
                 "status": "error",
                 "message": "DrainExtractor not initialized"
@@ -137,24 +346,25 @@ async def get_build_logs(job_name: str, build_id: str) -> dict:
         # Construct the artifacts URL
         artifacts_url = f"{GCS_URL}/{job_name}/{build_id}/artifacts"
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{GCS_URL}/{job_name}/{build_id}/build-log.txt")
+        async with http_client() as client:
+            log_url = f"{GCS_URL}/{job_name}/{build_id}/build-log.txt"
+            response = await client.get(log_url)
             response.raise_for_status()
-            logs = response.text
-            patterns = _drain_extractor(logs)
-        
-        # Convert patterns to a more structured format
-            pattern_results = []
-            for line_number, chunk in patterns:
-                pattern_results.append({
-                    "line_number": line_number,
-                    "chunk": chunk.strip(),
-                    "chunk_length": len(chunk)
-                })
+            # Drain and the section index run on a worker process, the event loop stays free
+            analysis = await WORKERS.run(analyze_log, response.content, _drain_options)
+            observe_drain(analysis["drain_seconds"], len(response.content))
+            sections = analysis["sections"]
+            cache_index(log_url, sections)
+            pattern_results = analysis["patterns"]
+            result_id = STORE.put(owner, pattern_results)
+            page = page_items(result_id, pattern_results, 0, page_size)
             return {
                 "build_id": build_id,
                 "job_name": job_name,
-                "logs": pattern_results,
+                "logs": page["items"],
+                "total_patterns": page["total"],
+                "next_cursor": page["next_cursor"],
+                "sections": sections,
                 "artifacts_url": artifacts_url
             }
     except Exception as e:
@@ -165,7 +375,9 @@ async def get_build_logs(job_name: str, build_id: str) -> dict:
 
 
 @mcp.tool()
-async def get_install_logs(job_name: str, build_id: str, test_name: str):
+@instrument
+async def get_install_logs(job_name: str, build_id: str, test_name: str, page_size: int = DEFAULT_PAGE_BYTES,
+                           cursor: str = ""):
     """Get the install logs for a specific build ID and job name.
     
     This function looks specifically in the installation directories:
@@ -179,10 +391,36 @@ async def get_install_logs(job_name: str, build_id: str, test_name: str):
         job_name: The name of the job
         build_id: The build ID for which to get install logs
         test_name: The name of the test for which to get install logs
+        page_size: Size of a page of log text in bytes
+        cursor: A section_cursor, log_cursor or next_cursor of a previous call, empty for the first call
         
+    Only the section of the log most likely to explain a failure is returned
+    in "logs", along with the index of all sections; use get_build_log_section
+    to fetch the others. A section larger than page_size is shortened to
+    its head and tail. The downloaded log is kept for a while: passing back
+    "section_cursor" pages through the whole section and "log_cursor" through
+    the whole log, page_size bytes at a time, each page giving the
+    "next_cursor" of the following one.
+
     Returns:
         Dictionary containing the job metadata(job_name, build_id, test_name), installation logs or error information
     """
+    owner = ("get_install_logs", job_name, build_id, test_name)
+    if cursor:
+        try:
+            result_id, content, offset, end = resolve_cursor(cursor, owner)
+        except ValueError as e:
+            return {"error": str(e)}
+        page = page_bytes(result_id, content, offset, end, page_size)
+        return {
+            "build_id": build_id,
+            "job_name": job_name,
+            "test_name": test_name,
+            "logs": page["text"],
+            "log_range": {"offset": page["offset"], "end": page["end"], "size": page["size"]},
+            "next_cursor": page["next_cursor"]
+        }
+
     # List of possible installation directory patterns
     install_dirs = [
         "ipi-install-install",
@@ -195,7 +433,7 @@ async def get_install_logs(job_name: str, build_id: str, test_name: str):
     # Try each installation directory pattern
     for install_dir in install_dirs:
         try:
-            async with httpx.AsyncClient() as client:
+            async with http_client() as client:
                 # Try to get finished.json from this installation directory
                 finished_url = f"{artifacts_url}/{test_name}/{install_dir}/finished.json"
                 response = await client.get(finished_url)
@@ -204,12 +442,16 @@ async def get_install_logs(job_name: str, build_id: str, test_name: str):
                 result = json_resp["result"]
                 passed = json_resp["passed"]
 
-            async with httpx.AsyncClient() as client:
+            async with http_client() as client:
                 # Get build-log.txt from the same installation directory
                 log_url = f"{artifacts_url}/{test_name}/{install_dir}/build-log.txt"
                 response = await client.get(log_url)
                 response.raise_for_status()
-                logs = response.text
+                sections = await WORKERS.run(index_build_log, response.content)
+                cache_index(log_url, sections)
+                focus = find_section(sections, "failed")
+                logs = section_text(response.content[focus["start"]:focus["end"]], page_size)
+                result_id = STORE.put(owner, response.content)
                 
                 return {
                     "build_id": build_id,
@@ -219,9 +461,15 @@ async def get_install_logs(job_name: str, build_id: str, test_name: str):
                     "passed": passed,
                     "result": result,
                     "logs": logs,
+                    "log_section": focus,
+                    "section_cursor": make_cursor(result_id, focus["start"], focus["end"]),
+                    "log_cursor": make_cursor(result_id, 0),
+                    "sections": sections,
                     "artifacts_url": artifacts_url,
                     "log_url": log_url
                 }
+        except WorkerPoolBusy as e:
+            return {"error": str(e), "build_id": build_id, "job_name": job_name, "test_name": test_name}
         except Exception as e:
             # Continue to try the next directory pattern
             continue
@@ -238,6 +486,45 @@ async def get_install_logs(job_name: str, build_id: str, test_name: str):
 
 
 
+@mcp.tool()
+@instrument
+async def get_build_log_section(job_name: str, build_id: str, section: str = "failed",
+                                path: str = "build-log.txt") -> dict:
+    """Get a single section of a build log.
+
+    Logs are split into sections at ci-operator phase and step markers,
+    openshift-install progress messages and openshift-tests milestones.
+    Only the requested section is downloaded, with an HTTP range request.
+
+    Args:
+        job_name: The name of the job
+        build_id: The build ID
+        section: Section id, name (or part of it), or "failed" for the failed step
+            or the section with the most errors
+        path: Log path relative to the build, e.g. build-log.txt or
+            artifacts/<test_name>/ipi-install-install/build-log.txt
+
+    Returns:
+        Dictionary containing the section metadata and text, or error information
+        with the list of available sections
+    """
+    log_url = f"{GCS_URL}/{job_name}/{build_id}/{path.lstrip('/')}"
+    try:
+        async with http_client() as client:
+            # The log is indexed on a worker process, the event loop stays free
+            sections = await load_index_async(client, log_url,
+                                              index=lambda data: WORKERS.run(index_build_log, data))
+            found = find_section(sections, section)
+            if found is None:
+                return {"error": f"No section '{section}' in {path}", "sections": sections}
+            text = await fetch_section_async(client, log_url, found)
+        return {"build_id": build_id, "job_name": job_name, "path": path, "section": found, "logs": text}
+    except WorkerPoolBusy as e:
+        return {"error": str(e), "log_url": log_url}
+    except Exception as e:
+        return {"error": f"Failed to fetch log section: {str(e)}", "log_url": log_url}
+
+
 # async def main():
 #     jobname="periodic-ci-openshift-multiarch-master-nightly-4.20-ocp-e2e-gcp-ovn-multi-x-ax"
 #     jobid = "1936114476847730688"  # Replace with actual job name you want to test
@@ -248,4 +535,6 @@ async def get_install_logs(job_name: str, build_id: str, test_name: str):
 
 if __name__ == "__main__":
 #    asyncio.run(main())
+    if os.environ.get("MCP_METRICS_PORT"):
+        metrics.serve_metrics(int(os.environ["MCP_METRICS_PORT"]))
     mcp.run(transport=os.environ.get("MCP_TRANSPORT", "stdio"))
@@ -0,0 +1,335 @@
+"""Prometheus metrics of the MCP server, rendered in the text exposition format.
+
+Tools decorated with instrument() count their requests and results and
+record their latency and in-flight calls. GCS fetches made through
+http_client() count requests and bytes, Drain runs record their time per
+MB, and a background task measures the event loop lag. render() returns
+all metrics, served at /metrics by the HTTP transports and, with
+MCP_METRICS_PORT, on a port of their own for any transport.
+"""
+
+import time
+import asyncio
+import logging
+import threading
+import functools
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import httpx
+
+LOG = logging.getLogger("mcp_metrics")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency buckets in seconds, from a cached metadata lookup to a large log drain
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+DRAIN_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+# How often the event loop lag is sampled in seconds
+LAG_INTERVAL = 0.5
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines += [f"{name}{labels} {_format_value(value)}" for name, labels, value in self.samples()]
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield self.name, _format_labels(self.labelnames, key), value
+
+
+class Gauge(_Metric):
+    """A gauge set directly or, with a collect function, read when rendered."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 collect: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._collect = collect
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def samples(self):
+        if self._collect is not None:
+            values = sorted(self._collect().items())
+        else:
+            with self._lock:
+                values = sorted(self._values.items())
+        for key, value in values:
+            yield self.name, _format_labels(self.labelnames, key), value
+
+
+class CollectedCounter(Gauge):
+    """A counter whose values are read from elsewhere when rendered."""
+
+    kind = "counter"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # Per label values: bucket counts (not cumulative), sum
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * len(self.buckets), [0.0]))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            total[0] += value
+
+    def samples(self):
+        with self._lock:
+            values = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._values.items())
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield (f"{self.name}_bucket",
+                       _format_labels(self.labelnames, key, ("le", _format_value(bound))), cumulative)
+            yield f"{self.name}_sum", _format_labels(self.labelnames, key), total
+            yield f"{self.name}_count", _format_labels(self.labelnames, key), cumulative
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            try:
+                lines += metric.render()
+            except Exception as e:
+                LOG.warning("Could not collect %s: %s", metric.name, e)
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+TOOL_REQUESTS = REGISTRY.register(Counter(
+    "mcp_tool_requests_total", "Tool calls by tool and result (success or error).", ("tool", "result")))
+TOOL_LATENCY = REGISTRY.register(Histogram(
+    "mcp_tool_duration_seconds", "Latency of tool calls.", ("tool",)))
+TOOL_IN_FLIGHT = REGISTRY.register(Gauge(
+    "mcp_tool_in_flight", "Tool calls currently running.", ("tool",)))
+GCS_REQUESTS = REGISTRY.register(Counter(
+    "mcp_gcs_requests_total", "Requests to gcsweb by status code class.", ("status",)))
+GCS_BYTES = REGISTRY.register(Counter(
+    "mcp_gcs_fetched_bytes_total", "Response body bytes fetched from gcsweb."))
+DRAIN_SECONDS = REGISTRY.register(Counter(
+    "mcp_drain_seconds_total", "Time spent mining logs with Drain."))
+DRAIN_BYTES = REGISTRY.register(Counter(
+    "mcp_drain_bytes_total", "Log bytes mined with Drain."))
+DRAIN_SECONDS_PER_MB = REGISTRY.register(Histogram(
+    "mcp_drain_seconds_per_megabyte", "Drain time per MB of log, per run.", buckets=DRAIN_BUCKETS))
+LOOP_LAG = REGISTRY.register(Gauge(
+    "mcp_event_loop_lag_seconds", "Last measured delay of the event loop in running a due callback."))
+LOOP_LAG_HISTOGRAM = REGISTRY.register(Histogram(
+    "mcp_event_loop_lag_histogram_seconds", "Measured delays of the event loop.", buckets=LAG_BUCKETS))
+
+
+def register_cache(name: str, stats: Dict[str, int]) -> None:
+    """Expose the hits and misses counted in stats (a dict with "hits" and "misses" keys) of a cache."""
+    REGISTRY.register(CollectedCounter(
+        f"mcp_{name}_cache_lookups_total", f"Lookups in the {name} cache by result.", ("result",),
+        collect=lambda: {("hit",): stats["hits"], ("miss",): stats["misses"]}))
+
+
+def observe_drain(seconds: float, size: int) -> None:
+    DRAIN_SECONDS.inc(seconds)
+    DRAIN_BYTES.inc(size)
+    if size:
+        DRAIN_SECONDS_PER_MB.observe(seconds / (size / 1024 ** 2))
+
+
+class CountingTransport(httpx.AsyncBaseTransport):
+    """httpx transport counting requests by status class and the body bytes read."""
+
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self._transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        try:
+            response = await self._transport.handle_async_request(request)
+        except Exception:
+            GCS_REQUESTS.inc(status="error")
+            raise
+        GCS_REQUESTS.inc(status=f"{response.status_code // 100}xx")
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_CountingStream(response.stream),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+class _CountingStream(httpx.AsyncByteStream):
+    def __init__(self, stream: httpx.AsyncByteStream):
+        self._stream = stream
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            GCS_BYTES.inc(len(chunk))
+            yield chunk
+
+    async def aclose(self) -> None:
+        await self._stream.aclose()
+
+
+def http_client(**kwargs) -> httpx.AsyncClient:
+    """An httpx.AsyncClient whose requests and bytes are counted."""
+    return httpx.AsyncClient(transport=CountingTransport(), **kwargs)
+
+
+_lag_monitors: Dict[int, asyncio.Task] = {}
+
+
+async def _monitor_event_loop(interval: float) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lag = max(loop.time() - expected, 0.0)
+        LOOP_LAG.set(lag)
+        LOOP_LAG_HISTOGRAM.observe(lag)
+
+
+def ensure_event_loop_monitor(interval: float = LAG_INTERVAL) -> None:
+    """Start measuring the lag of the running event loop, once per loop."""
+    loop = asyncio.get_running_loop()
+    task = _lag_monitors.get(id(loop))
+    if task is None or task.done():
+        _lag_monitors[id(loop)] = loop.create_task(_monitor_event_loop(interval))
+
+
+def instrument(func):
+    """Count the calls, results, latency and concurrency of an async tool.
+
+    Tools report failures as a dict with an "error" key, those count as errors
+    as well as raised exceptions.
+    """
+    tool = func.__name__
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        ensure_event_loop_monitor()
+        TOOL_IN_FLIGHT.inc(tool=tool)
+        start = time.perf_counter()
+        result = "error"
+        try:
+            response = await func(*args, **kwargs)
+            if not (isinstance(response, dict) and "error" in response):
+                result = "success"
+            return response
+        finally:
+            TOOL_LATENCY.observe(time.perf_counter() - start, tool=tool)
+            TOOL_REQUESTS.inc(tool=tool, result=result)
+            TOOL_IN_FLIGHT.dec(tool=tool)
+    return wrapper
+
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_metrics(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Serve /metrics from a daemon thread, independently of the MCP transport."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    LOG.info("Serving metrics on %s:%d/metrics", host, port)
+    return server
@@ -0,0 +1,141 @@
+"""Short-lived store of tool results that clients page through with cursors.
+
+A tool computing a large result (all Drain patterns of a log, a whole install
+log) keeps it here and returns its first page with a cursor. Passing the
+cursor back returns the next page from memory, without downloading or mining
+the log again. Results expire after RESULT_TTL seconds, and the least
+recently used ones are dropped once RESULT_STORE_MAX_BYTES is exceeded; a
+client holding an expired cursor calls the tool again without it.
+
+Cursors are "<result id>.<offset>[.<end>]": an item offset for lists, a byte
+range for logs.
+"""
+
+import os
+import json
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+# Seconds a result stays available after its last page was read
+RESULT_TTL = float(os.environ.get("MCP_RESULT_TTL", "600"))
+# Total size of the results kept in memory
+RESULT_STORE_MAX_BYTES = int(os.environ.get("MCP_RESULT_STORE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Default number of items and of log bytes in a page
+DEFAULT_PAGE_SIZE = 50
+DEFAULT_PAGE_BYTES = 64 * 1024
+# A log page ends at the last line break of its final bytes when there is one
+LINE_ALIGN_BYTES = 4096
+
+Result = Union[bytes, List[Any]]
+
+
+class ResultStore:
+    """Results by id, bounded by age and total size."""
+
+    def __init__(self, ttl: float = RESULT_TTL, max_bytes: int = RESULT_STORE_MAX_BYTES):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Cursor lookups answered from memory or not, see metrics.register_cache
+        self.stats = {"hits": 0, "misses": 0}
+
+    def put(self, owner: Tuple[str, ...], value: Result) -> str:
+        """Keep value for the tool call identified by owner and return its id."""
+        size = len(value) if isinstance(value, bytes) else len(json.dumps(value, default=str))
+        result_id = uuid.uuid4().hex[:16]
+        with self._lock:
+            self._expire(time.monotonic())
+            self._entries[result_id] = {"owner": owner, "value": value, "size": size, "time": time.monotonic()}
+            self.size += size
+            # The new result is kept even when it exceeds the bound on its own
+            while self.size > self.max_bytes and len(self._entries) > 1:
+                _, entry = self._entries.popitem(last=False)
+                self.size -= entry["size"]
+        return result_id
+
+    def get(self, result_id: str, owner: Tuple[str, ...]) -> Optional[Result]:
+        """The result with that id if it is still kept and belongs to owner."""
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(result_id)
+            if entry is None or entry["owner"] != owner:
+                self.stats["misses"] += 1
+                return None
+            entry["time"] = now
+            self._entries.move_to_end(result_id)
+            self.stats["hits"] += 1
+            return entry["value"]
+
+    def _expire(self, now: float) -> None:
+        while self._entries:
+            result_id, entry = next(iter(self._entries.items()))
+            if now - entry["time"] < self.ttl:
+                return
+            del self._entries[result_id]
+            self.size -= entry["size"]
+
+
+STORE = ResultStore()
+
+
+def make_cursor(result_id: str, offset: int, end: Optional[int] = None) -> str:
+    return f"{result_id}.{offset}" if end is None else f"{result_id}.{offset}.{end}"
+
+
+def parse_cursor(cursor: str) -> Tuple[str, int, Optional[int]]:
+    """Split a cursor into its result id, offset and end; ValueError when it is malformed."""
+    parts = cursor.strip().split(".")
+    if len(parts) not in (2, 3) or not parts[0]:
+        raise ValueError(f"Malformed cursor {cursor!r}")
+    offset = int(parts[1])
+    end = int(parts[2]) if len(parts) == 3 else None
+    if offset < 0 or (end is not None and end < offset):
+        raise ValueError(f"Malformed cursor {cursor!r}")
+    return parts[0], offset, end
+
+
+def page_items(result_id: str, items: List[Any], offset: int, page_size: int) -> Dict[str, Any]:
+    """The page of items starting at offset, with the cursor of the next one (None after the last)."""
+    page_size = page_size if page_size > 0 else DEFAULT_PAGE_SIZE
+    end = min(offset + page_size, len(items))
+    return {
+        "items": items[offset:end],
+        "offset": offset,
+        "total": len(items),
+        "next_cursor": make_cursor(result_id, end) if end < len(items) else None,
+    }
+
+
+def page_bytes(result_id: str, data: bytes, offset: int, end: Optional[int], page_size: int) -> Dict[str, Any]:
+    """The page of data[offset:end] starting at offset, cut at a line break when possible."""
+    page_size = page_size if page_size > 0 else DEFAULT_PAGE_BYTES
+    end = len(data) if end is None else min(end, len(data))
+    offset = min(offset, end)
+    stop = min(offset + page_size, end)
+    if stop < end:
+        line_break = data.rfind(b"\n", max(offset, stop - LINE_ALIGN_BYTES), stop)
+        if line_break >= 0:
+            stop = line_break + 1
+    return {
+        "text": data[offset:stop].decode("utf-8", errors="replace"),
+        "offset": offset,
+        "end": stop,
+        "size": len(data),
+        "next_cursor": make_cursor(result_id, stop, end) if stop < end else None,
+    }
+
+
+def resolve_cursor(cursor: str, owner: Tuple[str, ...], store: ResultStore = STORE) -> Tuple[str, Result, int, Optional[int]]:
+    """The result id, stored result, offset and end of a cursor; ValueError when it is malformed or expired."""
+    result_id, offset, end = parse_cursor(cursor)
+    value = store.get(result_id, owner)
+    if value is None:
+        raise ValueError("Cursor expired or unknown, call the tool again without a cursor")
+    return result_id, value, offset, end
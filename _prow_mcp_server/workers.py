@@ -0,0 +1,156 @@
+"""Process pool running the CPU-bound work of the tools off the event loop.
+
+Drain mining and section indexing of a large log take seconds; run on the
+event loop they stall every other request, including cheap metadata
+lookups. They run here on MCP_WORKER_PROCESSES processes instead (the
+number of CPUs by default, 0 runs them on threads). Admission is bounded:
+at most MCP_WORKER_QUEUE jobs wait for a free process, and a job waiting
+longer than MCP_WORKER_QUEUE_TIMEOUT seconds is turned away with
+WorkerPoolBusy. An overloaded server thus answers quickly with an error the
+client can retry, instead of queueing logs in memory without bound.
+"""
+
+import os
+import time
+import asyncio
+import logging
+import concurrent.futures
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+import build_log
+import metrics
+from drain import DrainExtractor, get_chunks
+
+LOG = logging.getLogger("mcp_workers")
+
+WORKER_PROCESSES = int(os.environ.get("MCP_WORKER_PROCESSES", str(os.cpu_count() or 1)))
+# Jobs waiting for a worker at most, and how long one of them waits in seconds
+WORKER_QUEUE = int(os.environ.get("MCP_WORKER_QUEUE", str(2 * max(WORKER_PROCESSES, 1))))
+WORKER_QUEUE_TIMEOUT = float(os.environ.get("MCP_WORKER_QUEUE_TIMEOUT", "30"))
+
+
+class WorkerPoolBusy(RuntimeError):
+    """Raised when a job is not admitted because all workers are busy."""
+
+
+class WorkerPool:
+    """Runs functions on a process pool with a bounded wait queue."""
+
+    def __init__(self, processes: int = WORKER_PROCESSES, queue_size: int = WORKER_QUEUE,
+                 queue_timeout: float = WORKER_QUEUE_TIMEOUT):
+        self.processes = processes
+        self.slots = processes if processes > 0 else (os.cpu_count() or 1)
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.running = 0
+        self.waiting = 0
+        self._executor: Optional[concurrent.futures.Executor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _get_executor(self) -> concurrent.futures.Executor:
+        # Started on first use so that importing the server stays cheap
+        if self._executor is None:
+            if self.processes > 0:
+                self._executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.processes)
+            else:
+                self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.slots)
+        return self._executor
+
+    async def run(self, func: Callable, *args: Any) -> Any:
+        """Run func(*args) on a worker once admitted; WorkerPoolBusy when the queue is full or too slow."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.slots)
+        if self._semaphore.locked() and self.waiting >= self.queue_size:
+            WORKER_JOBS.inc(result="rejected")
+            raise WorkerPoolBusy(f"Server busy: {self.running} jobs running and {self.waiting} waiting, retry later")
+
+        queued = time.perf_counter()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            WORKER_JOBS.inc(result="rejected")
+            raise WorkerPoolBusy(f"Server busy: no worker free within {self.queue_timeout:g} seconds, "
+                                 f"retry later") from None
+        finally:
+            self.waiting -= 1
+        WORKER_QUEUE_SECONDS.observe(time.perf_counter() - queued)
+
+        self.running += 1
+        result = "error"
+        try:
+            executor = self._get_executor()
+            try:
+                value = await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+            except BrokenProcessPool:
+                # A worker died, e.g. killed for its memory; later jobs get a new pool
+                LOG.error("Worker process died, restarting the pool")
+                if self._executor is executor:
+                    self._executor = None
+                    executor.shutdown(wait=False)
+                raise
+            result = "success"
+            return value
+        finally:
+            WORKER_JOBS.inc(result=result)
+            self.running -= 1
+            self._semaphore.release()
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+WORKER_JOBS = metrics.REGISTRY.register(metrics.Counter(
+    "mcp_worker_jobs_total", "CPU-bound jobs by result (success, error or rejected).", ("result",)))
+WORKER_QUEUE_SECONDS = metrics.REGISTRY.register(metrics.Histogram(
+    "mcp_worker_queue_seconds", "Time jobs waited for a free worker."))
+
+WORKERS = WorkerPool()
+
+metrics.REGISTRY.register(metrics.Gauge(
+    "mcp_worker_jobs", "CPU-bound jobs running on a worker or waiting for one.", ("state",),
+    collect=lambda: {("running",): WORKERS.running, ("waiting",): WORKERS.waiting}))
+
+
+# Jobs, run in the worker processes
+
+# Example chunks of mined templates are cut to this many characters
+MAX_EXAMPLE_CHARS = 1000
+
+
+def analyze_log(content: bytes, drain_options: Dict[str, Any]) -> Dict[str, Any]:
+    """Mine the Drain patterns of a log and index its sections.
+
+    A fresh extractor is built for every log so that the patterns only come
+    from this log, whichever worker runs it.
+    """
+    extractor = DrainExtractor(**drain_options)
+    start = time.perf_counter()
+    patterns = extractor(content.decode("utf-8", errors="replace"))
+    drain_seconds = time.perf_counter() - start
+    return {
+        "patterns": [{"line_number": line_number, "chunk": chunk.strip(), "chunk_length": len(chunk)}
+                     for line_number, chunk in patterns],
+        "drain_seconds": drain_seconds,
+        "sections": build_log.index_build_log(content),
+    }
+
+
+def mine_templates(content: bytes, max_clusters: int) -> Dict[str, Any]:
+    """Mine every Drain template of a log with its number of chunks and the chunk that created it."""
+    extractor = DrainExtractor(max_clusters=max_clusters)
+    first_chunks: Dict[int, Any] = {}
+    chunks = 0
+    for line_number, chunk in get_chunks(content.decode("utf-8", errors="replace")):
+        result = extractor.miner.add_log_message(chunk)
+        first_chunks.setdefault(result["cluster_id"], (line_number, chunk))
+        chunks += 1
+    templates = []
+    for cluster in extractor.miner.drain.clusters:
+        line_number, chunk = first_chunks.get(cluster.cluster_id, (None, ""))
+        templates.append({"template": cluster.get_template(), "count": cluster.size,
+                          "line_number": line_number, "chunk": chunk.strip()[:MAX_EXAMPLE_CHARS]})
+    return {"templates": templates, "chunks": chunks, "wildcard": extractor.miner.drain.param_str}
@@ -0,0 +1,134 @@
+"""Benchmark for the line-oriented failed test parser.
+
+Generates large openshift-tests style logs (started:/passed:/failed: lines,
+Ginkgo failure blocks, go test output and the final "Failing tests:" summary)
+and times sub_agents/e2e_test_analyst/failed_tests.py against the previous
+implementation, which ran four re.DOTALL patterns over the whole log.
+
+The previous implementation is quadratic on logs with many unterminated
+"FAIL: " markers, so it only runs on logs up to --legacy-size-mb.
+
+Usage:
+    python benchmarks/failed_tests_benchmark.py [--size-mb 100] [--legacy-size-mb 5] [--output fixture.log]
+"""
+
+import os
+import re
+import sys
+import time
+import random
+import argparse
+from typing import Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "sub_agents", "e2e_test_analyst"))
+
+from failed_tests import extract_failed_tests
+
+
+def legacy_extract_failed_tests(log_content: str) -> List[Dict[str, str]]:
+    """Reference implementation: four DOTALL regexes over the whole log."""
+    failed_tests = []
+    
+    # Common failure patterns in openshift-tests
+    failure_patterns = [
+        r'FAIL: (.*?) \((\d+\.\d+s)\)',  # Standard test failure
+        r'• Failure \[(\d+\.\d+) seconds\]\n(.*?)\n',  # Ginkgo failure
+        r'Test Failed: (.*?) - (.*?)\n',  # Direct test failure
+        r'\[FAILED\] (.*?) \[(\d+\.\d+) seconds\]',  # Another format
+    ]
+    
+    for pattern in failure_patterns:
+        matches = re.findall(pattern, log_content, re.MULTILINE | re.DOTALL)
+        for match in matches:
+            if len(match) >= 2:
+                test_name = match[0].strip() if match[0] else match[1].strip()
+                failed_tests.append({
+                    "test_name": test_name,
+                    "duration": match[1] if len(match) > 1 else "unknown"
+                })
+    
+    return failed_tests
+
+
+TESTS = [
+    "[sig-network] Services should serve endpoints on same port and different protocols [Suite:openshift/conformance/parallel]",
+    "[sig-cli] oc adm must-gather runs successfully [Suite:openshift/conformance/parallel]",
+    "[sig-storage] CSI volumes should mount multiple PV pointing to the same storage [Suite:k8s]",
+    "[sig-arch] Managed cluster should have no crashlooping pods in core namespaces [Suite:openshift/conformance/parallel]",
+    "[sig-node] Pods should be evicted from unready nodes [Suite:openshift/conformance/serial]",
+]
+
+
+def fixture_log(size_bytes: int, rng: random.Random, failure_rate: float = 0.01) -> str:
+    """An openshift-tests log with a mix of all recognized failure formats."""
+    lines: List[str] = []
+    failed: List[str] = []
+    size = 0
+    index = 0
+    while size < size_bytes:
+        index += 1
+        name = f"{rng.choice(TESTS)} #{index % 5000}"
+        block = [f'started: 0/{index}/10000 "{name}"']
+        roll = rng.random()
+        if roll < failure_rate:
+            failed.append(name)
+            block += [
+                "",
+                "• Failure [12.%03d seconds]" % rng.randint(0, 999),
+                name,
+                "/go/src/github.com/openshift/origin/test/extended/util/client.go:123",
+                "",
+                f'failed: (12.3s) 2025-07-01T10:00:00 "{name}"',
+            ]
+        elif roll < 2 * failure_rate:
+            block += [f"--- FAIL: TestHelper{index} ({rng.randint(0, 99)}.{rng.randint(0, 99):02d}s)",
+                      f"    helper_test.go:42: FAIL: expected condition was not met"]
+        else:
+            block += [f"I0701 10:00:00.000000   12345 client.go:{index % 900}] polling for pods in namespace e2e-{index}",
+                      f'passed: (1.{rng.randint(0, 9)}s) 2025-07-01T10:00:00 "{name}"']
+        lines.extend(block)
+        size += sum(len(line) + 1 for line in block)
+    lines += ["", "Failing tests:", ""] + failed + ["", "error: %d fail, %d pass" % (len(failed), index - len(failed))]
+    return "\n".join(lines) + "\n"
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=float, default=100, help="size of the large fixture log")
+    parser.add_argument("--legacy-size-mb", type=float, default=5, help="size of the log both implementations run on")
+    parser.add_argument("--output", help="also write the large fixture log to this file")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    log = fixture_log(int(args.legacy_size_mb * 1024 ** 2), rng)
+    legacy, legacy_seconds = timed(legacy_extract_failed_tests, log)
+    failures, seconds = timed(extract_failed_tests, log)
+    print(f"fixture log ({len(log) / 1024 ** 2:.1f} MB): DOTALL regexes {legacy_seconds:.3f}s "
+          f"({len(legacy)} results, {len({f['test_name'] for f in legacy})} distinct), "
+          f"line parser {seconds:.3f}s ({len(failures)} distinct failures)")
+
+    # Without any "(1.23s)" to stop at, every lazy DOTALL group after a
+    # "FAIL: " marker scans to the end of the log
+    pathological = re.sub(r"\((\d+\.\d+s)\)", r"[\1]", log)
+    _, legacy_seconds = timed(legacy_extract_failed_tests, pathological)
+    _, seconds = timed(extract_failed_tests, pathological)
+    print(f"log with unterminated FAIL markers: DOTALL regexes {legacy_seconds:.3f}s, line parser {seconds:.3f}s")
+
+    log = fixture_log(int(args.size_mb * 1024 ** 2), rng)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(log)
+    failures, seconds = timed(extract_failed_tests, log)
+    print(f"large fixture log ({len(log) / 1024 ** 2:.1f} MB): line parser {seconds:.3f}s "
+          f"({len(log) / 1024 ** 2 / seconds:.0f} MB/s, {len(failures)} distinct failures)")
+
+
+if __name__ == "__main__":
+    main()
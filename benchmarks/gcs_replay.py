@@ -0,0 +1,423 @@
+"""Record Prow artifact trees and replay them through a fake gcsweb and GCS.
+
+record crawls the gcsweb listing of a build and stores every file below
+<fixtures>/<bucket>/<path>, the layout of the bucket itself. serve exposes a
+fixture directory both as gcsweb (HTML directory listings and files under
+/gcs/<bucket>/..., with Range requests) and as the subset of the GCS JSON API
+used by google-cloud-storage to list and download objects. Latency, bandwidth
+and errors can be injected, reproducibly with --seed.
+
+The agents and the MCP server are pointed at the fake with:
+    GCS_URL=http://127.0.0.1:8099/gcs/test-platform-results/logs
+    STORAGE_EMULATOR_HOST=http://127.0.0.1:8099
+
+Usage:
+    python benchmarks/gcs_replay.py record JOB_NAME BUILD_ID [--fixtures benchmarks/fixtures] [--max-file-mb 200]
+    python benchmarks/gcs_replay.py serve [--fixtures benchmarks/fixtures] [--port 8099] \\
+        [--latency 0.05] [--jitter 0.5] [--bandwidth-mbps 50] [--error-rate 0.01] [--reset-rate 0.01]
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import asyncio
+import fnmatch
+import argparse
+import mimetypes
+import threading
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, quote, unquote, urljoin, urlparse
+
+DEFAULT_GCSWEB = "https://gcsweb-ci.apps.ci.l2s4.p1.openshiftapps.com"
+DEFAULT_BUCKET = "test-platform-results"
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+DEFAULT_PORT = 8099
+
+_HREF_PATTERN = re.compile(r'href="([^"]+)"')
+_RANGE_PATTERN = re.compile(r'bytes=(\d*)-(\d*)$')
+# Size of the writes throttled by the bandwidth limit
+CHUNK_SIZE = 64 * 1024
+# Objects per page of the GCS list API
+PAGE_SIZE = 1000
+
+
+# Recording
+
+async def _list_directory(client, url: str) -> Tuple[List[str], List[str]]:
+    response = await client.get(url)
+    response.raise_for_status()
+    base_path = urlparse(url).path
+    directories, files = [], []
+    for href in _HREF_PATTERN.findall(response.text):
+        child = urljoin(url, href)
+        path = urlparse(child).path
+        if not path.startswith(base_path) or len(path) <= len(base_path):
+            continue
+        (directories if path.endswith('/') else files).append(child)
+    return directories, files
+
+
+async def record(job_name: str, build_id: str, fixtures: str, gcsweb: str = DEFAULT_GCSWEB,
+                 bucket: str = DEFAULT_BUCKET, exclude: Optional[List[str]] = None,
+                 max_file_bytes: Optional[int] = None, concurrency: int = 8) -> Dict[str, Any]:
+    """Copy the artifact tree of a build from gcsweb into fixtures/<bucket>/logs/<job>/<build>."""
+    import httpx
+
+    prefix = f"/gcs/{bucket}/"
+    root_url = f"{gcsweb.rstrip('/')}{prefix}logs/{job_name}/{build_id}/"
+    semaphore = asyncio.Semaphore(concurrency)
+    stats = {"files": 0, "bytes": 0, "skipped": []}
+
+    def relative(url: str) -> str:
+        return unquote(urlparse(url).path)[len(prefix):]
+
+    async def fetch(client, url: str) -> None:
+        name = relative(url)
+        if exclude and any(fnmatch.fnmatch(name, pattern) for pattern in exclude):
+            stats["skipped"].append(name)
+            return
+        path = os.path.join(fixtures, bucket, *name.split('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        async with semaphore, client.stream("GET", url) as response:
+            response.raise_for_status()
+            length = int(response.headers.get("content-length") or 0)
+            if max_file_bytes and length > max_file_bytes:
+                stats["skipped"].append(name)
+                return
+            with open(path + ".part", 'wb') as f:
+                async for chunk in response.aiter_bytes():
+                    f.write(chunk)
+        os.replace(path + ".part", path)
+        stats["files"] += 1
+        stats["bytes"] += os.path.getsize(path)
+
+    async def walk(client, url: str) -> None:
+        async with semaphore:
+            directories, files = await _list_directory(client, url)
+        await asyncio.gather(*(walk(client, directory) for directory in directories),
+                             *(fetch(client, file) for file in files))
+
+    async with httpx.AsyncClient(timeout=300.0, follow_redirects=True) as client:
+        await walk(client, root_url)
+    return stats
+
+
+# Replay
+
+class Faults:
+    """Latency, bandwidth and errors injected into every response."""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, bandwidth: Optional[float] = None,
+                 error_rate: float = 0.0, reset_rate: float = 0.0, seed: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.bandwidth = bandwidth or None
+        self.error_rate = error_rate
+        self.reset_rate = reset_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def draw(self) -> Tuple[float, Optional[str]]:
+        """Delay of the next response and the fault to inject in it, if any."""
+        with self._lock:
+            delay = max(self.latency * (1 + self.jitter * (2 * self._random.random() - 1)), 0.0)
+            roll = self._random.random()
+        if roll < self.error_rate:
+            return delay, "error"
+        if roll < self.error_rate + self.reset_rate:
+            return delay, "reset"
+        return delay, None
+
+
+class ReplayServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], fixtures: str, faults: Faults):
+        super().__init__(address, ReplayHandler)
+        self.fixtures = os.path.abspath(fixtures)
+        self.faults = faults
+        self.stats = {"requests": 0, "bytes": 0, "errors": 0, "resets": 0}
+        self._stats_lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def handle_error(self, request, client_address) -> None:
+        # Clients giving up on a slow or faulty response are expected
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def count(self, **increments: int) -> None:
+        with self._stats_lock:
+            for key, value in increments.items():
+                self.stats[key] += value
+
+    def local_path(self, bucket: str, name: str) -> Optional[str]:
+        """Path of an object or prefix in the fixtures, None when it would leave the bucket."""
+        root = os.path.join(self.fixtures, bucket)
+        path = os.path.normpath(os.path.join(root, *[part for part in name.split('/') if part]))
+        if path != root and not path.startswith(root + os.sep):
+            return None
+        return path
+
+    def list_objects(self, bucket: str, prefix: str) -> List[Tuple[str, str]]:
+        """(name, path) of the objects of bucket whose name starts with prefix, sorted by name."""
+        root = os.path.join(self.fixtures, bucket)
+        # Only walk the deepest directory fully covered by the prefix
+        start = self.local_path(bucket, prefix.rsplit('/', 1)[0] if '/' in prefix else "")
+        objects = []
+        if start is None or not os.path.isdir(start):
+            return objects
+        for directory, _, files in os.walk(start):
+            for file in files:
+                path = os.path.join(directory, file)
+                name = os.path.relpath(path, root).replace(os.sep, '/')
+                if name.startswith(prefix):
+                    objects.append((name, path))
+        return sorted(objects)
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    server: ReplayServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        self._handle(send_body=True)
+
+    def do_HEAD(self) -> None:
+        self._handle(send_body=False)
+
+    def _handle(self, send_body: bool) -> None:
+        self.server.count(requests=1)
+        delay, fault = self.server.faults.draw()
+        if delay:
+            time.sleep(delay)
+        if fault == "reset":
+            self.server.count(resets=1)
+            self.close_connection = True
+            self.connection.close()
+            return
+        if fault == "error":
+            self.server.count(errors=1)
+            self._send_bytes(503, b"Injected error\n", "text/plain", send_body)
+            return
+
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        parts = url.path.split('/')
+        # /gcs/<bucket>/<name>: gcsweb
+        if len(parts) >= 3 and parts[1] == "gcs":
+            self._gcsweb(parts[2], unquote('/'.join(parts[3:])), url.path, send_body)
+        # /download/storage/v1/b/<bucket>/o/<object>: object media
+        elif parts[1:5] == ["download", "storage", "v1", "b"] and len(parts) > 7 and parts[6] == "o":
+            self._object_media(parts[5], unquote('/'.join(parts[7:])), send_body)
+        # /storage/v1/b/<bucket>/o[/<object>]: listing or metadata
+        elif parts[1:4] == ["storage", "v1", "b"] and len(parts) > 5 and parts[5] == "o":
+            name = unquote('/'.join(parts[6:]))
+            if name and query.get("alt") == ["media"]:
+                self._object_media(parts[4], name, send_body)
+            elif name:
+                self._object_metadata(parts[4], name, send_body)
+            else:
+                self._list(parts[4], query, send_body)
+        else:
+            self._send_json(404, {"error": {"code": 404, "message": "Not Found"}}, send_body)
+
+    def _gcsweb(self, bucket: str, name: str, request_path: str, send_body: bool) -> None:
+        path = self.server.local_path(bucket, name)
+        if path is not None and os.path.isdir(path):
+            if not request_path.endswith('/'):
+                self.send_response(301)
+                self.send_header("Location", request_path + '/')
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self._send_bytes(200, self._listing(request_path, path).encode("utf-8"), "text/html", send_body)
+        elif path is not None and os.path.isfile(path):
+            self._send_file(path, send_body)
+        else:
+            self._send_bytes(404, b"Not Found\n", "text/plain", send_body)
+
+    @staticmethod
+    def _listing(request_path: str, path: str) -> str:
+        parent = request_path.rstrip('/').rsplit('/', 1)[0] + '/'
+        rows = [f'<li><a href="{escape(parent)}">..</a></li>']
+        for entry in sorted(os.listdir(path)):
+            suffix = '/' if os.path.isdir(os.path.join(path, entry)) else ''
+            href = escape(request_path + quote(entry) + suffix)
+            rows.append(f'<li><a href="{href}">{escape(entry + suffix)}</a></li>')
+        return f"<html><body><h1>{escape(request_path)}</h1><ul>\n" + "\n".join(rows) + "\n</ul></body></html>\n"
+
+    def _metadata(self, bucket: str, name: str, path: str) -> Dict[str, Any]:
+        stat = os.stat(path)
+        return {
+            "kind": "storage#object",
+            "id": f"{bucket}/{name}",
+            "name": name,
+            "bucket": bucket,
+            "size": str(stat.st_size),
+            "contentType": mimetypes.guess_type(name)[0] or "application/octet-stream",
+            "updated": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime(stat.st_mtime)),
+            "mediaLink": f"{self.server.url}/download/storage/v1/b/{bucket}/o/{quote(name, safe='')}?alt=media",
+        }
+
+    def _list(self, bucket: str, query: Dict[str, List[str]], send_body: bool) -> None:
+        prefix = query.get("prefix", [""])[0]
+        page_size = int(query.get("maxResults", [PAGE_SIZE])[0])
+        page_token = query.get("pageToken", [""])[0]
+        objects = [(name, path) for name, path in self.server.list_objects(bucket, prefix) if name > page_token]
+        page = objects[:page_size]
+        body: Dict[str, Any] = {"kind": "storage#objects",
+                                "items": [self._metadata(bucket, name, path) for name, path in page]}
+        if len(objects) > page_size:
+            body["nextPageToken"] = page[-1][0]
+        self._send_json(200, body, send_body)
+
+    def _object_metadata(self, bucket: str, name: str, send_body: bool) -> None:
+        path = self.server.local_path(bucket, name)
+        if path is None or not os.path.isfile(path):
+            self._send_json(404, {"error": {"code": 404, "message": f"No such object: {bucket}/{name}"}}, send_body)
+            return
+        self._send_json(200, self._metadata(bucket, name, path), send_body)
+
+    def _object_media(self, bucket: str, name: str, send_body: bool) -> None:
+        path = self.server.local_path(bucket, name)
+        if path is None or not os.path.isfile(path):
+            self._send_json(404, {"error": {"code": 404, "message": f"No such object: {bucket}/{name}"}}, send_body)
+            return
+        self._send_file(path, send_body)
+
+    def _send_json(self, status: int, body: Dict[str, Any], send_body: bool) -> None:
+        self._send_bytes(status, json.dumps(body).encode("utf-8"), "application/json", send_body)
+
+    def _send_bytes(self, status: int, body: bytes, content_type: str, send_body: bool) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self._write(body)
+
+    def _send_file(self, path: str, send_body: bool) -> None:
+        size = os.path.getsize(path)
+        start, end = 0, size - 1
+        match = _RANGE_PATTERN.match(self.headers.get("Range", "").strip())
+        if match and (match.group(1) or match.group(2)):
+            if match.group(1):
+                start = int(match.group(1))
+                end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+            else:
+                start = max(size - int(match.group(2)), 0)
+            if start > end:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", mimetypes.guess_type(path)[0] or "text/plain")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+        if not send_body:
+            return
+        with open(path, 'rb') as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                self._write(chunk)
+                remaining -= len(chunk)
+
+    def _write(self, data: bytes) -> None:
+        bandwidth = self.server.faults.bandwidth
+        for offset in range(0, len(data), CHUNK_SIZE):
+            chunk = data[offset:offset + CHUNK_SIZE]
+            self.wfile.write(chunk)
+            if bandwidth:
+                time.sleep(len(chunk) / bandwidth)
+        self.server.count(bytes=len(data))
+
+
+def start_server(fixtures: str, faults: Optional[Faults] = None, host: str = "127.0.0.1",
+                 port: int = 0) -> ReplayServer:
+    """Serve fixtures from a daemon thread, port 0 picks a free port."""
+    server = ReplayServer((host, port), fixtures, faults or Faults())
+    threading.Thread(target=server.serve_forever, name="gcs-replay", daemon=True).start()
+    return server
+
+
+def add_fault_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="latency varies by +/- this fraction")
+    parser.add_argument("--bandwidth-mbps", type=float, help="bandwidth of every response in MB/s")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with a 503")
+    parser.add_argument("--reset-rate", type=float, default=0.0, help="fraction of connections closed unanswered")
+    parser.add_argument("--seed", type=int, help="seed of the injected latency and errors")
+
+
+def faults_from_arguments(args: argparse.Namespace) -> Faults:
+    return Faults(args.latency, args.jitter, args.bandwidth_mbps * 1e6 if args.bandwidth_mbps else None,
+                  args.error_rate, args.reset_rate, args.seed)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = commands.add_parser("record", help="copy the artifacts of a build into the fixtures")
+    record_parser.add_argument("job_name")
+    record_parser.add_argument("build_id")
+    record_parser.add_argument("--fixtures", default=DEFAULT_FIXTURES)
+    record_parser.add_argument("--gcsweb", default=DEFAULT_GCSWEB)
+    record_parser.add_argument("--bucket", default=DEFAULT_BUCKET)
+    record_parser.add_argument("--exclude", action="append", help="glob of object names to skip, repeatable")
+    record_parser.add_argument("--max-file-mb", type=float, help="skip files larger than this")
+    record_parser.add_argument("--concurrency", type=int, default=8)
+
+    serve_parser = commands.add_parser("serve", help="serve the fixtures as gcsweb and GCS")
+    serve_parser.add_argument("--fixtures", default=DEFAULT_FIXTURES)
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    add_fault_arguments(serve_parser)
+    args = parser.parse_args()
+
+    if args.command == "record":
+        max_file_bytes = int(args.max_file_mb * 1024 * 1024) if args.max_file_mb else None
+        stats = asyncio.run(record(args.job_name, args.build_id, args.fixtures, args.gcsweb, args.bucket,
+                                   args.exclude, max_file_bytes, args.concurrency))
+        print(f"Recorded {stats['files']} files ({stats['bytes'] / 1024 / 1024:.1f} MB), "
+              f"skipped {len(stats['skipped'])}")
+        for name in stats["skipped"]:
+            print(f"  skipped {name}")
+        return 0
+
+    server = ReplayServer((args.host, args.port), args.fixtures, faults_from_arguments(args))
+    print(f"Serving {server.fixtures} on {server.url}")
+    print(f"  GCS_URL={server.url}/gcs/{DEFAULT_BUCKET}/logs")
+    print(f"  STORAGE_EMULATOR_HOST={server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
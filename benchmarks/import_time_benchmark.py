@@ -0,0 +1,89 @@
+"""Cold import time of the agent packages.
+
+Every module is imported --repeat times in a fresh interpreter with
+-X importtime. The median wall time is reported with the imports taking the
+most time on their own, and the run fails when a module exceeds --budget
+seconds or pulls in one of the --forbid modules, which are only meant to be
+loaded on first use.
+
+Usage:
+    python benchmarks/import_time_benchmark.py [--modules ci_analysis_agent,sub_agents.mustgather_analyst] \\
+        [--repeat 5] [--top 15] [--budget 3.0] [--forbid google.cloud.storage,mcp]
+"""
+
+import os
+import re
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from typing import Any, Dict, List, Tuple
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+DEFAULT_MODULES = ("ci_analysis_agent", "sub_agents.mustgather_analyst",
+                   "sub_agents.e2e_test_analyst", "sub_agents.installation_analyst")
+# Dependencies loaded on first use, importing the agents must not load them
+DEFAULT_FORBIDDEN = ("google.cloud.storage", "mcp", "litellm")
+
+_IMPORTTIME_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+_PROBE = """
+import sys, json, time, importlib
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+seconds = time.perf_counter() - start
+print(json.dumps({"seconds": seconds, "loaded": [name for name in sys.argv[2:] if name in sys.modules]}))
+"""
+
+
+def measure(module: str, forbidden: List[str]) -> Tuple[Dict[str, Any], List[Tuple[int, int, str]]]:
+    """Import module in a fresh interpreter, returning its probe result and (self us, cumulative us, name) of every import."""
+    env = dict(os.environ)
+    env.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [REPO_ROOT, env.get("PYTHONPATH")]))
+    completed = subprocess.run(
+        [sys.executable, "-W", "ignore", "-X", "importtime", "-c", _PROBE, module, *forbidden],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True)
+    imports = []
+    for line in completed.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            imports.append((int(match.group(1)), int(match.group(2)), match.group(4)))
+    return json.loads(completed.stdout.strip().splitlines()[-1]), imports
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure the cold import time of the agent packages.")
+    parser.add_argument("--modules", default=",".join(DEFAULT_MODULES), help="comma separated modules")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="number of slowest imports listed per module")
+    parser.add_argument("--budget", type=float, help="fail when a median import takes longer, in seconds")
+    parser.add_argument("--forbid", default=",".join(DEFAULT_FORBIDDEN),
+                        help="comma separated modules that must not be loaded by the import")
+    args = parser.parse_args()
+    forbidden = [name for name in args.forbid.split(",") if name]
+
+    failed = False
+    for module in args.modules.split(","):
+        runs = [measure(module, forbidden) for _ in range(args.repeat)]
+        median = statistics.median(result["seconds"] for result, _ in runs)
+        # The slowest imports of the median run
+        _, imports = sorted(runs, key=lambda run: run[0]["seconds"])[len(runs) // 2]
+        loaded = sorted({name for result, _ in runs for name in result["loaded"]})
+        print(f"{module}: {median:.3f} s median of {args.repeat}, "
+              f"min {min(result['seconds'] for result, _ in runs):.3f} s, {len(imports)} modules")
+        for self_us, cumulative_us, name in sorted(imports, reverse=True)[:args.top]:
+            print(f"  {self_us / 1e6:8.3f} s self {cumulative_us / 1e6:8.3f} s cumulative  {name}")
+        if loaded:
+            print(f"  FAIL: loads {', '.join(loaded)} at import")
+            failed = True
+        if args.budget is not None and median > args.budget:
+            print(f"  FAIL: over the budget of {args.budget:.3f} s")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,245 @@
+"""Benchmark and golden check for the single-pass installation log extractor.
+
+Compares sub_agents/installation_analyst/install_log.py against the previous
+implementation (one regex search per field, several of them re.DOTALL) on
+randomly generated logs, then times both on a large synthetic build-log.txt.
+
+Usage:
+    python benchmarks/install_log_benchmark.py [--size-mb 50] [--fuzz 2000]
+"""
+
+import os
+import re
+import sys
+import time
+import random
+import argparse
+from typing import Any, Dict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "sub_agents", "installation_analyst"))
+
+from install_log import InstallationInfoExtractor, extract_installation_info
+
+
+def legacy_extract_installation_info(log_content: str) -> Dict[str, Any]:
+    """Reference implementation: one regex search per field over the whole log."""
+    install_info = {
+        "installer_version": None,
+        "installer_commit": None,
+        "release_image": None,
+        "instance_types": {},
+        "install_duration": None,
+        "architecture": None,
+        "cluster_config": {},
+        "install_success": False
+    }
+    
+    # Extract openshift-install version and commit (can be on separate lines)
+    version_patterns = [
+        r'openshift-install v([^\s"]+)',
+        r'"openshift-install v([^\s"]+)"'
+    ]
+    
+    for pattern in version_patterns:
+        version_match = re.search(pattern, log_content)
+        if version_match:
+            install_info["installer_version"] = version_match.group(1)
+            break
+    
+    # Extract commit (separate pattern)
+    commit_patterns = [
+        r'built from commit ([a-f0-9]+)',
+        r'"built from commit ([a-f0-9]+)"'
+    ]
+    
+    for pattern in commit_patterns:
+        commit_match = re.search(pattern, log_content)
+        if commit_match:
+            install_info["installer_commit"] = commit_match.group(1)
+            break
+    
+    # Extract release image
+    release_patterns = [
+        r'Installing from release ([^\s]+)',
+        r'release image "([^"]+)"',
+        r'RELEASE_IMAGE_LATEST for release image "([^"]+)"'
+    ]
+    for pattern in release_patterns:
+        release_match = re.search(pattern, log_content)
+        if release_match:
+            install_info["release_image"] = release_match.group(1)
+            break
+    
+    # Extract instance types from install-config.yaml section
+    # Look for compute and controlPlane sections
+    compute_type_pattern = r'compute:.*?type:\s*([^\s\n]+)'
+    control_type_pattern = r'controlPlane:.*?type:\s*([^\s\n]+)'
+    
+    compute_match = re.search(compute_type_pattern, log_content, re.DOTALL)
+    if compute_match:
+        install_info["instance_types"]["compute"] = compute_match.group(1)
+    
+    control_match = re.search(control_type_pattern, log_content, re.DOTALL)
+    if control_match:
+        install_info["instance_types"]["control_plane"] = control_match.group(1)
+    
+    # Extract architecture
+    arch_pattern = r'architecture:\s*([^\s\n]+)'
+    arch_match = re.search(arch_pattern, log_content)
+    if arch_match:
+        install_info["architecture"] = arch_match.group(1)
+    
+    # Extract cluster configuration details
+    # Replicas
+    compute_replicas_pattern = r'compute:.*?replicas:\s*(\d+)'
+    control_replicas_pattern = r'controlPlane:.*?replicas:\s*(\d+)'
+    
+    compute_replicas_match = re.search(compute_replicas_pattern, log_content, re.DOTALL)
+    if compute_replicas_match:
+        install_info["cluster_config"]["compute_replicas"] = int(compute_replicas_match.group(1))
+    
+    control_replicas_match = re.search(control_replicas_pattern, log_content, re.DOTALL)
+    if control_replicas_match:
+        install_info["cluster_config"]["control_replicas"] = int(control_replicas_match.group(1))
+    
+    # Network type
+    network_pattern = r'networkType:\s*([^\s\n]+)'
+    network_match = re.search(network_pattern, log_content)
+    if network_match:
+        install_info["cluster_config"]["network_type"] = network_match.group(1)
+    
+    # Platform and region
+    platform_pattern = r'platform:\s*([^\s\n]+):'
+    region_pattern = r'region:\s*([^\s\n]+)'
+    
+    platform_match = re.search(platform_pattern, log_content)
+    if platform_match:
+        install_info["cluster_config"]["platform"] = platform_match.group(1)
+    
+    region_match = re.search(region_pattern, log_content)
+    if region_match:
+        install_info["cluster_config"]["region"] = region_match.group(1)
+    
+    # Extract install duration (clean up quotes)
+    duration_patterns = [
+        r'Time elapsed:\s*([^\n"]+)',
+        r'Install complete!.*?Time elapsed:\s*([^\n"]+)'
+    ]
+    
+    for pattern in duration_patterns:
+        duration_match = re.search(pattern, log_content, re.DOTALL)
+        if duration_match:
+            duration = duration_match.group(1).strip().strip('"')
+            install_info["install_duration"] = duration
+            break
+    
+    # Check if installation was successful
+    if "Install complete!" in log_content:
+        install_info["install_success"] = True
+    elif "level=error" in log_content or "FATAL" in log_content:
+        install_info["install_success"] = False
+    
+    return install_info
+
+
+FUZZ_FRAGMENTS = [
+    'openshift-install v4.20.0-0.nightly', '"openshift-install v4.19.1"', 'built from commit 1a2b3c4d',
+    'Installing from release registry.ci/ocp/release:4.20', 'release image "quay.io/ocp@sha256:abc"',
+    'release image "unterminated', 'compute:', 'controlPlane:', 'type:', 'type: m6g.xlarge', 'type:   ',
+    'replicas: 3', 'replicas: x', 'replicas:', '  1', 'architecture: arm64', 'architecture:',
+    'networkType: OVNKubernetes', 'platform: aws:', 'platform: aws', 'platform:', 'aws:', 'region: us-east-1',
+    'region:', 'Time elapsed: 42m47s', 'Time elapsed: "42m"', 'Time elapsed:', '"', 'Install complete!',
+    'level=error msg=boom', 'FATAL failed', 'noise', '', '   ', '\t', 'key: value',
+]
+
+
+def fuzz_log(rng: random.Random) -> str:
+    parts = []
+    for _ in range(rng.randint(0, 25)):
+        parts.append(rng.choice(FUZZ_FRAGMENTS))
+        parts.append(rng.choice(["\n", "\n", "\n", " ", "\n\n", "\n  "]))
+    return "".join(parts)
+
+
+def synthetic_install_log(size_bytes: int, rng: random.Random) -> str:
+    """A build-log.txt with the install-config up front and a long install after it."""
+    head = [
+        'level=info msg="Installing from release registry.build/ci-op/release@sha256:0123abcd"',
+        'level=info msg="openshift-install v4.20.0-0.nightly-multi-2025-07-01"',
+        'level=info msg="built from commit 0123456789abcdef0123456789abcdef01234567"',
+        "compute:",
+        "- architecture: arm64",
+        "  name: worker",
+        "  platform:",
+        "    aws:",
+        "      type: m6g.xlarge",
+        "  replicas: 3",
+        "controlPlane:",
+        "  architecture: arm64",
+        "  platform:",
+        "    aws:",
+        "      type: m6g.2xlarge",
+        "  replicas: 3",
+        "networking:",
+        "  networkType: OVNKubernetes",
+        "platform:",
+        "  aws:",
+        "    region: us-east-2",
+    ]
+    body = []
+    size = sum(len(line) + 1 for line in head)
+    messages = [
+        'Waiting up to 40m0s for the cluster to initialize...',
+        'Cluster operator {op} Progressing is True with Deploying: Working towards 4.20.0',
+        'Still waiting for the cluster to initialize: Multiple errors are preventing progress',
+        'Pod {op}-{n} failed to become ready, retrying in {n}s',
+    ]
+    operators = ["etcd", "kube-apiserver", "ingress", "dns", "network", "machine-config"]
+    minute = 0
+    while size < size_bytes:
+        minute += 1
+        line = 'time="2025-07-01T10:%02d:00Z" level=info msg="%s"' % (
+            minute % 60, rng.choice(messages).format(op=rng.choice(operators), n=rng.randint(1, 999)))
+        body.append(line)
+        size += len(line) + 1
+    tail = ['level=info msg="Install complete!"', 'level=info msg="Time elapsed: 42m47s"']
+    return "\n".join(head + body + tail) + "\n"
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=float, default=50, help="size of the synthetic log")
+    parser.add_argument("--fuzz", type=int, default=2000, help="number of random logs to compare")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    for index in range(args.fuzz):
+        log = fuzz_log(rng)
+        expected = legacy_extract_installation_info(log)
+        actual = extract_installation_info(log)
+        streamed = InstallationInfoExtractor().feed_lines(log.split("\n")).result()
+        if expected != actual or expected != streamed:
+            print(f"MISMATCH on fuzz log {index}:\n{log!r}\nexpected: {expected}\nactual:   {actual}\nstreamed: {streamed}")
+            sys.exit(1)
+    print(f"golden check: {args.fuzz} random logs identical")
+
+    log = synthetic_install_log(int(args.size_mb * 1024 ** 2), rng)
+    for name, content in [("install log", log),
+                          # No "type:"/"replicas:" after the sections: the DOTALL patterns scan to the end
+                          ("install log without instance types", log.replace("type:", "kind:").replace("replicas:", "count:"))]:
+        expected, legacy_seconds = timed(legacy_extract_installation_info, content)
+        actual, seconds = timed(extract_installation_info, content)
+        assert expected == actual, f"{expected} != {actual}"
+        print(f"{name} ({len(content) / 1024 ** 2:.1f} MB): regex {legacy_seconds:.3f}s, "
+              f"single pass {seconds:.3f}s ({legacy_seconds / seconds:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""End-to-end latency and throughput of the triage tools against recorded artifacts.
+
+The tools run unchanged, over HTTP, against benchmarks/gcs_replay.py serving a
+fixture directory, so results are reproducible and need neither gcsweb nor GCS
+credentials. Latency, bandwidth and errors of the fake can be set to model a
+slow or flaky gcsweb. Every tool is called --iterations times with
+--concurrency calls in flight; must-gather downloads go to a fresh workspace
+on every call.
+
+Record a build first:
+    python benchmarks/gcs_replay.py record JOB_NAME BUILD_ID
+
+Usage:
+    python benchmarks/triage_tools_benchmark.py [JOB_NAME BUILD_ID] [--fixtures benchmarks/fixtures] \\
+        [--iterations 10] [--concurrency 4] [--tools get_job_metadata,get_junit_results] \\
+        [--latency 0.05] [--bandwidth-mbps 50] [--error-rate 0.01] [--seed 1]
+"""
+
+import os
+import sys
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from gcs_replay import DEFAULT_BUCKET, DEFAULT_FIXTURES, add_fault_arguments, faults_from_arguments, start_server
+
+TOOLS = ("get_job_metadata", "get_install_logs", "get_e2e_test_logs", "get_junit_results", "get_must_gather")
+
+
+def find_build(fixtures: str) -> Optional[Tuple[str, str]]:
+    """The first recorded (job_name, build_id) of the fixtures."""
+    logs = os.path.join(fixtures, DEFAULT_BUCKET, "logs")
+    if not os.path.isdir(logs):
+        return None
+    for job_name in sorted(os.listdir(logs)):
+        builds = sorted(os.listdir(os.path.join(logs, job_name)))
+        if builds:
+            return job_name, builds[0]
+    return None
+
+
+def find_must_gather_test(fixtures: str, job_name: str, build_id: str) -> Optional[str]:
+    """The step of the build holding a gather-must-gather artifact."""
+    artifacts = os.path.join(fixtures, DEFAULT_BUCKET, "logs", job_name, build_id, "artifacts")
+    if not os.path.isdir(artifacts):
+        return None
+    for test_name in sorted(os.listdir(artifacts)):
+        if os.path.isdir(os.path.join(artifacts, test_name, "gather-must-gather", "artifacts")):
+            return test_name
+    return None
+
+
+def tool_calls(job_name: str, build_id: str, test_name: Optional[str]) -> Dict[str, Callable[[], Awaitable[Any]]]:
+    # Imported once GCS_URL and STORAGE_EMULATOR_HOST point at the replay server
+    from sub_agents.e2e_test_analyst import agent as e2e
+    from sub_agents.installation_analyst import agent as installation
+    from sub_agents.mustgather_analyst.must_gather import get_must_gather
+
+    async def must_gather() -> Any:
+        workspace = tempfile.mkdtemp(prefix="must-gather-benchmark-")
+        try:
+            return await asyncio.to_thread(get_must_gather, job_name, build_id, test_name, workspace)
+        finally:
+            shutil.rmtree(workspace, ignore_errors=True)
+
+    calls = {
+        "get_job_metadata": lambda: e2e.get_job_metadata_async(job_name, build_id),
+        "get_install_logs": lambda: installation.get_install_logs_async(job_name, build_id),
+        "get_e2e_test_logs": lambda: e2e.get_e2e_test_logs_async(job_name, build_id),
+        "get_junit_results": lambda: e2e.get_junit_results_async(job_name, build_id),
+    }
+    if test_name:
+        calls["get_must_gather"] = must_gather
+    return calls
+
+
+def _failed(result: Any) -> bool:
+    return isinstance(result, dict) and (result.get("status") == "error" or "error" in result)
+
+
+async def run_tool(call: Callable[[], Awaitable[Any]], iterations: int, concurrency: int) -> Dict[str, Any]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    failures = 0
+
+    async def one() -> None:
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                result = await call()
+                failures += _failed(result)
+            except Exception:
+                failures += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(iterations)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "calls": iterations,
+        "failures": failures,
+        "mean": sum(latencies) / len(latencies),
+        "p50": latencies[len(latencies) // 2],
+        "p95": latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)],
+        "calls_per_second": iterations / elapsed,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the triage tools against recorded artifacts.")
+    parser.add_argument("job_name", nargs="?")
+    parser.add_argument("build_id", nargs="?")
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES)
+    parser.add_argument("--test-name", help="step holding the must-gather (default: found in the fixtures)")
+    parser.add_argument("--tools", default=",".join(TOOLS), help="comma separated tools to run")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=4)
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    if args.job_name and args.build_id:
+        job_name, build_id = args.job_name, args.build_id
+    else:
+        build = find_build(args.fixtures)
+        if build is None:
+            parser.error(f"no recorded build in {args.fixtures}, see gcs_replay.py record")
+        job_name, build_id = build
+    test_name = args.test_name or find_must_gather_test(args.fixtures, job_name, build_id)
+
+    server = start_server(args.fixtures, faults_from_arguments(args))
+    os.environ["GCS_URL"] = f"{server.url}/gcs/{DEFAULT_BUCKET}/logs"
+    os.environ["STORAGE_EMULATOR_HOST"] = server.url
+    os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+    calls = tool_calls(job_name, build_id, test_name)
+
+    print(f"Build: {job_name}/{build_id}, replayed from {server.url}")
+    print(f"{'tool':<20} {'calls':>6} {'failed':>6} {'mean s':>8} {'p50 s':>8} {'p95 s':>8} {'calls/s':>8}")
+    for name in args.tools.split(","):
+        if name not in calls:
+            print(f"{name:<20} skipped" + (" (no must-gather recorded)" if name == "get_must_gather" else ""))
+            continue
+        before = dict(server.stats)
+        result = asyncio.run(run_tool(calls[name], args.iterations, args.concurrency))
+        served = (server.stats["bytes"] - before["bytes"]) / 1024 / 1024
+        print(f"{name:<20} {result['calls']:>6} {result['failures']:>6} {result['mean']:>8.3f} "
+              f"{result['p50']:>8.3f} {result['p95']:>8.3f} {result['calls_per_second']:>8.2f}"
+              f"  ({server.stats['requests'] - before['requests']} requests, {served:.1f} MB)")
+    server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
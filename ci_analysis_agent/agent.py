@@ -14,16 +14,30 @@
 
 """CI Analysis coordinator: provide root cause analysis for CI failures"""
 
-from google.adk.agents import LlmAgent
+import os
+
+from google.adk.agents import LlmAgent, SequentialAgent
 from google.adk.tools.agent_tool import AgentTool
-from google.adk.models.lite_llm import LiteLlm
 
 from . import prompt
+from .parallel import TimedParallelAgent
+from .triage import (
+    E2E, INSTALLATION, MUSTGATHER, TRIAGE_STATE_KEY, PreTriageAgent, pre_triage_callback,
+    triage_answer_callback,
+)
+from sub_agents.context_packer import DEFAULT_TOKEN_BUDGET, pack_tool_output_callback
+from sub_agents.llm_cache import CachedLiteLlm
+from sub_agents.tracing import configure_tracing
 from sub_agents.installation_analyst import installation_analyst_agent
 from sub_agents.e2e_test_analyst import e2e_test_analyst_agent
 from sub_agents.mustgather_analyst import mustgather_analyst_agent
 
-MODEL = LiteLlm(model="ollama_chat/qwen3:4b")
+# Spans of agents, tools, model calls, fetches and Drain are exported when CI_ANALYSIS_TRACE_FILE is set
+configure_tracing()
+
+MODEL = CachedLiteLlm(model="ollama_chat/qwen3:4b")
+# Budget of a single specialist answer in tokens, larger answers are packed before reaching the model
+TOOL_TOKEN_BUDGET = int(os.environ.get("CI_ANALYSIS_TOOL_TOKEN_BUDGET", DEFAULT_TOKEN_BUDGET))
 
 ci_analysis_advisor = LlmAgent(
     name="ci_analysis_advisor",
@@ -33,6 +47,9 @@ ci_analysis_advisor = LlmAgent(
     ),
     instruction=prompt.CI_ANALYSIS_COORDINATOR_PROMPT,
     output_key="ci_analysis_advisor_output",
+    before_agent_callback=pre_triage_callback,
+    after_tool_callback=pack_tool_output_callback(
+        TOOL_TOKEN_BUDGET, "Call the specialist again with a narrower request to get the details left out."),
     tools=[
         AgentTool(agent=installation_analyst_agent),
         AgentTool(agent=e2e_test_analyst_agent),
@@ -40,4 +57,50 @@ ci_analysis_advisor = LlmAgent(
     ],
 )
 
-root_agent = ci_analysis_advisor 
\ No newline at end of file
+# Parallel mode: a rule-based pre-triage selects the specialists, which then
+# run concurrently, each within its own time budget, and a final agent
+# synthesizes their output_key results
+SPECIALIST_TIMEOUTS = {
+    installation_analyst_agent.name: float(os.environ.get("CI_ANALYSIS_INSTALLATION_TIMEOUT", "300")),
+    e2e_test_analyst_agent.name: float(os.environ.get("CI_ANALYSIS_E2E_TIMEOUT", "600")),
+    mustgather_analyst_agent.name: float(os.environ.get("CI_ANALYSIS_MUSTGATHER_TIMEOUT", "1800")),
+}
+
+ci_analysis_triage = PreTriageAgent(
+    name="ci_analysis_triage",
+    description="Classifies the job from prowjob.json and finished.json and selects the specialists.",
+    specialists={
+        INSTALLATION: installation_analyst_agent.name,
+        E2E: e2e_test_analyst_agent.name,
+        MUSTGATHER: mustgather_analyst_agent.name,
+    },
+    output_keys=[agent.output_key for agent in (installation_analyst_agent, e2e_test_analyst_agent,
+                                                mustgather_analyst_agent)],
+)
+
+ci_analysis_specialists = TimedParallelAgent(
+    name="ci_analysis_specialists",
+    description="Runs the installation, e2e test and must-gather specialists concurrently.",
+    sub_agents=[installation_analyst_agent, e2e_test_analyst_agent, mustgather_analyst_agent],
+    timeouts=SPECIALIST_TIMEOUTS,
+    selection_key=TRIAGE_STATE_KEY,
+)
+
+ci_analysis_synthesizer = LlmAgent(
+    name="ci_analysis_synthesizer",
+    model=MODEL,
+    description="Combines the specialist analyses into a root cause analysis.",
+    instruction=prompt.CI_ANALYSIS_SYNTHESIS_PROMPT,
+    output_key="ci_analysis_advisor_output",
+    before_agent_callback=triage_answer_callback,
+)
+
+ci_analysis_parallel = SequentialAgent(
+    name="ci_analysis_parallel",
+    description="Analyzes CI jobs with all specialists running concurrently.",
+    sub_agents=[ci_analysis_triage, ci_analysis_specialists, ci_analysis_synthesizer],
+)
+
+# CI_ANALYSIS_MODE=parallel selects the concurrent pipeline, the coordinator
+# calling the specialists one after another is the default
+root_agent = ci_analysis_parallel if os.environ.get("CI_ANALYSIS_MODE") == "parallel" else ci_analysis_advisor 
\ No newline at end of file
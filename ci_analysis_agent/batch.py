@@ -0,0 +1,275 @@
+"""Batch triage of many Prow builds.
+
+Builds are read from the command line or a file, one Prow URL (or
+"job_name build_id") per line, and analyzed by the agent with a bounded
+number of builds in flight. Log fetches, Drain mining and model calls are
+bounded separately through sub_agents.limits. Every result is checkpointed
+to the state directory as soon as it is known, so a rerun only analyzes the
+builds not completed yet. A JSON Lines report with one line per build and
+throughput stats are written at the end.
+
+Usage:
+    python -m ci_analysis_agent.batch --file builds.txt --report report.jsonl \\
+        [--concurrency 4] [--fetch-concurrency 16] [--drain-concurrency 4] [--model-concurrency 2]
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import logging
+import argparse
+import tempfile
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from google.adk.agents import BaseAgent
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from sub_agents import limits
+from sub_agents.llm_cache import RESPONSE_CACHE
+from sub_agents.tracing import span, trace_summary
+from .triage import GCS_URL, TRIAGE_STATE_KEY, parse_prow_url
+
+LOG = logging.getLogger("ci_analysis")
+
+APP_NAME = "ci_analysis_batch"
+USER_ID = "batch"
+OUTPUT_KEY = "ci_analysis_advisor_output"
+
+DEFAULT_CONCURRENCY = 4
+# Time budget of the analysis of a single build in seconds
+DEFAULT_BUILD_TIMEOUT = 1800.0
+DEFAULT_STATE_DIR = os.path.join(tempfile.gettempdir(), "ci_analysis_agent", "batch")
+
+DONE = "done"
+ERROR = "error"
+
+
+def parse_builds(lines: Iterable[str]) -> List[Tuple[str, str]]:
+    """Read the (job_name, build_id) of every line, skipping blanks, comments and duplicates."""
+    builds = []
+    seen = set()
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        parsed = parse_prow_url(line)
+        if parsed is None:
+            fields = line.split()
+            if len(fields) != 2 or not fields[1].isdigit():
+                LOG.warning("Skipping unrecognized build %r", line)
+                continue
+            parsed = (fields[0], fields[1])
+        if parsed not in seen:
+            seen.add(parsed)
+            builds.append(parsed)
+    return builds
+
+
+class CheckpointStore:
+    """One JSON file per build below root, written atomically."""
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+
+    def path(self, job_name: str, build_id: str) -> str:
+        return os.path.join(self.root, job_name, f"{build_id}.json")
+
+    def load(self, job_name: str, build_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.path(job_name, build_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, record: Dict[str, Any]) -> None:
+        path = self.path(record["job_name"], record["build_id"])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(record, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+def _final_text(events: List[Any]) -> str:
+    for event in reversed(events):
+        if event.content and event.content.parts and event.is_final_response():
+            text = "".join(part.text for part in event.content.parts if part.text and not part.thought)
+            if text:
+                return text
+    return ""
+
+
+async def analyze_build(runner: InMemoryRunner, job_name: str, build_id: str,
+                        timeout: float = DEFAULT_BUILD_TIMEOUT) -> Dict[str, Any]:
+    """Run the agent on one build in a session of its own."""
+    url = f"{GCS_URL}/{job_name}/{build_id}/"
+    record: Dict[str, Any] = {"job_name": job_name, "build_id": build_id, "url": url}
+    start = time.monotonic()
+    session = await runner.session_service.create_session(
+        app_name=APP_NAME, user_id=USER_ID, session_id=f"{job_name}-{build_id}-{uuid.uuid4().hex[:8]}")
+    message = types.Content(role="user", parts=[types.Part(text=f"Analyze this CI job: {url}")])
+    events = []
+    root = None
+
+    async def run() -> None:
+        async for event in runner.run_async(user_id=USER_ID, session_id=session.id, new_message=message):
+            events.append(event)
+
+    try:
+        with span("batch.build", job_name=job_name, build_id=build_id) as root:
+            await asyncio.wait_for(run(), timeout)
+        session = await runner.session_service.get_session(
+            app_name=APP_NAME, user_id=USER_ID, session_id=session.id)
+        state = session.state if session else {}
+        triage = state.get(TRIAGE_STATE_KEY) or {}
+        record.update(
+            status=DONE,
+            category=triage.get("category"),
+            specialists=triage.get("specialists"),
+            analysis=state.get(OUTPUT_KEY) or _final_text(events),
+        )
+    except asyncio.TimeoutError:
+        record.update(status=ERROR, error=f"Analysis did not finish within {timeout:g} seconds")
+    except Exception as e:
+        LOG.exception("Analysis of %s/%s failed", job_name, build_id)
+        record.update(status=ERROR, error=str(e))
+    finally:
+        await runner.session_service.delete_session(app_name=APP_NAME, user_id=USER_ID, session_id=session.id)
+    record["events"] = len(events)
+    summary = trace_summary(root) if root is not None else None
+    if summary is not None:
+        record["time_sinks"] = summary["top_sinks"]
+    record["duration"] = round(time.monotonic() - start, 3)
+    record["finished_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    return record
+
+
+def _percentile(values: List[float], percentile: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(int(len(values) * percentile), len(values) - 1)]
+
+
+def throughput_stats(records: List[Dict[str, Any]], analyzed: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    """Stats of a run; durations and throughput only cover the builds analyzed by this run."""
+    durations = [record["duration"] for record in analyzed]
+    categories: Dict[str, int] = {}
+    for record in records:
+        category = record.get("category") or record.get("status")
+        categories[category] = categories.get(category, 0) + 1
+    stats = {
+        "builds": len(records),
+        "analyzed": len(analyzed),
+        "resumed": len(records) - len(analyzed),
+        "done": sum(1 for record in records if record.get("status") == DONE),
+        "errors": sum(1 for record in records if record.get("status") == ERROR),
+        "categories": categories,
+        "elapsed_seconds": round(elapsed, 3),
+        "builds_per_minute": round(len(analyzed) * 60 / elapsed, 2) if elapsed > 0 else None,
+        "build_seconds_mean": round(sum(durations) / len(durations), 3) if durations else None,
+        "build_seconds_p50": _percentile(durations, 0.5),
+        "build_seconds_p95": _percentile(durations, 0.95),
+    }
+    if RESPONSE_CACHE is not None:
+        stats["model_cache_hits"] = RESPONSE_CACHE.hits
+        stats["model_cache_misses"] = RESPONSE_CACHE.misses
+    return stats
+
+
+async def run_batch(agent: BaseAgent, builds: List[Tuple[str, str]], store: CheckpointStore,
+                    concurrency: int = DEFAULT_CONCURRENCY, timeout: float = DEFAULT_BUILD_TIMEOUT,
+                    retry_errors: bool = True) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """Analyze the builds not checkpointed yet and return the records of all builds, in input order, with stats."""
+    runner = InMemoryRunner(agent=agent, app_name=APP_NAME)
+    records: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    queue: asyncio.Queue = asyncio.Queue()
+    for job_name, build_id in builds:
+        record = store.load(job_name, build_id)
+        if record is not None and (record.get("status") == DONE or not retry_errors):
+            records[(job_name, build_id)] = record
+        else:
+            queue.put_nowait((job_name, build_id))
+    pending = queue.qsize()
+    LOG.info("%d builds, %d already checkpointed, %d to analyze", len(builds), len(builds) - pending, pending)
+
+    start = time.monotonic()
+    analyzed: List[Dict[str, Any]] = []
+
+    async def worker() -> None:
+        while True:
+            try:
+                job_name, build_id = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            record = await analyze_build(runner, job_name, build_id, timeout)
+            store.save(record)
+            records[(job_name, build_id)] = record
+            analyzed.append(record)
+            LOG.info("[%d/%d] %s/%s %s in %ss", len(analyzed), pending, job_name, build_id,
+                     record.get("category") or record["status"], record["duration"])
+
+    try:
+        await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, pending)))))
+    finally:
+        await runner.close()
+    ordered = [records[build] for build in builds if build in records]
+    return ordered, throughput_stats(ordered, analyzed, time.monotonic() - start)
+
+
+def write_report(path: str, records: List[Dict[str, Any]]) -> None:
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    os.replace(tmp_path, path)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Triage many Prow builds with the CI analysis agent.")
+    parser.add_argument("urls", nargs="*", help="Prow or gcsweb URLs of the builds")
+    parser.add_argument("--file", help="file with one URL or 'job_name build_id' per line, - for stdin")
+    parser.add_argument("--report", default="triage-report.jsonl", help="JSON Lines report written at the end")
+    parser.add_argument("--stats", help="file receiving the throughput stats as JSON (default: stderr only)")
+    parser.add_argument("--state-dir", default=DEFAULT_STATE_DIR, help="checkpoints of the completed builds")
+    parser.add_argument("--mode", choices=("coordinator", "parallel"),
+                        default=os.environ.get("CI_ANALYSIS_MODE") or "coordinator")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="builds analyzed at once")
+    parser.add_argument("--fetch-concurrency", type=int, help="concurrent log and artifact fetching tools")
+    parser.add_argument("--drain-concurrency", type=int, help="concurrent Drain mining tools")
+    parser.add_argument("--model-concurrency", type=int, help="concurrent model calls")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_BUILD_TIMEOUT, help="seconds per build")
+    parser.add_argument("--no-retry-errors", action="store_true", help="keep the checkpointed errors")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO"), format="%(asctime)s %(message)s")
+    lines = list(args.urls)
+    if args.file:
+        with (sys.stdin if args.file == "-" else open(args.file, 'r', encoding='utf-8')) as f:
+            lines.extend(f.read().splitlines())
+    builds = parse_builds(lines)
+    if not builds:
+        parser.error("no builds given")
+
+    limits.configure(fetch=args.fetch_concurrency, drain=args.drain_concurrency, model=args.model_concurrency)
+    from . import agent
+    root = agent.ci_analysis_parallel if args.mode == "parallel" else agent.ci_analysis_advisor
+
+    records, stats = asyncio.run(run_batch(
+        root, builds, CheckpointStore(args.state_dir), args.concurrency, args.timeout, not args.no_retry_errors))
+    write_report(args.report, records)
+    print(json.dumps(stats, indent=2), file=sys.stderr)
+    if args.stats:
+        with open(args.stats, 'w', encoding='utf-8') as f:
+            json.dump(stats, f, indent=2)
+    return 1 if stats["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""Concurrent execution of the specialist agents, each under its own timeout."""
+
+import asyncio
+import logging
+from typing import AsyncGenerator, Dict, List, Optional
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.genai import types
+from pydantic import Field
+
+LOG = logging.getLogger("ci_analysis")
+
+# Default time budget of a specialist in seconds
+DEFAULT_TIMEOUT = 600.0
+
+
+class _Done:
+    """Queue marker put once a specialist finished, failed or timed out."""
+
+
+class TimedParallelAgent(BaseAgent):
+    """Runs its sub-agents concurrently, stopping each one at its own timeout.
+
+    Every sub-agent runs on its own branch, as with ParallelAgent. A sub-agent
+    that times out or raises doesn't affect the others: an event is emitted in
+    its name instead, storing the reason under its output_key so that the
+    agent synthesizing the results knows what is missing.
+    """
+
+    timeouts: Dict[str, float] = Field(default_factory=dict)
+    """Timeout in seconds by sub-agent name."""
+
+    default_timeout: float = DEFAULT_TIMEOUT
+    """Timeout of the sub-agents not listed in timeouts."""
+
+    selection_key: Optional[str] = None
+    """Session state key of a dict whose "agents" list restricts the sub-agents run."""
+
+    def _failure_event(self, ctx: InvocationContext, sub_agent: BaseAgent, message: str) -> Event:
+        output_key = getattr(sub_agent, "output_key", None)
+        return Event(
+            invocation_id=ctx.invocation_id,
+            author=sub_agent.name,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text=message)]),
+            actions=EventActions(state_delta={output_key: message} if output_key else {}),
+        )
+
+    def _selected(self, ctx: InvocationContext) -> List[BaseAgent]:
+        selection = ctx.session.state.get(self.selection_key) if self.selection_key else None
+        if not isinstance(selection, dict) or "agents" not in selection:
+            return list(self.sub_agents)
+        return [sub_agent for sub_agent in self.sub_agents if sub_agent.name in selection["agents"]]
+
+    def _branch_ctx(self, ctx: InvocationContext, sub_agent: BaseAgent) -> InvocationContext:
+        # A branch of its own per sub-agent, named as ParallelAgent names them
+        branch = f"{self.name}.{sub_agent.name}"
+        return ctx.model_copy(update={"branch": f"{ctx.branch}.{branch}" if ctx.branch else branch})
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def run(sub_agent: BaseAgent) -> None:
+            sub_ctx = self._branch_ctx(ctx, sub_agent)
+            timeout = self.timeouts.get(sub_agent.name, self.default_timeout)
+
+            async def forward() -> None:
+                loop = asyncio.get_running_loop()
+                agen = sub_agent.run_async(sub_ctx)
+                try:
+                    async with asyncio.timeout(timeout) as deadline:
+                        async for event in agen:
+                            resume = asyncio.Event()
+                            await queue.put((event, resume))
+                            # Wait until the event was handed on, so that it is part
+                            # of the session before the sub-agent continues. The
+                            # clock stops meanwhile: only the sub-agent's own time counts.
+                            remaining = deadline.when() - loop.time()
+                            deadline.reschedule(None)
+                            await resume.wait()
+                            deadline.reschedule(loop.time() + remaining)
+                finally:
+                    await agen.aclose()
+
+            try:
+                await forward()
+            except TimeoutError:
+                LOG.warning("%s timed out after %ss", sub_agent.name, timeout)
+                await queue.put((self._failure_event(
+                    sub_ctx, sub_agent, f"❌ {sub_agent.name} did not finish within {timeout:g} seconds."), None))
+            except Exception as e:
+                LOG.exception("%s failed", sub_agent.name)
+                await queue.put((self._failure_event(sub_ctx, sub_agent, f"❌ {sub_agent.name} failed: {e}"), None))
+            finally:
+                await queue.put((_Done, None))
+
+        tasks = [asyncio.create_task(run(sub_agent)) for sub_agent in self._selected(ctx)]
+        remaining = len(tasks)
+        try:
+            while remaining:
+                event, resume = await queue.get()
+                if event is _Done:
+                    remaining -= 1
+                    continue
+                yield event
+                if resume is not None:
+                    resume.set()
+        finally:
+            for task in tasks:
+                task.cancel()
+
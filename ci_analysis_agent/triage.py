@@ -0,0 +1,243 @@
+"""Rule-based pre-triage of a Prow job from cheap signals, before any model call.
+
+prowjob.json, finished.json and the finished.json of the installation and e2e
+steps are fetched concurrently. The job is classified from them, and only the
+specialists relevant to that class are run: e2e analysis is skipped when the
+installation failed, and no specialist runs for a job that passed or is still
+running.
+"""
+
+import os
+import re
+import asyncio
+import logging
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
+
+import httpx
+from google.adk.agents import BaseAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.genai import types
+from pydantic import Field
+
+from sub_agents.limits import FETCH, LIMITS
+from sub_agents.tracing import async_client, span
+
+LOG = logging.getLogger("ci_analysis")
+
+# gcsweb base of the job artifacts, GCS_URL points it at a replay server (benchmarks/gcs_replay.py)
+GCS_URL = os.environ.get("GCS_URL", "https://gcsweb-ci.apps.ci.l2s4.p1.openshiftapps.com/gcs/test-platform-results/logs")
+
+# Session state key holding the triage result
+TRIAGE_STATE_KEY = "ci_triage"
+# Session state keys of the triaged job, referenced by the specialist prompts
+JOB_STATE_KEYS = {"job_name": "ci_job_name", "build_id": "ci_build_id", "test_name": "ci_test_name"}
+
+INSTALLATION = "installation"
+E2E = "e2e"
+MUSTGATHER = "mustgather"
+ALL_SPECIALISTS = [INSTALLATION, E2E, MUSTGATHER]
+
+# Same directories as the installation and e2e specialists look at
+INSTALL_DIRS = ("ipi-install-install", "ipi-install-install-stableinitial")
+E2E_DIR = "openshift-e2e-test"
+
+SIGNAL_TIMEOUT = 30.0
+
+_PROW_URL = re.compile(r'/logs/(?P<job_name>[A-Za-z0-9._-]+)/(?P<build_id>\d+)')
+
+
+def parse_prow_url(text: str) -> Optional[Tuple[str, str]]:
+    """Extract the job name and build ID from a Prow or gcsweb URL."""
+    match = _PROW_URL.search(text or "")
+    if not match:
+        return None
+    return match.group("job_name"), match.group("build_id")
+
+
+def _job_short_name(job_name: str) -> str:
+    job_parts = job_name.split('-')
+    if len(job_parts) >= 8:
+        return '-'.join(job_parts[7:])  # Everything after the 7th part
+    return job_name.split('-')[-1]  # Fallback to last part
+
+
+async def _get_json(client: httpx.AsyncClient, url: str) -> Optional[Dict[str, Any]]:
+    try:
+        response = await client.get(url)
+        if response.status_code != 200:
+            return None
+        return response.json()
+    except (httpx.HTTPError, ValueError):
+        return None
+
+
+def _test_name(prowjob: Optional[Dict[str, Any]]) -> Optional[str]:
+    """The --target of the job's test container, the artifacts directory of its steps."""
+    containers = (prowjob or {}).get("spec", {}).get("pod_spec", {}).get("containers") or [{}]
+    for arg in containers[0].get("args", []):
+        if arg.startswith("--target="):
+            return arg[len("--target="):]
+    return None
+
+
+async def collect_signals(job_name: str, build_id: str) -> Dict[str, Any]:
+    """Fetch the job and step results needed by triage(), all in one round trip."""
+    base_url = f"{GCS_URL}/{job_name}/{build_id}"
+    step_url = f"{base_url}/artifacts/{_job_short_name(job_name)}"
+    urls = [f"{base_url}/prowjob.json", f"{base_url}/finished.json", f"{step_url}/{E2E_DIR}/finished.json"]
+    urls += [f"{step_url}/{install_dir}/finished.json" for install_dir in INSTALL_DIRS]
+    async with async_client(timeout=SIGNAL_TIMEOUT) as client:
+        prowjob, finished, e2e_finished, *install_results = await asyncio.gather(
+            *(_get_json(client, url) for url in urls))
+        e2e_log_exists = e2e_finished is not None
+        if not e2e_log_exists:
+            try:
+                async with client.stream("GET", f"{step_url}/{E2E_DIR}/build-log.txt") as response:
+                    e2e_log_exists = response.status_code == 200 and \
+                        not response.headers.get("content-type", "").startswith("text/html")
+            except httpx.HTTPError:
+                pass
+
+    install_finished = next((result for result in install_results if result is not None), None)
+    status = (prowjob or {}).get("status", {})
+    return {
+        "job_name": job_name,
+        "build_id": build_id,
+        "test_name": _test_name(prowjob) or _job_short_name(job_name),
+        "manual_check_url": f"{base_url}/",
+        "state": status.get("state"),
+        "description": status.get("description"),
+        "completed": bool(status.get("completionTime")) or finished is not None,
+        "passed": (finished or {}).get("passed"),
+        "install_passed": (install_finished or {}).get("passed") if install_finished else None,
+        "e2e_passed": (e2e_finished or {}).get("passed") if e2e_finished else None,
+        "e2e_ran": e2e_log_exists,
+    }
+
+
+def triage(signals: Dict[str, Any]) -> Dict[str, Any]:
+    """Classify a job from its signals and pick the specialists worth running.
+
+    Returns:
+        dict: category, reason and the specialists to run (an empty list when
+        the signals alone answer the question).
+    """
+    state = signals.get("state")
+    if state is None and signals.get("passed") is None:
+        return _result("unknown", "No job metadata found, the job name or build ID may be wrong.", ALL_SPECIALISTS)
+    if state in ("pending", "triggered") or not signals.get("completed"):
+        return _result("running", "The job has not finished yet.", [])
+    if state == "success" or signals.get("passed") is True:
+        return _result("passed", "The job passed.", [])
+    if state == "aborted":
+        return _result("aborted", f"The job was aborted: {signals.get('description') or 'no reason given'}.", [])
+    if signals.get("install_passed") is False:
+        return _result("install_failed", "The installation step failed, so the e2e tests never ran.", [INSTALLATION])
+    if signals.get("e2e_passed") is False or (signals.get("e2e_ran") and signals.get("e2e_passed") is None):
+        return _result("e2e_failed", "The installation succeeded and the e2e test step failed.", [E2E, MUSTGATHER])
+    if signals.get("install_passed") is True and not signals.get("e2e_ran"):
+        return _result("other_step_failed", "The installation succeeded but no e2e tests ran; another step failed.",
+                       [INSTALLATION, MUSTGATHER])
+    return _result("failed", "The job failed in a step the signals don't identify.", ALL_SPECIALISTS)
+
+
+def _result(category: str, reason: str, specialists: List[str]) -> Dict[str, Any]:
+    return {"category": category, "reason": reason, "specialists": specialists}
+
+
+async def pre_triage(text: str) -> Dict[str, Any]:
+    """Triage the job referenced by a user message."""
+    parsed = parse_prow_url(text)
+    if parsed is None:
+        return _result("unknown", "No Prow job URL found in the request.", ALL_SPECIALISTS)
+    async with LIMITS[FETCH]:
+        with span("pre_triage.signals", job_name=parsed[0], build_id=parsed[1]):
+            signals = await collect_signals(*parsed)
+    result = triage(signals)
+    result.update(job_name=parsed[0], build_id=parsed[1], signals=signals)
+    return result
+
+
+def format_triage(result: Dict[str, Any]) -> str:
+    """Answer for the jobs that need no specialist."""
+    text = f"Pre-triage: {result['reason']}"
+    if result.get("job_name"):
+        text += f"\nJob: {result['job_name']}\nBuild ID: {result['build_id']}"
+        text += f"\n🔗 Manual check: {result['signals']['manual_check_url']}"
+    return text
+
+
+def _job_state(result: Dict[str, Any]) -> Dict[str, str]:
+    """The JOB_STATE_KEYS of a triage result, empty strings for what is unknown."""
+    signals = result.get("signals") or {}
+    return {key: signals.get(name) or result.get(name) or "" for name, key in JOB_STATE_KEYS.items()}
+
+
+def _user_text(content: Optional[types.Content]) -> str:
+    if content is None or not content.parts:
+        return ""
+    return "\n".join(part.text for part in content.parts if part.text)
+
+
+async def pre_triage_callback(callback_context: CallbackContext) -> Optional[types.Content]:
+    """before_agent_callback of the coordinator storing the triage result in the session state.
+
+    When no specialist is needed the triage answer is returned, which skips
+    the coordinator and its model calls altogether.
+    """
+    try:
+        result = await pre_triage(_user_text(callback_context.user_content))
+    except Exception as e:
+        LOG.warning("Pre-triage failed: %s", e)
+        return None
+    callback_context.state[TRIAGE_STATE_KEY] = result
+    for key, value in _job_state(result).items():
+        callback_context.state[key] = value
+    if result["specialists"]:
+        return None
+    return types.Content(role="model", parts=[types.Part(text=format_triage(result))])
+
+
+def triage_answer_callback(callback_context: CallbackContext) -> Optional[types.Content]:
+    """before_agent_callback answering from the triage result when no specialist was needed."""
+    result = callback_context.state.get(TRIAGE_STATE_KEY)
+    if not isinstance(result, dict) or result.get("specialists"):
+        return None
+    return types.Content(role="model", parts=[types.Part(text=format_triage(result))])
+
+
+class PreTriageAgent(BaseAgent):
+    """Triages the job without a model and selects the specialists to run.
+
+    The result is stored under TRIAGE_STATE_KEY, with the names of the
+    selected agents under "agents", and the job name, build ID and test name
+    under JOB_STATE_KEYS. Agents that follow can use
+    triage_answer_callback to answer directly when no specialist is needed.
+    The output_keys of the specialists are emptied in the same event, so that
+    a specialist that is not selected or times out for this job never leaves
+    the analysis of a previous job of the session behind.
+    """
+
+    specialists: Dict[str, str] = Field(default_factory=dict)
+    """Agent name by specialist (installation, e2e, mustgather)."""
+
+    output_keys: List[str] = Field(default_factory=list)
+    """Session state keys of the specialist results, emptied before every job."""
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        try:
+            result = await pre_triage(_user_text(ctx.user_content))
+        except Exception as e:
+            LOG.warning("Pre-triage failed: %s", e)
+            result = _result("unknown", f"Pre-triage failed: {e}", ALL_SPECIALISTS)
+        result["agents"] = [self.specialists[name] for name in result["specialists"] if name in self.specialists]
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            actions=EventActions(state_delta={
+                **{key: "" for key in self.output_keys}, **_job_state(result), TRIAGE_STATE_KEY: result,
+            }),
+        )
@@ -0,0 +1,259 @@
+"""Fits tool outputs into a token budget before they reach the model.
+
+Text over the budget is split into blocks of lines. Blocks repeating
+content already seen are dropped, the others are ranked by their signal
+(error lines, failed steps, lines whose template is rare in the output) and
+the best ones are kept in their original order until the budget is spent.
+Structured outputs are packed value by value: lists keep their items with
+the most signal, dicts share the budget between their values by size.
+The packed output carries a pointer to the tools returning the full data.
+"""
+
+import re
+import json
+import hashlib
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+LOG = logging.getLogger("ci_analysis")
+
+# Default budget of a single tool output in tokens
+DEFAULT_TOKEN_BUDGET = 4000
+# Rough size of a token in characters, no tokenizer of the served model is available
+CHARS_PER_TOKEN = 4
+# A block ends at a blank line or after this many lines
+MAX_BLOCK_LINES = 20
+
+_ERROR_LINE = re.compile(r'error|fail|fatal|panic|timed? ?out|timeout|denied|refused|exception|unable to|'
+                         r'cannot|crashloop|oomkilled|level=(?:error|fatal)|^E\d{4}', re.IGNORECASE)
+_FAILED_STEP = re.compile(r'(?:Step|Build) \S+ failed after|"failed": true|status: failed|^failed: ')
+# Variable parts of a line, masked to get its template
+_VARIABLE = re.compile(r'0x[0-9a-fA-F]+|[0-9a-fA-F]{8,}|\d+(?:\.\d+)?')
+
+ERROR_WEIGHT = 10.0
+FAILED_STEP_WEIGHT = 25.0
+RARE_TEMPLATE_WEIGHT = 2.0
+
+# Rounds of packing with a lower budget before the serialized output is cut
+MAX_PACK_ATTEMPTS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def line_template(line: str) -> str:
+    return _VARIABLE.sub("<*>", line.strip())
+
+
+def _blocks(lines: List[str]) -> List[List[str]]:
+    blocks: List[List[str]] = []
+    current: List[str] = []
+    for line in lines:
+        current.append(line)
+        if not line.strip() or len(current) >= MAX_BLOCK_LINES:
+            blocks.append(current)
+            current = []
+    if current:
+        blocks.append(current)
+    return blocks
+
+
+def pack_text(text: str, budget: int = DEFAULT_TOKEN_BUDGET, pointer: Optional[str] = None) -> str:
+    """Fit text into budget tokens, keeping its highest-signal blocks.
+
+    The first block (the header of the tool output) is always kept. Text
+    within the budget is returned unchanged.
+    """
+    original_tokens = estimate_tokens(text)
+    if original_tokens <= budget:
+        return text
+
+    blocks = _blocks(text.split("\n"))
+    template_counts: Dict[str, int] = {}
+    for line in text.split("\n"):
+        template = line_template(line)
+        template_counts[template] = template_counts.get(template, 0) + 1
+
+    candidates = []
+    seen = set()
+    duplicates = 0
+    for index, block in enumerate(blocks):
+        key = hashlib.sha1("\n".join(line_template(line) for line in block).encode("utf-8")).digest()
+        if key in seen and any(line.strip() for line in block):
+            duplicates += 1
+            continue
+        seen.add(key)
+        score = 0.0
+        for line in block:
+            if _FAILED_STEP.search(line):
+                score += FAILED_STEP_WEIGHT
+            elif _ERROR_LINE.search(line):
+                score += ERROR_WEIGHT
+            if line.strip():
+                score += RARE_TEMPLATE_WEIGHT / template_counts[line_template(line)]
+        block_text = "\n".join(block)
+        candidates.append((index, score, estimate_tokens(block_text) + 1))
+
+    def footer(kept: int) -> str:
+        return (f"\n[Packed from ~{original_tokens} tokens: {kept} of {len(blocks)} blocks kept, "
+                f"{duplicates} duplicate blocks dropped.{' ' + pointer if pointer else ''}]")
+
+    remaining = budget - estimate_tokens(footer(len(blocks))) - 10
+    selected = set()
+    if candidates:
+        # The header of the output comes first regardless of its score
+        first = candidates[0]
+        selected.add(first[0])
+        remaining -= first[2]
+    for index, score, tokens in sorted(candidates[1:], key=lambda it: it[1] / it[2], reverse=True):
+        if score <= 0 or tokens > remaining:
+            continue
+        selected.add(index)
+        remaining -= tokens
+
+    parts = []
+    omitted = 0
+    for index, block in enumerate(blocks):
+        if index in selected:
+            if omitted:
+                parts.append(f"... [{omitted} lines omitted] ...")
+                omitted = 0
+            parts.append("\n".join(block))
+        else:
+            omitted += len(block)
+    if omitted:
+        parts.append(f"... [{omitted} lines omitted] ...")
+    return "\n".join(parts) + footer(len(selected))
+
+
+def _signal(text: str) -> float:
+    """Signal of a piece of output: its failed steps and error lines."""
+    score = 0.0
+    for line in text.split("\n"):
+        if _FAILED_STEP.search(line):
+            score += FAILED_STEP_WEIGHT
+        elif _ERROR_LINE.search(line):
+            score += ERROR_WEIGHT
+    return score
+
+
+def _value_tokens(value: Any) -> int:
+    return estimate_tokens(value if isinstance(value, str) else json.dumps(value, default=str))
+
+
+def _pack_list(items: List[Any], budget: int) -> Tuple[List[Any], int]:
+    """Keep the items with the most signal per token, in their original order, and the number omitted.
+
+    Items without signal are kept in order, lists sorted by rank thus keep
+    their best entries. An item too large for a share of the budget is packed itself.
+    """
+    item_budget = max(budget // 4, 1)
+    candidates = []
+    for index, item in enumerate(items):
+        if _value_tokens(item) > item_budget:
+            item = pack_value(item, item_budget)
+        text = item if isinstance(item, str) else json.dumps(item, default=str)
+        candidates.append((index, item, _signal(text), estimate_tokens(text) + 1))
+
+    remaining = budget
+    selected = {}
+    for index, item, score, tokens in sorted(candidates, key=lambda it: (-it[2] / it[3], it[0])):
+        if tokens > remaining and selected:
+            continue
+        selected[index] = item
+        remaining -= tokens
+    return [selected[index] for index in sorted(selected)], len(items) - len(selected)
+
+
+def pack_value(value: Any, budget: int) -> Any:
+    """Fit a string, list or dict into budget tokens, recursively.
+
+    Strings are packed with pack_text. Lists keep their highest-signal items
+    and dicts share the budget between their values by size; the number of
+    items left out of a list is recorded next to it, under "<key>_omitted" in
+    a dict or as a last item in a list of lists.
+    """
+    if _value_tokens(value) <= budget:
+        return value
+    if isinstance(value, str):
+        return pack_text(value, budget)
+    if isinstance(value, list):
+        packed, omitted = _pack_list(value, budget - 10)
+        if omitted:
+            packed.append(f"... [{omitted} items omitted] ...")
+        return packed
+    if not isinstance(value, dict):
+        return value
+
+    large = {key: item for key, item in value.items() if isinstance(item, (str, list, dict))}
+    small_tokens = estimate_tokens(json.dumps({key: item for key, item in value.items() if key not in large},
+                                              default=str))
+    large_tokens = max(sum(_value_tokens(item) for item in large.values()), 1)
+    large_budget = max(budget - small_tokens - 10 * len(large), budget // 4)
+    packed = {}
+    for key, item in value.items():
+        if key not in large:
+            packed[key] = item
+            continue
+        share = max(int(large_budget * _value_tokens(item) / large_tokens), 1)
+        if isinstance(item, list):
+            packed[key], omitted = _pack_list(item, share)
+            if omitted:
+                packed[f"{key}_omitted"] = omitted
+        else:
+            packed[key] = pack_value(item, share)
+    return packed
+
+
+def pack_tool_response(response: Any, budget: int = DEFAULT_TOKEN_BUDGET,
+                       pointer: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Pack a tool response, strings, lists and dicts at any depth, into budget tokens.
+
+    The budget is lowered until the serialized response fits; the "packed"
+    key then tells the model its original size and how to get the rest.
+    Returns None when the response already fits.
+    """
+    if not isinstance(response, dict):
+        response = {"result": response}
+    original_tokens = estimate_tokens(json.dumps(response, default=str))
+    if original_tokens <= budget:
+        return None
+    note = f"Packed from ~{original_tokens} tokens.{' ' + pointer if pointer else ''}"
+    target = budget - estimate_tokens(json.dumps(note)) - 5
+    for _ in range(MAX_PACK_ATTEMPTS):
+        if target <= 0:
+            break
+        packed = pack_value(response, target)
+        packed_tokens = estimate_tokens(json.dumps(packed, default=str))
+        if packed_tokens <= budget - estimate_tokens(json.dumps(note)) - 5:
+            return {**packed, "packed": note}
+        # Shares are estimates; shrink in proportion to the overshoot
+        target = int(target * target / packed_tokens * 0.9)
+    # Still too large, e.g. many small values: cut the serialized response
+    text = json.dumps(response, default=str)
+    keep = max((budget - estimate_tokens(json.dumps(note)) - 20) * CHARS_PER_TOKEN, 0)
+    while True:
+        packed = {"result": text[:keep] + f"... [{len(text) - keep} characters omitted]", "packed": note}
+        # Quotes of the serialized response are escaped once more
+        if keep == 0 or estimate_tokens(json.dumps(packed)) <= budget:
+            return packed
+        keep = int(keep * 0.9)
+
+
+def pack_tool_output_callback(budget: int = DEFAULT_TOKEN_BUDGET, full_data_hint: str = "") -> Callable:
+    """Build an after_tool_callback packing every tool output into budget tokens.
+
+    full_data_hint tells the model how to get the content left out, such as
+    the tool fetching a single log section.
+    """
+
+    def after_tool_callback(tool, args: Dict[str, Any], tool_context, tool_response: Any) -> Optional[Dict[str, Any]]:
+        arguments = ", ".join(f"{key}={value!r}" for key, value in args.items())
+        pointer = f"Output of {tool.name}({arguments}) shortened. {full_data_hint}".strip()
+        packed = pack_tool_response(tool_response, budget, pointer)
+        if packed is not None:
+            LOG.debug("Packed the output of %s into %d tokens", tool.name, budget)
+        return packed
+
+    return after_tool_callback
@@ -1,26 +1,66 @@
 """E2E Test Analyst Agent for analyzing CI e2e test logs."""
 
 from google.adk import Agent
-from google.adk.models.lite_llm import LiteLlm
 from . import prompt
+from .failed_tests import extract_failed_tests
+from .run_timeline import RunTimeline, RunTimelineParser
+from .junit import JUnitSummaryParser, format_junit_summary, merge_junit_summaries, parse_junit_file
+from sub_agents.context_packer import DEFAULT_TOKEN_BUDGET, pack_tool_output_callback
+from sub_agents.gcs import gcsweb_location, get_storage_client
+from sub_agents.limits import FETCH, limited
+from sub_agents.llm_cache import CachedLiteLlm
+from sub_agents.tracing import async_client
+from sub_agents.build_log import (
+    fetch_section_async, find_section, format_sections, index_log_content, load_index_async, section_text,
+)
 
+import os
 import asyncio
+import logging
 import httpx
+import tempfile
 import threading
 import concurrent.futures
+from concurrent.futures.process import BrokenProcessPool
 import re
-from typing import Dict, Any, Optional, List
+import xml.etree.ElementTree as ET
+from typing import Dict, Any, Optional, List, Tuple
+from urllib.parse import urljoin, urlparse
 
-GCS_URL = "https://gcsweb-ci.apps.ci.l2s4.p1.openshiftapps.com/gcs/test-platform-results/logs"
+# gcsweb base of the job artifacts, GCS_URL points it at a replay server (benchmarks/gcs_replay.py)
+GCS_URL = os.environ.get("GCS_URL", "https://gcsweb-ci.apps.ci.l2s4.p1.openshiftapps.com/gcs/test-platform-results/logs")
 
-MODEL = LiteLlm(model="ollama_chat/qwen3:4b")
+# Maximum number of concurrent requests to gcsweb when collecting JUnit files
+JUNIT_FETCH_CONCURRENCY = int(os.environ.get("E2E_JUNIT_FETCH_CONCURRENCY", "8"))
+JUNIT_FETCH_TIMEOUT = 60.0
+# Directory levels below artifacts/ searched for JUnit files, and the number of directories listed at most,
+# when they are found through gcsweb listings instead of a GCS prefix listing
+JUNIT_SEARCH_DEPTH = 4
+JUNIT_MAX_DIRECTORIES = 500
+
+# Test timelines of finished builds, see load_test_timeline_async
+TEST_TIMELINE_CACHE_DIR = os.environ.get(
+    "E2E_TEST_TIMELINE_DIR", os.path.join(tempfile.gettempdir(), "ci_analysis_agent", "test_timelines"))
+TEST_TIMELINE_QUERIES = ("slowest", "running_during", "regressions")
+
+_HREF_PATTERN = re.compile(r'href="([^"]+)"')
+
+LOG = logging.getLogger("e2e_test_analyst")
+
+# Process pool parsing JUnit files, shared by all calls and started on first use
+_junit_executor: Optional[concurrent.futures.ProcessPoolExecutor] = None
+_junit_executor_lock = threading.Lock()
+
+MODEL = CachedLiteLlm(model="ollama_chat/qwen3:4b")
+# Budget of a single tool output in tokens, larger outputs are packed before reaching the model
+TOOL_TOKEN_BUDGET = int(os.environ.get("E2E_TOOL_TOKEN_BUDGET", DEFAULT_TOKEN_BUDGET))
 
 # Prow tool functions for e2e test analysis
 async def get_job_metadata_async(job_name: str, build_id: str) -> Dict[str, Any]:
     """Get the metadata and status for a specific Prow job name and build id."""
     url = f"{GCS_URL}/{job_name}/{build_id}/prowjob.json"
     try:
-        async with httpx.AsyncClient() as client:
+        async with async_client() as client:
             response = await client.get(url)
             response.raise_for_status()
             data = response.json()
@@ -91,30 +131,6 @@ def extract_test_commit_info(log_content: str) -> Dict[str, Any]:
     
     return commit_info
 
-def extract_failed_tests(log_content: str) -> List[Dict[str, str]]:
-    """Extract failed test information from logs."""
-    failed_tests = []
-    
-    # Common failure patterns in openshift-tests
-    failure_patterns = [
-        r'FAIL: (.*?) \((\d+\.\d+s)\)',  # Standard test failure
-        r'• Failure \[(\d+\.\d+) seconds\]\n(.*?)\n',  # Ginkgo failure
-        r'Test Failed: (.*?) - (.*?)\n',  # Direct test failure
-        r'\[FAILED\] (.*?) \[(\d+\.\d+) seconds\]',  # Another format
-    ]
-    
-    for pattern in failure_patterns:
-        matches = re.findall(pattern, log_content, re.MULTILINE | re.DOTALL)
-        for match in matches:
-            if len(match) >= 2:
-                test_name = match[0].strip() if match[0] else match[1].strip()
-                failed_tests.append({
-                    "test_name": test_name,
-                    "duration": match[1] if len(match) > 1 else "unknown"
-                })
-    
-    return failed_tests
-
 def generate_source_code_links(test_name: str, commit_hash: Optional[str] = None) -> Dict[str, str]:
     """Generate source code links for a test."""
     base_url = "https://github.com/openshift/origin"
@@ -150,7 +166,7 @@ async def get_e2e_test_logs_async(job_name: str, build_id: str) -> str:
     base_url = f"{GCS_URL}/{job_name}/{build_id}"
     e2e_test_url = f"{base_url}/{e2e_test_path}"
     
-    async with httpx.AsyncClient() as client:
+    async with async_client() as client:
         try:
             response = await client.get(e2e_test_url)
             response.raise_for_status()
@@ -222,18 +238,13 @@ Build ID: {build_id}
             else:
                 result += "✅ NO FAILED TESTS DETECTED\n\n"
             
-            # Add key logs section (first 50 lines and last 50 lines)
-            lines = log_content.split('\n')
-            result += "📝 KEY LOG SECTIONS:\n"
-            result += "--- First 20 lines ---\n"
-            result += '\n'.join(lines[:20]) + "\n\n"
-            
-            if len(lines) > 40:
-                result += "--- Last 20 lines ---\n"
-                result += '\n'.join(lines[-20:]) + "\n\n"
-            
-            # Add the full log content
-            result += f"📋 FULL E2E TEST LOG:\n{log_content}"
+            # Add the section index and the section most likely to explain a failure
+            sections = index_log_content(e2e_test_url, response.content)
+            result += f"📑 LOG SECTIONS ({len(response.content)} bytes, fetch others with get_e2e_log_section):\n"
+            result += format_sections(sections)
+            focus = find_section(sections, "failed")
+            result += f"\n📋 SECTION [{focus['id']}] {focus['kind']} {focus['name']}:\n"
+            result += section_text(response.content[focus['start']:focus['end']])
             
             return result
             
@@ -265,8 +276,22 @@ Build ID: {build_id}
         except Exception as e:
             return f"❌ E2E TEST ANALYSIS ERROR: {str(e)}"
 
-async def get_junit_results_async(job_name: str, build_id: str) -> str:
-    """Get JUnit test results from Prow."""
+async def _stream_junit_summary(client: httpx.AsyncClient, url: str) -> Dict[str, Any]:
+    """Download a JUnit file and summarize it while it streams in."""
+    parser = JUnitSummaryParser()
+    async with client.stream("GET", url) as response:
+        response.raise_for_status()
+        async for chunk in response.aiter_bytes():
+            parser.feed(chunk)
+    return parser.close()
+
+async def get_junit_results_async(job_name: str, build_id: str, raw: bool = False) -> str:
+    """Get JUnit test results from Prow.
+
+    By default the XML is stream-parsed into pass/fail/skip counts, per-suite
+    durations and the failing test cases with truncated failure messages.
+    With raw=True the XML text is returned unchanged.
+    """
     # Extract job short name from full job name
     job_parts = job_name.split('-')
     if len(job_parts) >= 8:
@@ -274,12 +299,9 @@ async def get_junit_results_async(job_name: str, build_id: str) -> str:
     else:
         job_short_name = job_name.split('-')[-1]  # Fallback to last part
     
-    # JUnit results are typically in junit directory
-    junit_path = f"artifacts/{job_short_name}/openshift-e2e-test/junit_e2e_*.xml"
-    
     base_url = f"{GCS_URL}/{job_name}/{build_id}"
     
-    async with httpx.AsyncClient() as client:
+    async with async_client() as client:
         try:
             # Try common JUnit file patterns
             junit_patterns = [
@@ -291,10 +313,13 @@ async def get_junit_results_async(job_name: str, build_id: str) -> str:
             for pattern in junit_patterns:
                 junit_url = f"{base_url}/{pattern}"
                 try:
-                    response = await client.get(junit_url)
-                    response.raise_for_status()
-                    return f"JUnit test results from {pattern}:\n\n{response.text}"
-                except httpx.HTTPError:
+                    if raw:
+                        response = await client.get(junit_url)
+                        response.raise_for_status()
+                        return f"JUnit test results from {pattern}:\n\n{response.text}"
+                    summary = await _stream_junit_summary(client, junit_url)
+                    return format_junit_summary(pattern, summary)
+                except (httpx.HTTPError, ET.ParseError):
                     continue
             
             return f"Could not find JUnit test results for {job_name}/{build_id}. Tried patterns: {', '.join(junit_patterns)}"
@@ -302,41 +327,281 @@ async def get_junit_results_async(job_name: str, build_id: str) -> str:
         except Exception as e:
             return f"Error fetching JUnit results: {str(e)}"
 
-def run_async_in_thread(coro):
-    """Run async function in a thread to avoid event loop conflicts."""
-    
-    def run_in_thread():
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
+def _is_junit_file(url: str) -> bool:
+    name = url.rstrip('/').rsplit('/', 1)[-1]
+    return name.startswith("junit") and name.endswith(".xml")
+
+async def list_gcsweb_directory(client: httpx.AsyncClient, url: str) -> Tuple[List[str], List[str]]:
+    """List a gcsweb directory, returning the URLs of its subdirectories and files."""
+    response = await client.get(url)
+    response.raise_for_status()
+    base_path = urlparse(url).path
+    directories, files = [], []
+    for href in _HREF_PATTERN.findall(response.text):
+        child = urljoin(url, href)
+        path = urlparse(child).path
+        # Skip the parent directory and links leaving the listing
+        if not path.startswith(base_path) or len(path) <= len(base_path):
+            continue
+        (directories if path.endswith('/') else files).append(child)
+    return directories, files
+
+def list_junit_objects(base_url: str) -> Optional[List[str]]:
+    """URLs of the JUnit files below a gcsweb URL from one GCS prefix listing, None when base_url is not on gcsweb."""
+    location = gcsweb_location(base_url)
+    if location is None:
+        return None
+    bucket_name, prefix = location
+    prefix = prefix.rstrip('/') + '/'
+    base_url = base_url.rstrip('/') + '/'
+    blobs = get_storage_client().bucket(bucket_name).list_blobs(
+        prefix=prefix, match_glob="**/junit*.xml", fields="items(name),nextPageToken",
+        timeout=JUNIT_FETCH_TIMEOUT)
+    return sorted(base_url + blob.name[len(prefix):] for blob in blobs if _is_junit_file(blob.name))
+
+async def find_junit_files_async(client: httpx.AsyncClient, base_url: str,
+                                 semaphore: asyncio.Semaphore) -> List[str]:
+    """Find the JUnit files below base_url.
+
+    The GCS objects below base_url are listed at once; when that fails (no
+    access to the bucket), the gcsweb listings are walked one level of
+    directories at a time instead.
+    """
+    try:
+        junit_files = await asyncio.to_thread(list_junit_objects, base_url)
+        if junit_files is not None:
+            return junit_files
+    except Exception as e:
+        LOG.warning("Could not list %s through GCS, walking gcsweb instead: %s", base_url, e)
+
+    async def list_directory(url: str) -> Tuple[List[str], List[str]]:
+        async with semaphore:
+            try:
+                return await list_gcsweb_directory(client, url)
+            except httpx.HTTPError:
+                return [], []
+
+    junit_files: List[str] = []
+    level = [base_url.rstrip('/') + '/']
+    listed = 0
+    for _ in range(JUNIT_SEARCH_DEPTH + 1):
+        if not level or listed >= JUNIT_MAX_DIRECTORIES:
+            break
+        level = level[:JUNIT_MAX_DIRECTORIES - listed]
+        listed += len(level)
+        next_level = []
+        for directories, files in await asyncio.gather(*(list_directory(url) for url in level)):
+            junit_files.extend(url for url in files if _is_junit_file(url))
+            next_level.extend(directories)
+        level = next_level
+    return sorted(set(junit_files))
+
+async def _download(client: httpx.AsyncClient, url: str, path: str, semaphore: asyncio.Semaphore) -> None:
+    async with semaphore:
+        async with client.stream("GET", url) as response:
+            response.raise_for_status()
+            with open(path, 'wb') as f:
+                async for chunk in response.aiter_bytes():
+                    f.write(chunk)
+
+def _get_junit_executor() -> concurrent.futures.ProcessPoolExecutor:
+    global _junit_executor
+    with _junit_executor_lock:
+        if _junit_executor is None:
+            _junit_executor = concurrent.futures.ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+        return _junit_executor
+
+def _reset_junit_executor(executor: concurrent.futures.ProcessPoolExecutor) -> None:
+    # A worker died, e.g. killed for its memory; the next call starts a new pool
+    global _junit_executor
+    with _junit_executor_lock:
+        if _junit_executor is executor:
+            _junit_executor = None
+    executor.shutdown(wait=False)
+
+async def get_all_junit_results_async(job_name: str, build_id: str) -> str:
+    """Get the merged results of every JUnit file in the build artifacts.
+
+    All junit*.xml files below artifacts/ are discovered with one GCS prefix
+    listing, downloaded concurrently (at most JUNIT_FETCH_CONCURRENCY requests
+    at a time) and parsed in a shared process pool as soon as each download
+    finishes.
+    Tests are de-duplicated by name across files.
+    """
+    base_url = f"{GCS_URL}/{job_name}/{build_id}"
+    semaphore = asyncio.Semaphore(JUNIT_FETCH_CONCURRENCY)
+    async with async_client(timeout=JUNIT_FETCH_TIMEOUT) as client:
         try:
-            return loop.run_until_complete(coro)
-        finally:
-            loop.close()
-    
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        future = executor.submit(run_in_thread)
-        return future.result()
+            junit_urls = await find_junit_files_async(client, f"{base_url}/artifacts/", semaphore)
+            if not junit_urls:
+                return f"Could not find any JUnit files below {base_url}/artifacts/"
+
+            loop = asyncio.get_running_loop()
+            executor = _get_junit_executor()
+            with tempfile.TemporaryDirectory(prefix="junit-") as tmp_dir:
+
+                async def fetch_and_parse(index: int, url: str) -> Dict[str, Any]:
+                    path = os.path.join(tmp_dir, f"{index}.xml")
+                    await _download(client, url, path, semaphore)
+                    try:
+                        return await loop.run_in_executor(executor, parse_junit_file, path)
+                    except BrokenProcessPool:
+                        _reset_junit_executor(executor)
+                        raise
+
+                results = await asyncio.gather(
+                    *(fetch_and_parse(index, url) for index, url in enumerate(junit_urls)),
+                    return_exceptions=True,
+                )
+
+            per_file, failed = [], []
+            for url, summary in zip(junit_urls, results):
+                source = url[len(base_url) + 1:]
+                if isinstance(summary, Exception):
+                    failed.append(f"{source}: {summary}")
+                else:
+                    per_file.append((source, summary))
+
+            result = format_junit_summary(f"{len(per_file)} JUnit files", merge_junit_summaries(per_file))
+            if failed:
+                result += f"\n⚠️ COULD NOT READ {len(failed)} FILES:\n"
+                result += "".join(f"   • {entry}\n" for entry in failed)
+            return result
+
+        except Exception as e:
+            return f"Error fetching JUnit results: {str(e)}"
+
+def _job_short_name(job_name: str) -> str:
+    job_parts = job_name.split('-')
+    if len(job_parts) >= 8:
+        return '-'.join(job_parts[7:])  # Everything after the 7th part
+    return job_name.split('-')[-1]  # Fallback to last part
+
+async def load_test_timeline_async(client: httpx.AsyncClient, job_name: str, build_id: str) -> RunTimeline:
+    """Return the test timeline of a build, streaming its e2e log on first use.
 
-def get_job_metadata_tool(job_name: str, build_id: str):
+    Timelines of finished builds are stored under TEST_TIMELINE_CACHE_DIR so
+    that later queries, including regression checks against them as a
+    baseline, don't download the log again.
+    """
+    cache_path = os.path.join(TEST_TIMELINE_CACHE_DIR, job_name, f"{build_id}.json")
+    timeline = RunTimeline.load(cache_path)
+    if timeline is not None:
+        return timeline
+
+    base_url = f"{GCS_URL}/{job_name}/{build_id}"
+    e2e_test_url = f"{base_url}/artifacts/{_job_short_name(job_name)}/openshift-e2e-test/build-log.txt"
+    parser = RunTimelineParser()
+    async with client.stream("GET", e2e_test_url) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            parser.feed(line.rstrip("\r\n"))
+    timeline = parser.timeline()
+
+    # The log of a running build is still growing
+    finished = await client.get(f"{base_url}/finished.json")
+    if finished.status_code == 200 and len(timeline):
+        try:
+            timeline.save(cache_path)
+        except OSError:
+            pass
+    return timeline
+
+async def query_test_timeline_async(job_name: str, build_id: str, query: str = "slowest", test_name: str = "",
+                                    baseline_build_id: str = "", top_n: int = 20) -> Dict[str, Any]:
+    """Answer timing questions from the per-test timeline of an e2e run."""
+    if query not in TEST_TIMELINE_QUERIES:
+        return {"error": f"Unknown query '{query}', expected one of {', '.join(TEST_TIMELINE_QUERIES)}"}
+    try:
+        async with async_client(timeout=JUNIT_FETCH_TIMEOUT) as client:
+            timeline = await load_test_timeline_async(client, job_name, build_id)
+            baseline = None
+            if query == "regressions":
+                if not baseline_build_id:
+                    return {"error": "baseline_build_id is required for the regressions query"}
+                baseline = await load_test_timeline_async(client, job_name, baseline_build_id)
+    except Exception as e:
+        return {"error": f"Failed to build the test timeline: {str(e)}"}
+
+    result: Dict[str, Any] = {"job_name": job_name, "build_id": build_id, "test_runs": len(timeline),
+                              "outcomes": timeline.counts()}
+    if query == "slowest":
+        result["slowest"] = timeline.slowest(top_n)
+    elif query == "running_during":
+        if not test_name:
+            return {"error": "test_name is required for the running_during query"}
+        result.update(timeline.running_during(test_name))
+    else:
+        result["baseline_build_id"] = baseline_build_id
+        result["regressions"] = timeline.regressions(baseline, top_n=top_n)
+    return result
+
+async def get_e2e_log_section_async(job_name: str, build_id: str, section: str = "failed") -> str:
+    """Get one section of the e2e test build-log.txt."""
+    e2e_test_path = f"artifacts/{_job_short_name(job_name)}/openshift-e2e-test/build-log.txt"
+    e2e_test_url = f"{GCS_URL}/{job_name}/{build_id}/{e2e_test_path}"
+    async with async_client() as client:
+        try:
+            sections = await load_index_async(client, e2e_test_url)
+            found = find_section(sections, section)
+            if found is None:
+                return f"No section '{section}' in {e2e_test_path}. Available sections:\n" + format_sections(sections)
+            text = await fetch_section_async(client, e2e_test_url, found)
+            return (f"📋 SECTION [{found['id']}] {found['kind']} {found['name']} from {e2e_test_path} "
+                    f"(lines {found['start_line']}-{found['end_line']}):\n{text}")
+        except Exception as e:
+            return f"Error fetching e2e log section: {str(e)}"
+
+async def get_job_metadata_tool(job_name: str, build_id: str):
     """Get metadata and status for a specific Prow job name and build ID."""
-    return run_async_in_thread(get_job_metadata_async(job_name, build_id))
+    return await get_job_metadata_async(job_name, build_id)
 
-def get_e2e_test_logs_tool(job_name: str, build_id: str):
+async def get_e2e_test_logs_tool(job_name: str, build_id: str):
     """Get e2e test logs from the openshift-e2e-test directory with commit info and source code links."""
-    return run_async_in_thread(get_e2e_test_logs_async(job_name, build_id))
+    return await get_e2e_test_logs_async(job_name, build_id)
+
+async def get_all_junit_results_tool(job_name: str, build_id: str):
+    """Get the merged, de-duplicated results of all JUnit files of a build."""
+    return await get_all_junit_results_async(job_name, build_id)
+
+async def query_test_timeline_tool(job_name: str, build_id: str, query: str = "slowest", test_name: str = "",
+                                   baseline_build_id: str = "", top_n: int = 20):
+    """Query the per-test timeline (start, end, duration, outcome) of the e2e run.
+
+    Args:
+        job_name: The Prow job name
+        build_id: The Prow build ID
+        query: 'slowest' for the longest tests, 'running_during' for the tests overlapping
+            the failed run of test_name, 'regressions' for tests that became slower than
+            in baseline_build_id
+        test_name: Test name (or a substring of it) for the running_during query
+        baseline_build_id: Build ID of an earlier, passing build for the regressions query
+        top_n: Maximum number of tests returned
+    """
+    return await query_test_timeline_async(job_name, build_id, query, test_name, baseline_build_id, top_n)
+
+async def get_e2e_log_section_tool(job_name: str, build_id: str, section: str = "failed"):
+    """Get one section of the e2e test build-log.txt by id, name or 'failed' for the most relevant one."""
+    return await get_e2e_log_section_async(job_name, build_id, section)
 
-def get_junit_results_tool(job_name: str, build_id: str):
-    """Get JUnit test results from the e2e test artifacts."""
-    return run_async_in_thread(get_junit_results_async(job_name, build_id))
+async def get_junit_results_tool(job_name: str, build_id: str, raw: bool = False):
+    """Get a summary of the JUnit test results from the e2e test artifacts, or the raw XML with raw=True."""
+    return await get_junit_results_async(job_name, build_id, raw)
 
 e2e_test_analyst_agent = Agent(
     model=MODEL,
     name="e2e_test_analyst_agent",
     instruction=prompt.E2E_TEST_SPECIALIST_PROMPT,
     output_key="e2e_test_analysis_output",
-    tools=[
+    after_tool_callback=pack_tool_output_callback(
+        TOOL_TOKEN_BUDGET,
+        "Call get_e2e_log_section_tool with a section id or name from the index for the complete text of one section."),
+    tools=[limited(FETCH)(tool) for tool in (
         get_job_metadata_tool,
         get_e2e_test_logs_tool,
+        get_e2e_log_section_tool,
         get_junit_results_tool,
-    ],
+        get_all_junit_results_tool,
+        query_test_timeline_tool,
+    )],
 ) 
\ No newline at end of file
@@ -0,0 +1,141 @@
+"""Line-oriented extraction of failed tests from openshift-tests output."""
+
+import re
+from typing import Dict, Iterable, List, Optional
+
+# openshift-tests: failed: (1m2s) 2025-07-01T10:00:00 "[sig-cli] oc adm ... [Suite:openshift/conformance/parallel]"
+_OPENSHIFT_TESTS_FAILED = re.compile(r'^failed: \((?P<duration>[^)]*)\)(?: \S+)? "(?P<name>.*)"\s*$')
+# go test: FAIL: TestName (1.23s)
+_GO_TEST_FAIL = re.compile(r'FAIL: (?P<name>.*?) \((?P<duration>\d+\.\d+s)\)')
+# Ginkgo v1 "• Failure [12.3 seconds]" and v2 "• [FAILED] [12.3 seconds]", name on the next line
+_GINKGO_HEADER = re.compile(r'• (?:Failure|\[FAILED\]) \[(?P<seconds>\d+\.\d+) seconds\]')
+# Ginkgo: [FAILED] name [12.3 seconds]
+_GINKGO_FAILED = re.compile(r'\[FAILED\] (?P<name>.*?) \[(?P<seconds>\d+\.\d+) seconds\]')
+# Test Failed: name - reason
+_TEST_FAILED = re.compile(r'Test Failed: (?P<name>.*?) - (?P<reason>.*)')
+
+# openshift-tests lists all failures once more at the end of the run
+_FAILING_TESTS_HEADER = "Failing tests:"
+
+# Every line starting or ending a failure contains one of these
+_LITERALS = ("FAIL", "Fail", "failed: (")
+
+
+class FailedTestParser:
+    """Recognizes openshift-tests, Ginkgo and go test failures line by line.
+
+    Each line is matched on its own, so the run time is linear in the size of
+    the log. Failures are de-duplicated by test name: the first occurrence
+    determines the order and later occurrences only fill in missing details.
+    """
+
+    def __init__(self):
+        self._failures: Dict[str, Dict[str, str]] = {}
+        # Duration of a Ginkgo failure header waiting for the test name on the next line
+        self._ginkgo_duration: Optional[str] = None
+        # Inside the "Failing tests:" summary, True once its first entry was seen
+        self._in_summary: Optional[bool] = None
+
+    def _add(self, test_name: str, duration: str = "unknown", reason: Optional[str] = None) -> None:
+        test_name = test_name.strip()
+        if not test_name:
+            return
+        failure = self._failures.get(test_name)
+        if failure is None:
+            failure = self._failures[test_name] = {"test_name": test_name, "duration": duration}
+        elif failure["duration"] == "unknown":
+            failure["duration"] = duration
+        if reason and not failure.get("reason"):
+            failure["reason"] = reason.strip()
+
+    def expects_next_line(self) -> bool:
+        """Whether the next line belongs to a failure even without any failure marker."""
+        return self._ginkgo_duration is not None or self._in_summary is not None
+
+    def feed(self, line: str) -> None:
+        """Process the next line of the log, without its trailing newline."""
+        if self._ginkgo_duration is not None:
+            if not line.strip():
+                return
+            self._add(line, self._ginkgo_duration)
+            self._ginkgo_duration = None
+            return
+
+        if self._in_summary is not None:
+            if not line.strip():
+                if self._in_summary:
+                    self._in_summary = None
+                return
+            if line.startswith("error:"):
+                self._in_summary = None
+            else:
+                self._in_summary = True
+                self._add(line)
+                return
+
+        if not any(literal in line for literal in _LITERALS):
+            return
+        if line.lstrip().startswith(_FAILING_TESTS_HEADER):
+            self._in_summary = False
+            return
+        match = _OPENSHIFT_TESTS_FAILED.match(line)
+        if match:
+            self._add(match.group("name"), match.group("duration"))
+            return
+        match = _GINKGO_HEADER.search(line)
+        if match:
+            self._ginkgo_duration = f"{match.group('seconds')}s"
+            return
+        match = _GINKGO_FAILED.search(line)
+        if match:
+            self._add(match.group("name"), f"{match.group('seconds')}s")
+            return
+        match = _GO_TEST_FAIL.search(line)
+        if match:
+            self._add(match.group("name"), match.group("duration"))
+            return
+        match = _TEST_FAILED.search(line)
+        if match:
+            self._add(match.group("name"), reason=match.group("reason"))
+
+    def feed_lines(self, lines: Iterable[str]) -> "FailedTestParser":
+        for line in lines:
+            self.feed(line)
+        return self
+
+    def scan(self, text: str) -> "FailedTestParser":
+        """Feed a complete log, only visiting lines that can hold a failure.
+
+        Equivalent to feeding every line of text: lines without any failure
+        marker are skipped with a substring search unless a failure started
+        on the previous line is still being read.
+        """
+        position = 0
+        length = len(text)
+        next_occurrence: Dict[str, int] = {}
+        while position < length:
+            if not self.expects_next_line():
+                candidate = length
+                for literal in _LITERALS:
+                    index = next_occurrence.get(literal, -1)
+                    if index < position:
+                        index = text.find(literal, position)
+                        next_occurrence[literal] = length if index == -1 else index
+                    candidate = min(candidate, next_occurrence[literal])
+                if candidate == length:
+                    break
+                position = text.rfind("\n", position, candidate) + 1 or position
+            end = text.find("\n", position)
+            if end == -1:
+                end = length
+            self.feed(text[position:end])
+            position = end + 1
+        return self
+
+    def failures(self) -> List[Dict[str, str]]:
+        return list(self._failures.values())
+
+
+def extract_failed_tests(log_content: str) -> List[Dict[str, str]]:
+    """Extract failed test information from logs."""
+    return FailedTestParser().scan(log_content).failures()
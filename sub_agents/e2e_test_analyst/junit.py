@@ -0,0 +1,250 @@
+"""Streaming JUnit XML parsing that keeps only failures and aggregates."""
+
+import xml.etree.ElementTree as ET
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# Size of the blocks read from JUnit files on disk
+READ_BLOCK_SIZE = 1024 * 1024
+
+# Limits keeping the summary small whatever the size of the XML
+MAX_FAILURES = 100
+MAX_MESSAGE_LENGTH = 500
+
+
+def _local_name(tag: str) -> str:
+    # Strip a {namespace} prefix
+    return tag.rsplit("}", 1)[-1]
+
+
+def _seconds(value: Optional[str]) -> float:
+    try:
+        return float(value) if value else 0.0
+    except ValueError:
+        return 0.0
+
+
+def _truncate(text: str, limit: int = MAX_MESSAGE_LENGTH) -> str:
+    text = text.strip()
+    if len(text) > limit:
+        return text[:limit] + f"... [{len(text) - limit} more characters]"
+    return text
+
+
+class JUnitSummaryParser:
+    """Incrementally parses JUnit XML and aggregates it in bounded memory.
+
+    Data is fed in chunks as it is downloaded. Every <testcase> is reduced to
+    its outcome as soon as it is complete and then removed from the tree, so
+    memory usage depends on the number of failures kept, not on the XML size.
+
+    With track_outcomes, the outcomes seen for every test name are kept as
+    well, which is what merging several files needs to de-duplicate tests.
+    """
+
+    def __init__(self, max_failures: int = MAX_FAILURES, max_message_length: int = MAX_MESSAGE_LENGTH,
+                 track_outcomes: bool = False):
+        self.max_failures = max_failures
+        self.max_message_length = max_message_length
+        self._parser = ET.XMLPullParser(events=("start", "end"))
+        self._stack: List[ET.Element] = []
+        self._suite_stack: List[Dict[str, Any]] = []
+        self.counts = {"tests": 0, "passed": 0, "failed": 0, "errors": 0, "skipped": 0}
+        self.suites: List[Dict[str, Any]] = []
+        self.failures: List[Dict[str, Any]] = []
+        self.failures_omitted = 0
+        self.outcomes: Optional[Dict[str, Set[str]]] = {} if track_outcomes else None
+
+    def feed(self, data: bytes) -> None:
+        self._parser.feed(data)
+        self._process_events()
+
+    def close(self) -> Dict[str, Any]:
+        """Finish parsing and return the summary."""
+        self._parser.close()
+        self._process_events()
+        return self.summary()
+
+    def _process_events(self) -> None:
+        for event, element in self._parser.read_events():
+            tag = _local_name(element.tag)
+            if event == "start":
+                self._stack.append(element)
+                if tag == "testsuite":
+                    self._suite_stack.append({
+                        "name": element.get("name", ""),
+                        "tests": 0,
+                        "failed": 0,
+                        "skipped": 0,
+                        "duration": _seconds(element.get("time")),
+                        "testcase_time": 0.0,
+                    })
+                continue
+
+            self._stack.pop()
+            if tag == "testcase":
+                self._testcase(element)
+            elif tag == "testsuite":
+                suite = self._suite_stack.pop()
+                # Fall back to the sum of the test cases without a time attribute
+                if not suite["duration"]:
+                    suite["duration"] = suite["testcase_time"]
+                del suite["testcase_time"]
+                suite["duration"] = round(suite["duration"], 3)
+                self.suites.append(suite)
+            else:
+                continue
+            # Drop the completed element so the tree never grows
+            element.clear()
+            if self._stack:
+                self._stack[-1].remove(element)
+
+    def _testcase(self, element: ET.Element) -> None:
+        outcome = "passed"
+        detail = None
+        for child in element:
+            child_tag = _local_name(child.tag)
+            if child_tag in ("failure", "error"):
+                outcome = "failed" if child_tag == "failure" else "errors"
+                detail = child
+                break
+            if child_tag == "skipped":
+                outcome = "skipped"
+
+        duration = _seconds(element.get("time"))
+        self.counts["tests"] += 1
+        self.counts[outcome] += 1
+        if self.outcomes is not None:
+            self.outcomes.setdefault(element.get("name", ""), set()).add(outcome)
+        suite = self._suite_stack[-1] if self._suite_stack else None
+        if suite is not None:
+            suite["tests"] += 1
+            suite["testcase_time"] += duration
+            if outcome in ("failed", "errors"):
+                suite["failed"] += 1
+            elif outcome == "skipped":
+                suite["skipped"] += 1
+
+        if detail is None:
+            return
+        if len(self.failures) >= self.max_failures:
+            self.failures_omitted += 1
+            return
+        message = detail.get("message") or ""
+        text = detail.text or ""
+        if text.strip() and text.strip() != message.strip():
+            message = f"{message}\n{text}" if message else text
+        self.failures.append({
+            "suite": suite["name"] if suite is not None else "",
+            "classname": element.get("classname", ""),
+            "name": element.get("name", ""),
+            "duration": duration,
+            "type": "error" if outcome == "errors" else "failure",
+            "message": _truncate(message, self.max_message_length),
+        })
+
+    def summary(self) -> Dict[str, Any]:
+        summary = {
+            "counts": dict(self.counts),
+            "suites": self.suites,
+            "failures": self.failures,
+            "failures_omitted": self.failures_omitted,
+        }
+        if self.outcomes is not None:
+            summary["outcomes"] = {name: sorted(outcomes) for name, outcomes in self.outcomes.items()}
+        return summary
+
+
+def parse_junit(data: bytes, **kwargs) -> Dict[str, Any]:
+    """Summarize a complete JUnit document."""
+    parser = JUnitSummaryParser(**kwargs)
+    parser.feed(data)
+    return parser.close()
+
+
+def parse_junit_file(path: str) -> Dict[str, Any]:
+    """Summarize a JUnit file on disk, keeping the outcome of every test for merging."""
+    parser = JUnitSummaryParser(track_outcomes=True)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(READ_BLOCK_SIZE), b""):
+            parser.feed(block)
+    return parser.close()
+
+
+def merge_junit_summaries(per_file: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, Any]:
+    """Merge the summaries of several JUnit files into one de-duplicated result.
+
+    Tests are identified by name. A test reported as failed in one place and
+    passed in another (openshift-tests records retried tests this way) is
+    counted as flaky rather than failed.
+    """
+    outcomes: Dict[str, Set[str]] = {}
+    suites = []
+    failures: Dict[str, Dict[str, Any]] = {}
+    failures_omitted = 0
+    for source, summary in per_file:
+        for name, file_outcomes in summary["outcomes"].items():
+            outcomes.setdefault(name, set()).update(file_outcomes)
+        for suite in summary["suites"]:
+            suites.append(dict(suite, source=source))
+        for failure in summary["failures"]:
+            failures.setdefault(failure["name"], dict(failure, source=source))
+        failures_omitted += summary["failures_omitted"]
+
+    counts = {"tests": len(outcomes), "passed": 0, "failed": 0, "errors": 0, "skipped": 0, "flaky": 0}
+    for name, test_outcomes in outcomes.items():
+        if "passed" in test_outcomes:
+            failed = test_outcomes & {"failed", "errors"}
+            counts["flaky" if failed else "passed"] += 1
+        elif "errors" in test_outcomes:
+            counts["errors"] += 1
+        elif "failed" in test_outcomes:
+            counts["failed"] += 1
+        else:
+            counts["skipped"] += 1
+
+    failed, flaky = [], []
+    for name, failure in failures.items():
+        (flaky if "passed" in outcomes.get(name, ()) else failed).append(failure)
+    return {
+        "counts": counts,
+        "suites": suites,
+        "failures": failed,
+        "flakes": flaky,
+        "failures_omitted": failures_omitted,
+    }
+
+
+def format_junit_summary(source: str, summary: Dict[str, Any]) -> str:
+    """Render a JUnit summary in the report style of the other e2e tools."""
+    counts = summary["counts"]
+    result = f"🧪 JUNIT SUMMARY from {source}:\n\n"
+    result += (f"📊 TOTALS: {counts['tests']} tests, {counts['passed']} passed, {counts['failed']} failed, "
+               f"{counts['errors']} errors, {counts['skipped']} skipped")
+    if "flaky" in counts:
+        result += f", {counts['flaky']} flaky"
+    result += "\n\n"
+    if summary["suites"]:
+        result += "⏱️ SUITES:\n"
+        for suite in summary["suites"]:
+            result += (f"   • {suite['name'] or '(unnamed)'}: {suite['tests']} tests, {suite['failed']} failed, "
+                       f"{suite['skipped']} skipped, {suite['duration']}s")
+            if suite.get("source"):
+                result += f" ({suite['source']})"
+            result += "\n"
+        result += "\n"
+    if summary["failures"]:
+        result += f"❌ FAILED TEST CASES ({counts['failed'] + counts['errors']}):\n"
+        for failure in summary["failures"]:
+            result += f"   • {failure['name']} ({failure['duration']}s)\n"
+            if failure["message"]:
+                message = failure["message"].replace("\n", "\n       ")
+                result += f"       {message}\n"
+        if summary["failures_omitted"]:
+            result += f"   ... and {summary['failures_omitted']} more failures\n"
+    else:
+        result += "✅ NO FAILED TEST CASES\n"
+    if summary.get("flakes"):
+        result += f"\n⚠️ FLAKY TEST CASES ({len(summary['flakes'])}, failed and then passed):\n"
+        for flake in summary["flakes"]:
+            result += f"   • {flake['name']}\n"
+    return result
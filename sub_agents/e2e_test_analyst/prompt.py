@@ -35,8 +35,11 @@ Key areas of focus:
 
 Available tools:
 - get_job_metadata: Get basic job information and status
-- get_e2e_test_logs: Fetch e2e test logs with commit info and source code links
-- get_junit_results: Get JUnit XML test results when available
+- get_e2e_test_logs: Fetch e2e test logs with commit info, source code links, an index of the log sections and the section most likely to explain a failure
+- get_e2e_log_section: Fetch one more section of the e2e log by its id or name from the section index
+- get_junit_results: Get a JUnit summary (counts, per-suite durations, failing test cases with failure messages) when available; pass raw=True only if the full XML is needed
+- get_all_junit_results: Get the merged, de-duplicated results of all JUnit files of the build (e2e, monitor, upgrade...), including flaky tests
+- query_test_timeline: Per-test start/end/duration/outcome from the openshift-tests progress lines: the slowest tests (query='slowest'), the tests running alongside a failed test (query='running_during', test_name=...) and tests that became slower than in an earlier passing build (query='regressions', baseline_build_id=...)
 
 When analyzing test results:
 1. Start by getting job metadata to understand the test context
@@ -44,7 +47,7 @@ When analyzing test results:
    - openshift-tests binary commit information
    - Failed test names and durations
    - Source code links for each failure
-3. Look for JUnit results for additional structured test data
+3. Look for JUnit results for additional structured test data, preferring get_all_junit_results for full test visibility
 4. Identify failed tests, their failure reasons, and patterns
 5. Provide actionable insights and recommendations
 
@@ -0,0 +1,216 @@
+"""Per-test timeline built from the started:/passed:/failed:/skipped: lines of openshift-tests."""
+
+import os
+import re
+import json
+import tempfile
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+# started: 0/12/2345 "[sig-cli] oc adm ... [Suite:openshift/conformance/parallel]"
+# (older releases wrap the counters in parentheses)
+_STARTED = re.compile(r'^started: \(?\d+/\d+/\d+\)? "(?P<name>.*)"\s*$')
+# passed: (1m2.3s) 2025-07-01T10:00:00 "name", the timestamp is optional
+_FINISHED = re.compile(r'^(?P<outcome>passed|failed|skipped): \((?P<duration>[^)]*)\)(?: (?P<time>\S+))? "(?P<name>.*)"\s*$')
+# Go duration components such as 1h2m3.5s or 500ms
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(h|ms|us|µs|ns|m|s)')
+_DURATION_UNITS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 1e-3, "us": 1e-6, "µs": 1e-6, "ns": 1e-9}
+
+TIMELINE_VERSION = 1
+
+# Columns of a timeline row; start and end are positions of the started and
+# finished lines in the log, start_time and end_time seconds since the epoch
+COLUMNS = ("name", "outcome", "start", "end", "start_time", "end_time", "duration")
+
+# Default number of tests returned by a query
+DEFAULT_TOP_N = 20
+
+
+def parse_duration(value: str) -> Optional[float]:
+    """Convert a Go duration string such as "1m2.5s" into seconds."""
+    parts = _DURATION_PART.findall(value)
+    if not parts or "".join(number + unit for number, unit in parts) != value.strip():
+        return None
+    return round(sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts), 3)
+
+
+def _parse_time(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _format_time(seconds: Optional[float]) -> Optional[str]:
+    if seconds is None:
+        return None
+    return datetime.fromtimestamp(seconds, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class RunTimelineParser:
+    """Builds one row per test run from the openshift-tests progress lines.
+
+    Every line is matched on its own, so the log can be fed as it streams in.
+    A test retried by openshift-tests shows up as several runs.
+    """
+
+    def __init__(self):
+        self.rows: List[list] = []
+        self._position = 0
+        # Rows of the tests started but not finished yet, by name
+        self._running: Dict[str, List[int]] = {}
+
+    def feed(self, line: str) -> None:
+        """Process the next line of the log, without its trailing newline."""
+        self._position += 1
+        if not line.startswith(("started: ", "passed: ", "failed: ", "skipped: ")):
+            return
+        match = _STARTED.match(line)
+        if match:
+            name = match.group("name")
+            self._running.setdefault(name, []).append(len(self.rows))
+            self.rows.append([name, "running", self._position, None, None, None, None])
+            return
+        match = _FINISHED.match(line)
+        if not match:
+            return
+        name = match.group("name")
+        running = self._running.get(name)
+        if running:
+            row = self.rows[running.pop(0)]
+        else:
+            # Skipped tests are usually reported without being started
+            row = [name, None, None, None, None, None, None]
+            self.rows.append(row)
+        duration = parse_duration(match.group("duration"))
+        end_time = _parse_time(match.group("time"))
+        row[1] = match.group("outcome")
+        row[3] = self._position
+        row[5] = end_time
+        row[6] = duration
+        if end_time is not None and duration is not None:
+            row[4] = round(end_time - duration, 3)
+
+    def feed_lines(self, lines: Iterable[str]) -> "RunTimelineParser":
+        for line in lines:
+            self.feed(line)
+        return self
+
+    def timeline(self) -> "RunTimeline":
+        return RunTimeline(self.rows)
+
+
+class RunTimeline:
+    """A compact table of test runs answering timing questions."""
+
+    def __init__(self, rows: List[list]):
+        self.rows = rows
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @staticmethod
+    def _row(row: list) -> Dict[str, Any]:
+        result = dict(zip(COLUMNS, row))
+        result["start_time"] = _format_time(result["start_time"])
+        result["end_time"] = _format_time(result["end_time"])
+        result.pop("start")
+        result.pop("end")
+        return result
+
+    def counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for row in self.rows:
+            counts[row[1]] = counts.get(row[1], 0) + 1
+        return counts
+
+    def slowest(self, top_n: int = DEFAULT_TOP_N) -> List[Dict[str, Any]]:
+        """The longest test runs."""
+        timed = [row for row in self.rows if row[6] is not None]
+        timed.sort(key=lambda row: row[6], reverse=True)
+        return [self._row(row) for row in timed[:top_n]]
+
+    def running_during(self, test_name: str) -> Dict[str, Any]:
+        """The test runs overlapping the failed (or last) run of a test.
+
+        Runs are ordered by the position of their started and finished lines
+        in the log, so the answer doesn't depend on timestamps being present.
+        Runs that were still going when the test finished are flagged.
+        """
+        runs = [row for row in self.rows if row[0] == test_name]
+        if not runs:
+            runs = [row for row in self.rows if test_name in row[0]]
+        if not runs:
+            return {"error": f"No test matching '{test_name}' in the timeline"}
+        failed = [row for row in runs if row[1] == "failed"]
+        target = (failed or runs)[-1]
+        start = target[2] if target[2] is not None else target[3]
+        end = target[3] if target[3] is not None else float("inf")
+
+        overlapping = []
+        for row in self.rows:
+            if row is target or row[2] is None:
+                continue
+            row_end = row[3] if row[3] is not None else float("inf")
+            if row[2] < end and row_end > start:
+                entry = self._row(row)
+                entry["running_when_finished"] = row[2] < end < row_end
+                overlapping.append(entry)
+        return {"test": self._row(target), "overlapping_count": len(overlapping), "overlapping": overlapping}
+
+    def durations(self) -> Dict[str, float]:
+        """Duration of the last passed run of every test."""
+        durations = {}
+        for row in self.rows:
+            if row[1] == "passed" and row[6] is not None:
+                durations[row[0]] = row[6]
+        return durations
+
+    def regressions(self, baseline: "RunTimeline", min_ratio: float = 1.5, min_seconds: float = 10.0,
+                    top_n: int = DEFAULT_TOP_N) -> List[Dict[str, Any]]:
+        """Tests whose duration grew by min_ratio and min_seconds compared to the baseline.
+
+        Only runs that passed in both builds are compared.
+        """
+        baseline_durations = baseline.durations()
+        regressions = []
+        for name, duration in self.durations().items():
+            before = baseline_durations.get(name)
+            if before is None or duration - before < min_seconds or duration < before * min_ratio:
+                continue
+            regressions.append({
+                "name": name,
+                "duration": duration,
+                "baseline_duration": before,
+                "increase": round(duration - before, 3),
+            })
+        regressions.sort(key=lambda it: it["increase"], reverse=True)
+        return regressions[:top_n]
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({"version": TIMELINE_VERSION, "columns": COLUMNS, "rows": self.rows}, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["RunTimeline"]:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != TIMELINE_VERSION:
+            return None
+        return cls(data["rows"])
+
+
+def build_test_timeline(log_content: str) -> RunTimeline:
+    """Build the test timeline of a complete e2e log."""
+    return RunTimelineParser().feed_lines(log_content.splitlines()).timeline()
@@ -0,0 +1,44 @@
+"""Google Cloud Storage access shared by the agents.
+
+The artifacts the agents read over gcsweb are objects of a GCS bucket; the
+storage client lists a whole prefix in a few requests where gcsweb needs one
+listing per directory.
+"""
+
+import threading
+from typing import Optional, Tuple
+from urllib.parse import urlparse
+
+# Built on first use to keep imports cheap
+_storage_client = None
+_storage_client_lock = threading.Lock()
+
+
+def get_storage_client():
+    """The Google Cloud Storage client, honouring STORAGE_EMULATOR_HOST.
+
+    Without credentials, an anonymous client is used: the CI artifacts are
+    in a public bucket.
+    """
+    global _storage_client
+    if _storage_client is None:
+        with _storage_client_lock:
+            if _storage_client is None:
+                # google.cloud.storage takes a noticeable part of the startup time
+                from google.auth.exceptions import DefaultCredentialsError
+                from google.cloud import storage
+                try:
+                    _storage_client = storage.Client(project="openshift-gce-devel")
+                except DefaultCredentialsError:
+                    _storage_client = storage.Client.create_anonymous_client()
+    return _storage_client
+
+
+def gcsweb_location(url: str) -> Optional[Tuple[str, str]]:
+    """The bucket and object prefix a gcsweb URL (.../gcs/<bucket>/<prefix>) points to, None for other URLs."""
+    path = urlparse(url).path
+    marker = path.find("/gcs/")
+    if marker < 0:
+        return None
+    bucket, _, prefix = path[marker + len("/gcs/"):].partition("/")
+    return (bucket, prefix) if bucket else None
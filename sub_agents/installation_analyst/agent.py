@@ -1,146 +1,34 @@
 """Installation Analyst Agent for analyzing CI installation logs."""
 
 from google.adk import Agent
-from google.adk.models.lite_llm import LiteLlm
 from . import prompt
+from .install_log import extract_installation_info
+from sub_agents.context_packer import DEFAULT_TOKEN_BUDGET, pack_tool_output_callback
+from sub_agents.limits import FETCH, limited
+from sub_agents.llm_cache import CachedLiteLlm
+from sub_agents.tracing import async_client
+from sub_agents.build_log import (
+    fetch_section_async, find_section, format_sections, index_log_content, load_index_async, section_text,
+)
 
-import asyncio
+import os
 import httpx
 import threading
-import concurrent.futures
-import re
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
 
-GCS_URL = "https://gcsweb-ci.apps.ci.l2s4.p1.openshiftapps.com/gcs/test-platform-results/logs"
+# gcsweb base of the job artifacts, GCS_URL points it at a replay server (benchmarks/gcs_replay.py)
+GCS_URL = os.environ.get("GCS_URL", "https://gcsweb-ci.apps.ci.l2s4.p1.openshiftapps.com/gcs/test-platform-results/logs")
 
-MODEL = LiteLlm(model="ollama_chat/qwen3:4b")
-
-def extract_installation_info(log_content: str) -> Dict[str, Any]:
-    """Extract installation information from build-log.txt."""
-    install_info = {
-        "installer_version": None,
-        "installer_commit": None,
-        "release_image": None,
-        "instance_types": {},
-        "install_duration": None,
-        "architecture": None,
-        "cluster_config": {},
-        "install_success": False
-    }
-    
-    # Extract openshift-install version and commit (can be on separate lines)
-    version_patterns = [
-        r'openshift-install v([^\s"]+)',
-        r'"openshift-install v([^\s"]+)"'
-    ]
-    
-    for pattern in version_patterns:
-        version_match = re.search(pattern, log_content)
-        if version_match:
-            install_info["installer_version"] = version_match.group(1)
-            break
-    
-    # Extract commit (separate pattern)
-    commit_patterns = [
-        r'built from commit ([a-f0-9]+)',
-        r'"built from commit ([a-f0-9]+)"'
-    ]
-    
-    for pattern in commit_patterns:
-        commit_match = re.search(pattern, log_content)
-        if commit_match:
-            install_info["installer_commit"] = commit_match.group(1)
-            break
-    
-    # Extract release image
-    release_patterns = [
-        r'Installing from release ([^\s]+)',
-        r'release image "([^"]+)"',
-        r'RELEASE_IMAGE_LATEST for release image "([^"]+)"'
-    ]
-    for pattern in release_patterns:
-        release_match = re.search(pattern, log_content)
-        if release_match:
-            install_info["release_image"] = release_match.group(1)
-            break
-    
-    # Extract instance types from install-config.yaml section
-    # Look for compute and controlPlane sections
-    compute_type_pattern = r'compute:.*?type:\s*([^\s\n]+)'
-    control_type_pattern = r'controlPlane:.*?type:\s*([^\s\n]+)'
-    
-    compute_match = re.search(compute_type_pattern, log_content, re.DOTALL)
-    if compute_match:
-        install_info["instance_types"]["compute"] = compute_match.group(1)
-    
-    control_match = re.search(control_type_pattern, log_content, re.DOTALL)
-    if control_match:
-        install_info["instance_types"]["control_plane"] = control_match.group(1)
-    
-    # Extract architecture
-    arch_pattern = r'architecture:\s*([^\s\n]+)'
-    arch_match = re.search(arch_pattern, log_content)
-    if arch_match:
-        install_info["architecture"] = arch_match.group(1)
-    
-    # Extract cluster configuration details
-    # Replicas
-    compute_replicas_pattern = r'compute:.*?replicas:\s*(\d+)'
-    control_replicas_pattern = r'controlPlane:.*?replicas:\s*(\d+)'
-    
-    compute_replicas_match = re.search(compute_replicas_pattern, log_content, re.DOTALL)
-    if compute_replicas_match:
-        install_info["cluster_config"]["compute_replicas"] = int(compute_replicas_match.group(1))
-    
-    control_replicas_match = re.search(control_replicas_pattern, log_content, re.DOTALL)
-    if control_replicas_match:
-        install_info["cluster_config"]["control_replicas"] = int(control_replicas_match.group(1))
-    
-    # Network type
-    network_pattern = r'networkType:\s*([^\s\n]+)'
-    network_match = re.search(network_pattern, log_content)
-    if network_match:
-        install_info["cluster_config"]["network_type"] = network_match.group(1)
-    
-    # Platform and region
-    platform_pattern = r'platform:\s*([^\s\n]+):'
-    region_pattern = r'region:\s*([^\s\n]+)'
-    
-    platform_match = re.search(platform_pattern, log_content)
-    if platform_match:
-        install_info["cluster_config"]["platform"] = platform_match.group(1)
-    
-    region_match = re.search(region_pattern, log_content)
-    if region_match:
-        install_info["cluster_config"]["region"] = region_match.group(1)
-    
-    # Extract install duration (clean up quotes)
-    duration_patterns = [
-        r'Time elapsed:\s*([^\n"]+)',
-        r'Install complete!.*?Time elapsed:\s*([^\n"]+)'
-    ]
-    
-    for pattern in duration_patterns:
-        duration_match = re.search(pattern, log_content, re.DOTALL)
-        if duration_match:
-            duration = duration_match.group(1).strip().strip('"')
-            install_info["install_duration"] = duration
-            break
-    
-    # Check if installation was successful
-    if "Install complete!" in log_content:
-        install_info["install_success"] = True
-    elif "level=error" in log_content or "FATAL" in log_content:
-        install_info["install_success"] = False
-    
-    return install_info
+MODEL = CachedLiteLlm(model="ollama_chat/qwen3:4b")
+# Budget of a single tool output in tokens, larger outputs are packed before reaching the model
+TOOL_TOKEN_BUDGET = int(os.environ.get("INSTALLATION_TOOL_TOKEN_BUDGET", DEFAULT_TOKEN_BUDGET))
 
 # Prow tool functions for installation analysis
 async def get_job_metadata_async(job_name: str, build_id: str) -> Dict[str, Any]:
     """Get the metadata and status for a specific Prow job name and build id."""
     url = f"{GCS_URL}/{job_name}/{build_id}/prowjob.json"
     try:
-        async with httpx.AsyncClient() as client:
+        async with async_client() as client:
             response = await client.get(url)
             response.raise_for_status()
             data = response.json()
@@ -169,24 +57,29 @@ async def get_job_metadata_async(job_name: str, build_id: str) -> Dict[str, Any]
     except Exception as e:
         return {"error": f"Failed to fetch job info: {str(e)}"}
 
-async def get_install_logs_async(job_name: str, build_id: str) -> str:
-    """Get installation logs from build-log.txt in installation directories."""
-    # Extract job short name from full job name
+def _job_short_name(job_name: str) -> str:
     job_parts = job_name.split('-')
     if len(job_parts) >= 8:
-        job_short_name = '-'.join(job_parts[7:])  # Everything after the 7th part
-    else:
-        job_short_name = job_name.split('-')[-1]  # Fallback to last part
-    
-    # Try both possible installation directory patterns
-    install_dirs = [
+        return '-'.join(job_parts[7:])  # Everything after the 7th part
+    return job_name.split('-')[-1]  # Fallback to last part
+
+def _install_dirs(job_short_name: str) -> List[str]:
+    return [
         f"artifacts/{job_short_name}/ipi-install-install",
         f"artifacts/{job_short_name}/ipi-install-install-stableinitial"
     ]
+
+async def get_install_logs_async(job_name: str, build_id: str) -> str:
+    """Get installation logs from build-log.txt in installation directories."""
+    # Extract job short name from full job name
+    job_short_name = _job_short_name(job_name)
+    
+    # Try both possible installation directory patterns
+    install_dirs = _install_dirs(job_short_name)
     
     base_url = f"{GCS_URL}/{job_name}/{build_id}"
     
-    async with httpx.AsyncClient() as client:
+    async with async_client() as client:
         for install_dir in install_dirs:
             try:
                 # Get the build-log.txt from this installation directory
@@ -254,18 +147,13 @@ async def get_install_logs_async(job_name: str, build_id: str) -> str:
                 status_text = "SUCCESS" if install_info["install_success"] else "FAILED"
                 result += f"   Status: {status_emoji} {status_text}\n\n"
                 
-                # Add key logs section (first 50 lines and last 50 lines)
-                lines = log_content.split('\n')
-                result += "📝 KEY LOG SECTIONS:\n"
-                result += "--- First 20 lines ---\n"
-                result += '\n'.join(lines[:20]) + "\n\n"
-                
-                if len(lines) > 40:
-                    result += "--- Last 20 lines ---\n"
-                    result += '\n'.join(lines[-20:]) + "\n\n"
-                
-                # Add full log content
-                result += f"📋 FULL INSTALLATION LOG:\n{log_content}"
+                # Add the section index and the section most likely to explain a failure
+                sections = index_log_content(log_url, response.content)
+                result += f"📑 LOG SECTIONS ({len(response.content)} bytes, fetch others with get_install_log_section):\n"
+                result += format_sections(sections)
+                focus = find_section(sections, "failed")
+                result += f"\n📋 SECTION [{focus['id']}] {focus['kind']} {focus['name']}:\n"
+                result += section_text(response.content[focus['start']:focus['end']])
                 
                 return result
                 
@@ -299,36 +187,50 @@ Build ID: {build_id}
 3. Try browsing the base URL manually to see available directories
 4. Use a different job that includes installation steps"""
 
-def run_async_in_thread(coro):
-    """Run async function in a thread to avoid event loop conflicts."""
-    
-    def run_in_thread():
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            return loop.run_until_complete(coro)
-        finally:
-            loop.close()
-    
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        future = executor.submit(run_in_thread)
-        return future.result()
+async def get_install_log_section_async(job_name: str, build_id: str, section: str = "failed") -> str:
+    """Get one section of the installation build-log.txt."""
+    base_url = f"{GCS_URL}/{job_name}/{build_id}"
+    async with async_client() as client:
+        for install_dir in _install_dirs(_job_short_name(job_name)):
+            log_url = f"{base_url}/{install_dir}/build-log.txt"
+            try:
+                sections = await load_index_async(client, log_url)
+                found = find_section(sections, section)
+                if found is None:
+                    return (f"No section '{section}' in {install_dir}/build-log.txt. Available sections:\n"
+                            + format_sections(sections))
+                text = await fetch_section_async(client, log_url, found)
+                return (f"📋 SECTION [{found['id']}] {found['kind']} {found['name']} from {install_dir}/build-log.txt "
+                        f"(lines {found['start_line']}-{found['end_line']}):\n{text}")
+            except httpx.HTTPError:
+                continue
+            except Exception as e:
+                return f"Error fetching installation log section: {str(e)}"
+        return f"Could not find installation logs for {job_name}/{build_id}"
 
-def get_job_metadata_tool(job_name: str, build_id: str):
+async def get_job_metadata_tool(job_name: str, build_id: str):
     """Get metadata and status for a specific Prow job name and build ID."""
-    return run_async_in_thread(get_job_metadata_async(job_name, build_id))
+    return await get_job_metadata_async(job_name, build_id)
 
-def get_install_logs_tool(job_name: str, build_id: str):
+async def get_install_logs_tool(job_name: str, build_id: str):
     """Get installation logs from build-log.txt in installation directories with detailed analysis."""
-    return run_async_in_thread(get_install_logs_async(job_name, build_id))
+    return await get_install_logs_async(job_name, build_id)
+
+async def get_install_log_section_tool(job_name: str, build_id: str, section: str = "failed"):
+    """Get one section of the installation build-log.txt by id, name or 'failed' for the most relevant one."""
+    return await get_install_log_section_async(job_name, build_id, section)
 
 installation_analyst_agent = Agent(
     model=MODEL,
     name="installation_analyst_agent",
     instruction=prompt.INSTALLATION_SPECIALIST_PROMPT,
     output_key="installation_analysis_output",
-    tools=[
+    after_tool_callback=pack_tool_output_callback(
+        TOOL_TOKEN_BUDGET,
+        "Call get_install_log_section_tool with a section id or name from the index for the complete text of one section."),
+    tools=[limited(FETCH)(tool) for tool in (
         get_job_metadata_tool,
         get_install_logs_tool,
-    ],
+        get_install_log_section_tool,
+    )],
 )
\ No newline at end of file
@@ -0,0 +1,232 @@
+"""Single-pass extraction of installation information from build-log.txt."""
+
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Patterns matched against a line (extended with the following blank lines and
+# the next non-blank line, so that `key:\s*value` may still span lines).
+# Each entry is (field, literal that must be present, pattern).
+_LINE_PATTERNS: List[Tuple[str, str, "re.Pattern[str]"]] = [
+    ("installer_version", "openshift-install v", re.compile(r'openshift-install v([^\s"]+)')),
+    ("installer_commit", "built from commit ", re.compile(r'built from commit ([a-f0-9]+)')),
+    ("release_installing", "Installing from release ", re.compile(r'Installing from release ([^\s]+)')),
+    ("release_image", 'release image "', re.compile(r'release image "([^"]+)"')),
+    ("architecture", "architecture:", re.compile(r'architecture:\s*([^\s\n]+)')),
+    ("network_type", "networkType:", re.compile(r'networkType:\s*([^\s\n]+)')),
+    ("platform", "platform:", re.compile(r'platform:\s*([^\s\n]+):')),
+    ("region", "region:", re.compile(r'region:\s*([^\s\n]+)')),
+    ("install_duration", "Time elapsed:", re.compile(r'Time elapsed:\s*([^\n"]+)')),
+]
+
+# Values looked up after the first occurrence of a section key
+_SECTION_PATTERNS: List[Tuple[str, str, str, "re.Pattern[str]"]] = [
+    ("compute_type", "compute:", "type:", re.compile(r'type:\s*([^\s\n]+)')),
+    ("control_type", "controlPlane:", "type:", re.compile(r'type:\s*([^\s\n]+)')),
+    ("compute_replicas", "compute:", "replicas:", re.compile(r'replicas:\s*(\d+)')),
+    ("control_replicas", "controlPlane:", "replicas:", re.compile(r'replicas:\s*(\d+)')),
+]
+
+
+class InstallationInfoExtractor:
+    """Line-oriented state machine extracting installation information.
+
+    Lines are fed one at a time and every field is looked up during the same
+    pass. Fields stop being searched for once found, so the per-line cost drops
+    to a single substring check for the install status once everything is known.
+    The result is identical to searching each pattern over the whole log.
+    """
+
+    def __init__(self):
+        self.found: Dict[str, str] = {}
+        self.install_complete = False
+        # Line pattern fields and section lookups still being searched for
+        self._line_patterns = list(_LINE_PATTERNS)
+        self._section_patterns = list(_SECTION_PATTERNS)
+        # Sections whose key has been seen, values are searched after it
+        self._sections: Dict[str, int] = {}
+        # A non-blank line followed by blank lines, waiting for the next non-blank line
+        self._pending: List[str] = []
+        # Literals still searched for, see _literals()
+        self._literal_cache: Optional[List[str]] = None
+        # Text after 'release image "' while the closing quote hasn't been seen yet
+        self._open_quote: Optional[str] = None
+
+    def feed(self, line: str) -> None:
+        """Process the next line of the log, without its trailing newline."""
+        if not self.install_complete and "Install complete!" in line:
+            self.install_complete = True
+        if self._open_quote is not None:
+            self._continue_quote(line)
+        if line.strip():
+            if self._pending:
+                self._process_pending(line)
+            if not any(literal in line for literal in self._literals()):
+                # Nothing can start on this line, no need to wait for the next one
+                return
+        elif not self._pending:
+            # Blank lines before the first non-blank line can't start a match
+            return
+        self._pending.append(line)
+
+    def feed_lines(self, lines: Iterable[str]) -> "InstallationInfoExtractor":
+        for line in lines:
+            self.feed(line)
+        return self
+
+    def done(self) -> bool:
+        """Whether every field has been found, only the install status may still change."""
+        return not self._line_patterns and not self._section_patterns and self._open_quote is None
+
+    def _literals(self) -> List[str]:
+        # Literals of which at least one is present in every line that can start a match
+        if self._literal_cache is None:
+            literals = {literal for _, literal, _ in self._line_patterns}
+            for _, section, literal, _ in self._section_patterns:
+                literals.add(literal if section in self._sections else section)
+            self._literal_cache = list(literals)
+        return self._literal_cache
+
+    def scan(self, text: str) -> "InstallationInfoExtractor":
+        """Feed a complete log, only visiting the lines that can change the result.
+
+        Equivalent to feeding every line of text, but lines without any of the
+        literals still searched for are skipped, and scanning stops at the first
+        "Install complete!" once all fields are known. The next occurrence of
+        each literal is remembered, so the text is searched once per literal.
+        """
+        position = 0
+        length = len(text)
+        next_occurrence: Dict[str, int] = {}
+        while position < length:
+            if not self._pending and self._open_quote is None:
+                if self.done():
+                    if not self.install_complete:
+                        self.install_complete = text.find("Install complete!", position) != -1
+                    return self
+                candidate = length
+                literals = self._literals() if self.install_complete else self._literals() + ["Install complete!"]
+                for literal in literals:
+                    index = next_occurrence.get(literal, -1)
+                    if index < position:
+                        index = text.find(literal, position)
+                        next_occurrence[literal] = length if index == -1 else index
+                    candidate = min(candidate, next_occurrence[literal])
+                if candidate == length:
+                    return self
+                position = text.rfind("\n", position, candidate) + 1 or position
+            end = text.find("\n", position)
+            if end == -1:
+                end = length
+            self.feed(text[position:end])
+            position = end + 1
+        return self
+
+    def _process_pending(self, next_line: Optional[str]) -> None:
+        # Only the first pending line can start a match, the rest are blank
+        line = self._pending[0]
+        window = "\n".join(self._pending if next_line is None else self._pending + [next_line])
+        self._pending = []
+        self._literal_cache = None
+        if self._line_patterns:
+            self._match_line_patterns(line, window)
+        if self._section_patterns:
+            self._match_section_patterns(line, window)
+
+    def _match_line_patterns(self, line: str, window: str) -> None:
+        remaining = []
+        for field, literal, pattern in self._line_patterns:
+            if literal in line:
+                match = pattern.search(window)
+                if match and match.start() < len(line):
+                    self.found[field] = match.group(1)
+                    continue
+                if field == "release_image" and self._open_quote is None:
+                    # The quoted value may continue on the following lines
+                    start = self._unterminated_quote(line, literal)
+                    if start is not None:
+                        self._open_quote = line[start:]
+                        self._continue_quote(window[len(line) + 1:])
+                        continue
+            remaining.append((field, literal, pattern))
+        if "release_installing" in self.found:
+            # 'Installing from release' takes precedence over 'release image'
+            remaining = [entry for entry in remaining if entry[0] != "release_image"]
+            self._open_quote = None
+        self._line_patterns = remaining
+
+    @staticmethod
+    def _unterminated_quote(line: str, literal: str) -> Optional[int]:
+        index = line.find(literal)
+        while index != -1:
+            if '"' not in line[index + len(literal):]:
+                return index
+            index = line.find(literal, index + 1)
+        return None
+
+    def _continue_quote(self, text: str) -> None:
+        self._open_quote += "\n" + text
+        if '"' in text:
+            match = re.match(r'release image "([^"]+)"', self._open_quote)
+            if match:
+                self.found["release_image"] = match.group(1)
+            self._open_quote = None
+
+    def _match_section_patterns(self, line: str, window: str) -> None:
+        # Offset in this line from which each started section is searched
+        starts: Dict[str, int] = {}
+        for _, section, _, _ in self._section_patterns:
+            if section in self._sections:
+                starts[section] = 0
+            else:
+                index = line.find(section)
+                if index != -1:
+                    starts[section] = index + len(section)
+
+        remaining = []
+        for field, section, literal, pattern in self._section_patterns:
+            start = starts.get(section)
+            if start is not None and literal in line[start:]:
+                match = pattern.search(window, start)
+                if match and match.start() < len(line):
+                    self.found[field] = match.group(1)
+                    continue
+            remaining.append((field, section, literal, pattern))
+        self._section_patterns = remaining
+        self._sections.update(starts)
+
+    def result(self) -> Dict[str, Any]:
+        """Flush the last lines and return the extracted information."""
+        if self._pending:
+            self._process_pending(None)
+        install_info = {
+            "installer_version": self.found.get("installer_version"),
+            "installer_commit": self.found.get("installer_commit"),
+            "release_image": self.found.get("release_installing") or self.found.get("release_image"),
+            "instance_types": {},
+            "install_duration": None,
+            "architecture": self.found.get("architecture"),
+            "cluster_config": {},
+            "install_success": self.install_complete,
+        }
+        if "compute_type" in self.found:
+            install_info["instance_types"]["compute"] = self.found["compute_type"]
+        if "control_type" in self.found:
+            install_info["instance_types"]["control_plane"] = self.found["control_type"]
+        if "compute_replicas" in self.found:
+            install_info["cluster_config"]["compute_replicas"] = int(self.found["compute_replicas"])
+        if "control_replicas" in self.found:
+            install_info["cluster_config"]["control_replicas"] = int(self.found["control_replicas"])
+        if "network_type" in self.found:
+            install_info["cluster_config"]["network_type"] = self.found["network_type"]
+        if "platform" in self.found:
+            install_info["cluster_config"]["platform"] = self.found["platform"]
+        if "region" in self.found:
+            install_info["cluster_config"]["region"] = self.found["region"]
+        if "install_duration" in self.found:
+            install_info["install_duration"] = self.found["install_duration"].strip().strip('"')
+        return install_info
+
+
+def extract_installation_info(log_content: str) -> Dict[str, Any]:
+    """Extract installation information from build-log.txt."""
+    return InstallationInfoExtractor().scan(log_content).result()
@@ -46,7 +46,8 @@ KEY METRICS TO EXTRACT AND ANALYZE:
 
 Available tools:
 - get_job_metadata: Get basic job information and metadata
-- get_install_logs: Fetch and analyze build-log.txt with structured information extraction
+- get_install_logs: Fetch and analyze build-log.txt with structured information extraction, an index of the log sections and the section most likely to explain a failure
+- get_install_log_section: Fetch one more section of build-log.txt by its id or name from the section index
 
 ANALYSIS WORKFLOW:
 1. Start with job metadata to understand the test context
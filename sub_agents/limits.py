@@ -0,0 +1,79 @@
+"""Process-wide concurrency limits on log fetches, Drain mining and model calls.
+
+Every kind of work is unlimited unless configured, through the environment or
+configure(). The batch runner sets them so that many triages running at once
+don't overload gcsweb, the CPU or the model server.
+"""
+
+import os
+import asyncio
+import functools
+from typing import Dict, Optional
+
+FETCH = "fetch"
+DRAIN = "drain"
+MODEL = "model"
+
+_ENVIRONMENT = {
+    FETCH: "CI_ANALYSIS_FETCH_CONCURRENCY",
+    DRAIN: "CI_ANALYSIS_DRAIN_CONCURRENCY",
+    MODEL: "CI_ANALYSIS_MODEL_CONCURRENCY",
+}
+
+
+class Limit:
+    """An asyncio semaphore whose size can be changed until it is first used.
+
+    A size of 0 or None means unlimited.
+    """
+
+    def __init__(self, name: str, size: Optional[int] = None):
+        self.name = name
+        self.size = size or None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.waiting = 0
+        self.running = 0
+
+    def configure(self, size: Optional[int]) -> None:
+        self.size = size or None
+        self._semaphore = None
+
+    async def __aenter__(self) -> "Limit":
+        if self.size is not None:
+            if self._semaphore is None:
+                self._semaphore = asyncio.Semaphore(self.size)
+            self.waiting += 1
+            try:
+                await self._semaphore.acquire()
+            finally:
+                self.waiting -= 1
+        self.running += 1
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.running -= 1
+        if self._semaphore is not None:
+            self._semaphore.release()
+
+
+LIMITS: Dict[str, Limit] = {
+    name: Limit(name, int(os.environ.get(variable, "0"))) for name, variable in _ENVIRONMENT.items()
+}
+
+
+def configure(fetch: Optional[int] = None, drain: Optional[int] = None, model: Optional[int] = None) -> None:
+    """Set the limits given, leaving the others as they are."""
+    for name, size in ((FETCH, fetch), (DRAIN, drain), (MODEL, model)):
+        if size is not None:
+            LIMITS[name].configure(size)
+
+
+def limited(kind: str):
+    """Decorate an async tool so that it runs within the limit of its kind."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            async with LIMITS[kind]:
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,246 @@
+"""On-disk cache of model responses shared by the coordinator and the specialists.
+
+Analyzing the same finished build again sends the model the same instruction,
+the same conversation and the same tool results, so its responses are looked
+up by a hash of them before calling the model. Entries expire after a TTL and
+least recently used entries are evicted when the cache grows over its size.
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
+
+from google.adk.models.lite_llm import LiteLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from sub_agents.limits import LIMITS, MODEL
+
+LOG = logging.getLogger("ci_analysis")
+
+# Bump when the key or the entry format changes, older entries are then ignored
+CACHE_VERSION = 1
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "ci_analysis_agent", "llm_cache")
+# Default entry lifetime (1 day) and total size (256 MiB)
+DEFAULT_TTL = 24 * 3600
+DEFAULT_MAX_BYTES = 256 * 1024 ** 2
+
+
+def _normalize_part(part: types.Part) -> Optional[Dict[str, Any]]:
+    # Function call ids are generated anew for every run and are left out
+    if part.text is not None:
+        if part.thought:
+            return None
+        return {"text": part.text.strip()}
+    if part.function_call is not None:
+        return {"function_call": {"name": part.function_call.name, "args": part.function_call.args or {}}}
+    if part.function_response is not None:
+        return {"function_response": {"name": part.function_response.name,
+                                      "response": part.function_response.response or {}}}
+    if part.inline_data is not None:
+        return {"inline_data": hashlib.sha256(part.inline_data.data or b"").hexdigest()}
+    return None
+
+
+def _normalize_content(content: types.Content) -> Dict[str, Any]:
+    parts = [_normalize_part(part) for part in content.parts or []]
+    return {"role": content.role, "parts": [part for part in parts if part is not None]}
+
+
+def request_key(model: str, llm_request: LlmRequest) -> str:
+    """Hash of the model, instruction, tools and conversation of a request."""
+    config = llm_request.config
+    tools = []
+    for tool in config.tools or []:
+        for declaration in getattr(tool, "function_declarations", None) or []:
+            tools.append(declaration.model_dump(mode="json", exclude_none=True))
+    key = {
+        "version": CACHE_VERSION,
+        "model": llm_request.model or model,
+        "instruction": str(config.system_instruction or ""),
+        "tools": tools,
+        "temperature": config.temperature,
+        "contents": [_normalize_content(content) for content in llm_request.contents],
+    }
+    data = json.dumps(key, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Model responses stored as one JSON file per key below root.
+
+    Files are written to a temporary name and renamed into place, so readers
+    never see a partial entry. Reading an entry refreshes its modification
+    time, which orders the eviction.
+    """
+
+    def __init__(self, root: str, ttl: float = DEFAULT_TTL, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = os.path.abspath(root)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        if entry.get("version") != CACHE_VERSION or time.time() - entry.get("created", 0) > self.ttl:
+            self._remove(path)
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return entry["responses"]
+
+    def put(self, key: str, responses: List[Dict[str, Any]]) -> None:
+        path = self._path(key)
+        data = json.dumps({"version": CACHE_VERSION, "created": time.time(), "responses": responses},
+                          ensure_ascii=False)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(data)
+            previous = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+        except OSError as e:
+            LOG.warning("Could not write the model response cache entry %s: %s", path, e)
+            return
+        with self._lock:
+            self._size = self._current_size() + os.path.getsize(path) - previous
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _remove(self, path: str) -> None:
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            if self._size is not None:
+                self._size -= size
+
+    def _entries(self) -> List[Tuple[str, os.stat_result]]:
+        entries = []
+        for root, _, files in os.walk(self.root):
+            for name in files:
+                if name.endswith(".json"):
+                    path = os.path.join(root, name)
+                    try:
+                        entries.append((path, os.stat(path)))
+                    except OSError:
+                        continue
+        return entries
+
+    def _current_size(self) -> int:
+        # Computed once, then kept up to date by put() and _remove()
+        if self._size is None:
+            self._size = sum(stat.st_size for _, stat in self._entries())
+        return self._size
+
+    def _evict(self) -> None:
+        """Remove expired entries, then the least recently used ones, until the cache is 10% below max_bytes."""
+        entries = sorted(self._entries(), key=lambda entry: entry[1].st_mtime)
+        size = sum(stat.st_size for _, stat in entries)
+        target = self.max_bytes * 0.9
+        now = time.time()
+        for path, stat in entries:
+            if size <= target and now - stat.st_mtime <= self.ttl:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            size -= stat.st_size
+        self._size = size
+
+    def clear(self) -> None:
+        with self._lock:
+            for path, _ in self._entries():
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+            self._size = 0
+
+
+def _default_cache() -> Optional[ResponseCache]:
+    if os.environ.get("CI_ANALYSIS_LLM_CACHE", "1").lower() in ("0", "false", "no", "off"):
+        return None
+    return ResponseCache(
+        os.environ.get("CI_ANALYSIS_LLM_CACHE_DIR", DEFAULT_CACHE_DIR),
+        ttl=float(os.environ.get("CI_ANALYSIS_LLM_CACHE_TTL", DEFAULT_TTL)),
+        max_bytes=int(os.environ.get("CI_ANALYSIS_LLM_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+    )
+
+
+# Shared by all agents of the process, None when caching is disabled
+RESPONSE_CACHE = _default_cache()
+
+
+class CachedLiteLlm(LiteLlm):
+    """LiteLlm answering repeated requests from RESPONSE_CACHE.
+
+    Model calls run within the MODEL limit of sub_agents.limits, cache hits
+    don't. The limit is released before the responses are yielded: ADK runs
+    the function calls of a response, specialists included, while this
+    generator is suspended, and these need a model slot of their own. Only complete answers are stored: partial streaming chunks are left out
+    and nothing is stored when the model reported an error. Responses served
+    from the cache carry {"llm_cache": "hit"} in their custom_metadata.
+    """
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        cache = RESPONSE_CACHE
+        if cache is None:
+            for response in await self._generate(llm_request, stream):
+                yield response
+            return
+
+        key = request_key(self.model, llm_request)
+        cached = cache.get(key)
+        if cached is not None:
+            LOG.debug("Model response cache hit %s", key)
+            for data in cached:
+                response = LlmResponse.model_validate(data)
+                response.custom_metadata = {**(response.custom_metadata or {}), "llm_cache": "hit"}
+                yield response
+            return
+
+        responses = []
+        failed = False
+        for response in await self._generate(llm_request, stream):
+            if response.error_code:
+                failed = True
+            elif not response.partial:
+                responses.append(response.model_dump(mode="json", exclude_none=True))
+            yield response
+        if responses and not failed:
+            cache.put(key, responses)
+
+    async def _generate(self, llm_request: LlmRequest, stream: bool) -> List[LlmResponse]:
+        """All responses of one model call, made within the MODEL limit."""
+        async with LIMITS[MODEL]:
+            return [response async for response in super().generate_content_async(llm_request, stream)]
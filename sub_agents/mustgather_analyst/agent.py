@@ -1,12 +1,34 @@
+import os
+import asyncio
+import functools
+
 from google.adk import Agent
 from . import prompt
-from .must_gather import get_must_gather, list_directory, read_drained_file, get_file_info, search_files
-MODEL = "ollama/qwen3:4b"
+from sub_agents.context_packer import DEFAULT_TOKEN_BUDGET, pack_tool_output_callback
+from sub_agents.limits import DRAIN, FETCH, limited
+from sub_agents.llm_cache import CachedLiteLlm
+from .must_gather import get_must_gather, get_cluster_summary, query_timeline, list_directory, read_drained_file, read_drained_files, get_file_info, search_files
+MODEL = CachedLiteLlm(model="ollama/qwen3:4b")
+# Budget of a single tool output in tokens, larger outputs are packed before reaching the model
+TOOL_TOKEN_BUDGET = int(os.environ.get("MUST_GATHER_TOOL_TOKEN_BUDGET", DEFAULT_TOKEN_BUDGET))
+
+
+def in_thread(func):
+    """Run a blocking tool in a worker thread, so that agents running alongside aren't blocked."""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await asyncio.to_thread(func, *args, **kwargs)
+    return wrapper
+
 
 mustgather_analyst_agent = Agent(
     model=MODEL,
     name="mustgather_analyst_agent",
     instruction=prompt.MUST_GATHER_SPECIALIST_PROMPT,
     output_key="must_gather_analysis_output",
-    tools=[get_must_gather, list_directory, read_drained_file, get_file_info, search_files],
+    after_tool_callback=pack_tool_output_callback(
+        TOOL_TOKEN_BUDGET, "Narrow the request: read_drained_file on a single file or read_drained_files with a smaller top_n."),
+    tools=[limited(FETCH)(in_thread(get_must_gather))] + [
+        limited(DRAIN)(in_thread(tool)) for tool in (get_cluster_summary, query_timeline, list_directory, read_drained_file, read_drained_files, get_file_info, search_files)
+    ],
 )
\ No newline at end of file
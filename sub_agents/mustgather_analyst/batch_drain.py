@@ -0,0 +1,152 @@
+import os
+import glob
+import time
+import logging
+import concurrent.futures
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from .drain import DrainExtractor
+    from .log_reader import DEADLINE_CHECK_INTERVAL, LogReader
+except ImportError:
+    from drain import DrainExtractor
+    from log_reader import DEADLINE_CHECK_INTERVAL, LogReader
+from sub_agents.tracing import span
+
+# Set up logging
+LOG = logging.getLogger("drain")
+
+# Maximum number of clusters mined per file and after merging
+MAX_CLUSTERS = 1000
+
+# Maximum length of the example chunk returned for each template
+MAX_EXAMPLE_LENGTH = 500
+
+SORT_KEYS = ("occurrences", "files")
+
+
+def find_log_files(path: str) -> List[str]:
+    """Resolve a directory (all *.log files below it) or a glob pattern into files."""
+    if os.path.isdir(path):
+        found = []
+        for root, _, files in os.walk(path):
+            found.extend(os.path.join(root, name) for name in files if name.endswith(".log"))
+        return sorted(found)
+    return sorted(p for p in glob.glob(path, recursive=True) if os.path.isfile(p))
+
+
+def drain_file(path: str) -> List[Tuple[str, int, int, str]]:
+    """Mine the templates of a single log file.
+
+    Large files are sampled by LogReader, the same way read_drained_file does.
+
+    Returns:
+        list: One (template, occurrences, line_number, example_chunk) tuple per cluster.
+    """
+    extractor = DrainExtractor(verbose=False, context=False, max_clusters=MAX_CLUSTERS)
+    examples: Dict[int, Tuple[int, str]] = {}
+    with LogReader(path) as reader:
+        deadline = time.monotonic() + reader.max_seconds
+        for index, (_, _, line_number, chunk) in enumerate(reader.chunks()):
+            result = extractor.miner.add_log_message(chunk)
+            examples.setdefault(result["cluster_id"], (line_number, chunk))
+            if index % DEADLINE_CHECK_INTERVAL == 0 and time.monotonic() > deadline:
+                LOG.warning("Time budget exhausted while draining %s", path)
+                break
+
+    templates = []
+    for cluster in extractor.miner.drain.clusters:
+        line_number, chunk = examples.get(cluster.cluster_id, (0, ""))
+        templates.append((cluster.get_template(), cluster.size, line_number, chunk))
+    return templates
+
+
+def merge_templates(per_file: List[Tuple[str, List[Tuple[str, int, int, str]]]]) -> List[Dict[str, Any]]:
+    """Merge per-file templates into cross-file clusters.
+
+    Every per-file template is mined again by a single Drain instance, so
+    templates that differ only in variable tokens end up in the same cluster.
+    """
+    merger = DrainExtractor(verbose=False, context=False, max_clusters=MAX_CLUSTERS)
+    merged: Dict[int, Dict[str, Any]] = {}
+    for path, templates in per_file:
+        for template, occurrences, line_number, chunk in templates:
+            cluster_id = merger.miner.add_log_message(template)["cluster_id"]
+            entry = merged.setdefault(cluster_id, {
+                "occurrences": 0,
+                "files": set(),
+                "example_occurrences": -1,
+            })
+            entry["occurrences"] += occurrences
+            entry["files"].add(path)
+            # Keep the example of the file contributing most occurrences
+            if occurrences > entry["example_occurrences"]:
+                entry["example_occurrences"] = occurrences
+                entry["example"] = {
+                    "path": path,
+                    "line_number": line_number,
+                    "chunk": chunk.strip()[:MAX_EXAMPLE_LENGTH],
+                }
+
+    templates = {cluster.cluster_id: cluster.get_template() for cluster in merger.miner.drain.clusters}
+    results = []
+    for cluster_id, entry in merged.items():
+        results.append({
+            "template": templates.get(cluster_id, ""),
+            "occurrences": entry["occurrences"],
+            "file_count": len(entry["files"]),
+            "example": entry["example"],
+        })
+    return results
+
+
+def drain_files(path: str, top_n: int = 50, sort_by: str = "occurrences",
+                max_workers: Optional[int] = None) -> Dict[str, Any]:
+    """Drain all matching log files in a process pool and rank the merged templates.
+
+    Args:
+        path: A directory (all *.log files below it are used) or a glob pattern
+        top_n: Number of templates to return
+        sort_by: 'occurrences' or 'files' (number of files a template shows up in)
+        max_workers: Number of worker processes, MUST_GATHER_DRAIN_WORKERS or the CPU count by default
+    Returns:
+        dict: The ranked templates along with processed and failed files.
+    """
+    files = find_log_files(path)
+    if max_workers is None:
+        max_workers = int(os.environ.get("MUST_GATHER_DRAIN_WORKERS", os.cpu_count() or 1))
+
+    per_file = []
+    failed = []
+    with span("drain.files", path=path, count=len(files), workers=max_workers) as files_span:
+        if max_workers <= 1 or len(files) <= 1:
+            for file_path in files:
+                try:
+                    per_file.append((file_path, drain_file(file_path)))
+                except Exception as e:
+                    failed.append({"path": file_path, "error": str(e)})
+        else:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+                futures = {executor.submit(drain_file, file_path): file_path for file_path in files}
+                for future in concurrent.futures.as_completed(futures):
+                    file_path = futures[future]
+                    try:
+                        per_file.append((file_path, future.result()))
+                    except Exception as e:
+                        failed.append({"path": file_path, "error": str(e)})
+            # Merge in a stable order regardless of completion order
+            per_file.sort(key=lambda it: it[0])
+        files_span.set_attribute("bytes", sum(os.path.getsize(file_path) for file_path, _ in per_file))
+
+    with span("drain.merge", count=len(per_file)):
+        templates = merge_templates(per_file)
+    if sort_by == "files":
+        templates.sort(key=lambda it: (it["file_count"], it["occurrences"]), reverse=True)
+    else:
+        templates.sort(key=lambda it: (it["occurrences"], it["file_count"]), reverse=True)
+    return {
+        "files_processed": len(per_file),
+        "files_failed": failed,
+        "template_count": len(templates),
+        "templates": templates[:top_n],
+    }
@@ -0,0 +1,309 @@
+import os
+import json
+import logging
+import concurrent.futures
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import yaml
+
+try:
+    from .workspace import refresh_entry_size
+except ImportError:
+    from workspace import refresh_entry_size
+
+# Prefer the libyaml based loader, it is an order of magnitude faster
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
+
+# Set up logging
+LOG = logging.getLogger("must_gather")
+
+SUMMARY_FILE = ".cluster_summary.json"
+SUMMARY_VERSION = 1
+
+# Maximum length of condition messages kept in the summary
+MAX_MESSAGE_LENGTH = 300
+
+# Pods restarting at least this often are reported as problems
+RESTART_THRESHOLD = 3
+
+SECTIONS = ("problems", "operators", "nodes", "pods", "conditions", "all")
+
+
+def _truncate(message: Optional[str]) -> str:
+    message = (message or "").strip()
+    if len(message) > MAX_MESSAGE_LENGTH:
+        return message[:MAX_MESSAGE_LENGTH] + "..."
+    return message
+
+
+def load_yaml_objects(path: str) -> List[dict]:
+    """Load a must-gather YAML file, flattening List kinds into their items."""
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        documents = list(yaml.load_all(f, Loader=YamlLoader))
+    objects = []
+    for document in documents:
+        if not isinstance(document, dict):
+            continue
+        if document.get("kind", "").endswith("List") and isinstance(document.get("items"), list):
+            objects.extend(item for item in document["items"] if isinstance(item, dict))
+        else:
+            objects.append(document)
+    return objects
+
+
+def _timestamp(value: Any) -> str:
+    # The YAML loader turns unquoted RFC 3339 timestamps into datetime objects
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.strftime("%Y-%m-%dT%H:%M:%SZ")
+    return str(value or "")
+
+
+def _condition(kind: str, metadata: dict, condition: dict) -> dict:
+    return {
+        "kind": kind,
+        "namespace": metadata.get("namespace", ""),
+        "name": metadata.get("name", ""),
+        "type": condition.get("type"),
+        "status": condition.get("status"),
+        "reason": condition.get("reason", ""),
+        "message": _truncate(condition.get("message")),
+        "last_transition_time": _timestamp(condition.get("lastTransitionTime")),
+    }
+
+
+def _summarize_operator(obj: dict) -> Dict[str, Any]:
+    metadata = obj.get("metadata", {})
+    conditions = {c.get("type"): c for c in obj.get("status", {}).get("conditions") or []}
+    record = {"name": metadata.get("name", "")}
+    for condition_type in ("Available", "Progressing", "Degraded"):
+        record[condition_type.lower()] = conditions.get(condition_type, {}).get("status", "Unknown")
+    versions = obj.get("status", {}).get("versions") or []
+    record["version"] = next((v.get("version") for v in versions if v.get("name") == "operator"), None)
+    record["problem"] = record["available"] != "True" or record["degraded"] == "True"
+
+    failing = []
+    for condition_type, condition in conditions.items():
+        if (condition_type == "Degraded" and condition.get("status") == "True") or \
+                (condition_type == "Available" and condition.get("status") != "True"):
+            failing.append(_condition("ClusterOperator", metadata, condition))
+    return {"operators": [record], "conditions": failing}
+
+
+def _summarize_node(obj: dict) -> Dict[str, Any]:
+    metadata = obj.get("metadata", {})
+    status = obj.get("status", {})
+    labels = metadata.get("labels") or {}
+    roles = sorted(label.split("/", 1)[1] for label in labels if label.startswith("node-role.kubernetes.io/"))
+    record = {
+        "name": metadata.get("name", ""),
+        "roles": roles,
+        "architecture": (status.get("nodeInfo") or {}).get("architecture"),
+        "ready": "Unknown",
+        "unschedulable": bool((obj.get("spec") or {}).get("unschedulable")),
+        "pressure": [],
+    }
+    failing = []
+    for condition in status.get("conditions") or []:
+        if condition.get("type") == "Ready":
+            record["ready"] = condition.get("status", "Unknown")
+            if record["ready"] != "True":
+                failing.append(_condition("Node", metadata, condition))
+        elif condition.get("status") == "True":
+            # MemoryPressure, DiskPressure, PIDPressure, NetworkUnavailable
+            record["pressure"].append(condition.get("type"))
+            failing.append(_condition("Node", metadata, condition))
+    record["problem"] = record["ready"] != "True" or bool(record["pressure"])
+    return {"nodes": [record], "conditions": failing}
+
+
+def _summarize_pod(obj: dict) -> Dict[str, Any]:
+    metadata = obj.get("metadata", {})
+    status = obj.get("status", {})
+    statuses = (status.get("initContainerStatuses") or []) + (status.get("containerStatuses") or [])
+    waiting = []
+    terminated = []
+    for container in statuses:
+        state = container.get("state") or {}
+        if "waiting" in state and (state["waiting"] or {}).get("reason"):
+            waiting.append(f"{container.get('name')}: {state['waiting']['reason']}")
+        last_state = (container.get("lastState") or {}).get("terminated")
+        if last_state and last_state.get("reason"):
+            terminated.append(f"{container.get('name')}: {last_state['reason']} (exit code {last_state.get('exitCode')})")
+    record = {
+        "namespace": metadata.get("namespace", ""),
+        "name": metadata.get("name", ""),
+        "node": (obj.get("spec") or {}).get("nodeName"),
+        "phase": status.get("phase", "Unknown"),
+        "ready": all(container.get("ready") for container in status.get("containerStatuses") or []),
+        "restarts": sum(container.get("restartCount") or 0 for container in statuses),
+        "waiting_reasons": waiting,
+        "last_termination_reasons": terminated,
+    }
+    record["problem"] = record["phase"] not in ("Running", "Succeeded") or bool(waiting) or \
+        record["restarts"] >= RESTART_THRESHOLD or \
+        (record["phase"] == "Running" and not record["ready"])
+
+    failing = []
+    if record["problem"]:
+        for condition in status.get("conditions") or []:
+            if condition.get("status") != "True":
+                failing.append(_condition("Pod", metadata, condition))
+    return {"pods": [record], "conditions": failing}
+
+
+_SUMMARIZERS = {
+    "ClusterOperator": _summarize_operator,
+    "Node": _summarize_node,
+    "Pod": _summarize_pod,
+}
+
+
+def summarize_file(path: str) -> Dict[str, Any]:
+    """Parse one resource file and return its compact summary records."""
+    result: Dict[str, Any] = {"operators": [], "nodes": [], "pods": [], "conditions": [], "errors": []}
+    try:
+        objects = load_yaml_objects(path)
+    except Exception as e:
+        result["errors"].append(f"{path}: {e}")
+        return result
+    for obj in objects:
+        summarizer = _SUMMARIZERS.get(obj.get("kind"))
+        if summarizer is None:
+            continue
+        for key, records in summarizer(obj).items():
+            result[key].extend(records)
+    return result
+
+
+def find_resource_files(root: str) -> List[str]:
+    """Find the must-gather files describing cluster operators, nodes and pods."""
+    found = []
+    for dirpath, _, files in os.walk(root):
+        parent = os.path.basename(dirpath)
+        for name in files:
+            if not name.endswith((".yaml", ".yml")):
+                continue
+            path = os.path.join(dirpath, name)
+            if parent in ("clusteroperators", "nodes") and "cluster-scoped-resources" in dirpath:
+                found.append(path)
+            elif name == "pods.yaml" and parent == "core":
+                found.append(path)
+            elif os.path.basename(os.path.dirname(dirpath)) == "pods" and name == f"{parent}.yaml":
+                # namespaces/<namespace>/pods/<pod>/<pod>.yaml
+                found.append(path)
+    return sorted(found)
+
+
+def build_cluster_summary(root: str, max_workers: Optional[int] = None) -> Dict[str, Any]:
+    """Parse all cluster resources of a must-gather in parallel into a status index.
+
+    Args:
+        root: The must-gather directory
+        max_workers: Number of parser processes, MUST_GATHER_SUMMARY_WORKERS or the CPU count by default
+    Returns:
+        dict: The summary with 'operators', 'nodes', 'pods' and 'conditions' lists.
+    """
+    files = find_resource_files(root)
+    if max_workers is None:
+        max_workers = int(os.environ.get("MUST_GATHER_SUMMARY_WORKERS", os.cpu_count() or 1))
+
+    if max_workers <= 1 or len(files) < 2 * max_workers:
+        partials = map(summarize_file, files)
+        summary = _merge(partials)
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+            summary = _merge(executor.map(summarize_file, files, chunksize=8))
+
+    summary["version"] = SUMMARY_VERSION
+    summary["files_parsed"] = len(files)
+    return summary
+
+
+def _merge(partials) -> Dict[str, Any]:
+    summary: Dict[str, Any] = {"operators": {}, "nodes": {}, "pods": {}, "conditions": {}, "errors": []}
+    for partial in partials:
+        # The same pod shows up in pods.yaml and in its own directory, de-duplicate
+        for record in partial["operators"]:
+            summary["operators"][record["name"]] = record
+        for record in partial["nodes"]:
+            summary["nodes"][record["name"]] = record
+        for record in partial["pods"]:
+            summary["pods"][(record["namespace"], record["name"])] = record
+        for record in partial["conditions"]:
+            summary["conditions"][(record["kind"], record["namespace"], record["name"], record["type"])] = record
+        summary["errors"].extend(partial["errors"])
+    return {
+        "operators": sorted(summary["operators"].values(), key=lambda it: it["name"]),
+        "nodes": sorted(summary["nodes"].values(), key=lambda it: it["name"]),
+        "pods": sorted(summary["pods"].values(), key=lambda it: (-it["restarts"], it["namespace"], it["name"])),
+        "conditions": sorted(summary["conditions"].values(), key=lambda it: it["last_transition_time"]),
+        "errors": summary["errors"],
+    }
+
+
+def load_cluster_summary(root: str) -> Dict[str, Any]:
+    """Return the stored summary of a must-gather, building it on first use."""
+    summary_path = os.path.join(root, SUMMARY_FILE)
+    try:
+        with open(summary_path, 'r', encoding='utf-8') as f:
+            summary = json.load(f)
+        if summary.get("version") == SUMMARY_VERSION:
+            return summary
+    except (OSError, ValueError):
+        pass
+
+    summary = build_cluster_summary(root)
+    tmp_path = summary_path + ".tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f)
+        os.replace(tmp_path, summary_path)
+    except OSError as e:
+        LOG.warning("Could not store cluster summary in %s: %s", summary_path, e)
+    else:
+        # The stored summary counts against the workspace quota
+        refresh_entry_size(root)
+    return summary
+
+
+def query_cluster_summary(summary: Dict[str, Any], section: str = "problems", namespace: str = "") -> Dict[str, Any]:
+    """Select a section of a cluster summary, optionally restricted to one namespace."""
+    pods = summary["pods"]
+    conditions = summary["conditions"]
+    if namespace:
+        pods = [pod for pod in pods if pod["namespace"] == namespace]
+        conditions = [c for c in conditions if c["namespace"] == namespace]
+
+    result: Dict[str, Any] = {
+        "counts": {
+            "operators": len(summary["operators"]),
+            "degraded_operators": sum(1 for op in summary["operators"] if op["degraded"] == "True"),
+            "unavailable_operators": sum(1 for op in summary["operators"] if op["available"] != "True"),
+            "nodes": len(summary["nodes"]),
+            "not_ready_nodes": sum(1 for node in summary["nodes"] if node["ready"] != "True"),
+            "pods": len(pods),
+            "problem_pods": sum(1 for pod in pods if pod["problem"]),
+        }
+    }
+    if section == "problems":
+        result["operators"] = [op for op in summary["operators"] if op["problem"]]
+        result["nodes"] = [node for node in summary["nodes"] if node["problem"]]
+        result["pods"] = [pod for pod in pods if pod["problem"]]
+        result["conditions"] = conditions
+    elif section == "all":
+        result.update(operators=summary["operators"], nodes=summary["nodes"], pods=pods, conditions=conditions)
+    elif section in ("operators", "nodes"):
+        result[section] = summary[section]
+    elif section == "pods":
+        result["pods"] = pods
+    elif section == "conditions":
+        result["conditions"] = conditions
+    if summary.get("errors"):
+        result["parse_errors"] = summary["errors"][:10]
+    return result
@@ -4,7 +4,6 @@ from typing import Tuple, Generator, Dict, List, Any, Optional
 
 import drain3
 from drain3.template_miner_config import TemplateMinerConfig
-from mcp.server.fastmcp import FastMCP
 
 
 
@@ -0,0 +1,161 @@
+import os
+import mmap
+import time
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    from .drain import DrainExtractor, get_chunks
+except ImportError:
+    from drain import DrainExtractor, get_chunks
+from sub_agents.tracing import span
+
+# Set up logging
+LOG = logging.getLogger("drain")
+
+# Files above this size are sampled instead of read completely
+DEFAULT_MAX_BYTES = 32 * 1024 ** 2
+# Time after which mining stops and the patterns found so far are returned
+DEFAULT_MAX_SECONDS = 120.0
+
+# Size of the blocks decoded at once
+BLOCK_SIZE = 4 * 1024 ** 2
+# Number of windows spread over the middle of a sampled file
+SAMPLE_WINDOWS = 16
+# How often (in chunks) the time budget is checked
+DEADLINE_CHECK_INTERVAL = 1000
+
+
+class LogReader:
+    """Memory-mapped, size-aware reader for potentially huge log files.
+
+    Files within the byte budget are streamed completely. Larger files are
+    sampled: the head, the tail and evenly strided windows of the middle,
+    together never exceeding the budget. Text is decoded block by block with
+    invalid bytes replaced, so neither memory usage nor a single bad byte
+    depends on the size of the file.
+    """
+
+    def __init__(self, path: str, max_bytes: Optional[int] = None, max_seconds: Optional[float] = None):
+        self.path = path
+        if max_bytes is None:
+            max_bytes = int(os.environ.get("MUST_GATHER_READ_MAX_BYTES", DEFAULT_MAX_BYTES))
+        if max_seconds is None:
+            max_seconds = float(os.environ.get("MUST_GATHER_READ_MAX_SECONDS", DEFAULT_MAX_SECONDS))
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.size = os.path.getsize(path)
+        self.sampled = self.size > max_bytes
+        self._file = None
+        self._mmap = None
+
+    def __enter__(self):
+        self._file = open(self.path, 'rb')
+        # Empty files can't be mapped
+        if self.size:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+        self._file = None
+
+    def regions(self) -> List[Tuple[str, int, int]]:
+        """Return the (name, start, end) byte ranges that are read."""
+        if not self.size:
+            return []
+        if not self.sampled:
+            return [("full", 0, self.size)]
+        head = tail = self.max_bytes // 4
+        window = (self.max_bytes - head - tail) // SAMPLE_WINDOWS
+        stride = (self.size - head - tail) // SAMPLE_WINDOWS
+        regions = [("head", 0, head)]
+        for k in range(SAMPLE_WINDOWS):
+            start = head + k * stride + (stride - window) // 2
+            regions.append(("sample", start, start + window))
+        regions.append(("tail", self.size - tail, self.size))
+        return regions
+
+    def _align(self, start: int, end: int) -> Tuple[int, int]:
+        # Only complete lines are read: skip the partial first line of
+        # regions not starting at the beginning of the file
+        if start > 0 and self._mmap[start - 1:start] != b"\n":
+            newline = self._mmap.find(b"\n", start, end)
+            start = end if newline == -1 else newline + 1
+        return start, end
+
+    def segments(self) -> Iterator[Tuple[str, int, int, str]]:
+        """Yield (region, region_offset, first_line, text) blocks ending on line boundaries."""
+        for name, start, end in self.regions():
+            start, end = self._align(start, end)
+            line = 0
+            position = start
+            while position < end:
+                block_end = min(position + BLOCK_SIZE, end)
+                if block_end < end:
+                    newline = self._mmap.rfind(b"\n", position, block_end)
+                    if newline != -1:
+                        block_end = newline + 1
+                # Newlines never occur inside multi-byte sequences, so
+                # decoding per block only splits lines longer than a block
+                text = self._mmap[position:block_end].decode('utf-8', errors='replace')
+                yield name, start, line, text
+                line += text.count("\n")
+                position = block_end
+
+    def chunks(self) -> Iterator[Tuple[str, int, int, str]]:
+        """Yield (region, region_offset, line_number, chunk) for every log chunk read."""
+        for name, offset, first_line, text in self.segments():
+            for line_number, chunk in get_chunks(text):
+                yield name, offset, first_line + line_number, chunk
+
+
+def drain_log(extractor: DrainExtractor, reader: LogReader) -> Tuple[List[Dict[str, Any]], bool]:
+    """Mine a log streamed from a reader, within the reader's time budget.
+
+    Returns:
+        tuple: The list of pattern dictionaries and whether mining stopped
+               early because the time budget was exhausted.
+    """
+    deadline = time.monotonic() + reader.max_seconds
+    truncated = False
+    mined = 0
+    # First pass create clusters (chunking, masking and template mining)
+    with span("drain.train", path=reader.path, bytes=reader.size, sampled=reader.sampled) as train_span:
+        for _, _, _, chunk in reader.chunks():
+            extractor.miner.add_log_message(chunk)
+            mined += 1
+            if mined % DEADLINE_CHECK_INTERVAL == 0 and time.monotonic() > deadline:
+                LOG.warning("Time budget exhausted after %d chunks of %s", mined, reader.path)
+                truncated = True
+                break
+        train_span.set_attribute("count", mined)
+        train_span.set_attribute("truncated", truncated)
+
+    # Sort found clusters by size, descending order
+    remaining = {
+        cluster.cluster_id: cluster
+        for cluster in sorted(extractor.miner.drain.clusters, key=lambda it: it.size, reverse=True)
+    }
+    # Second pass, only matching lines with clusters, to recover original text
+    patterns = []
+    with span("drain.match", path=reader.path) as match_span:
+        for index, (region, offset, line_number, chunk) in enumerate(reader.chunks()):
+            if index >= mined or not remaining:
+                break
+            cluster = extractor.miner.match(chunk, "always")
+            if cluster is not None and remaining.pop(cluster.cluster_id, None) is not None:
+                pattern = {
+                    "line_number": line_number,
+                    "chunk": chunk.strip(),
+                    "chunk_length": len(chunk),
+                }
+                if reader.sampled:
+                    pattern["region"] = region
+                    pattern["region_offset"] = offset
+                patterns.append(pattern)
+        match_span.set_attribute("count", len(patterns))
+    return patterns, truncated
@@ -1,131 +1,284 @@
 import os
 import tarfile
+import threading
 from datetime import datetime
-from google.cloud import storage
 from typing import List, Dict, Any, Optional
 try:
     from .drain import DrainExtractor
+    from .workspace import DEFAULT_ROOT, MARKER_FILE, get_workspace
+    from .cluster_summary import SECTIONS, load_cluster_summary, query_cluster_summary
+    from .batch_drain import SORT_KEYS, drain_files
+    from .log_reader import LogReader, drain_log
+    from .timeline import DEFAULT_LIMIT, MAX_LIMIT, load_timeline, parse_time
 except ImportError:
     from drain import DrainExtractor
+    from workspace import DEFAULT_ROOT, MARKER_FILE, get_workspace
+    from cluster_summary import SECTIONS, load_cluster_summary, query_cluster_summary
+    from batch_drain import SORT_KEYS, drain_files
+    from log_reader import LogReader, drain_log
+    from timeline import DEFAULT_LIMIT, MAX_LIMIT, load_timeline, parse_time
+from sub_agents.gcs import get_storage_client
+from sub_agents.tracing import span
 
-# Global DrainExtractor instance
-_drain_extractor = DrainExtractor(verbose=False, context=False, max_clusters=1000)
+# Shared DrainExtractor, built on first use to keep imports cheap
+_drain_extractor: Optional[DrainExtractor] = None
+_init_lock = threading.Lock()
 
-def get_must_gather(job_name: str, build_id: str, test_name: str, target_folder: str) -> dict:
+
+def get_drain_extractor() -> DrainExtractor:
+    global _drain_extractor
+    if _drain_extractor is None:
+        with _init_lock:
+            if _drain_extractor is None:
+                _drain_extractor = DrainExtractor(verbose=False, context=False, max_clusters=1000)
+    return _drain_extractor
+
+
+def get_must_gather(job_name: str, build_id: str, test_name: str, target_folder: str = DEFAULT_ROOT) -> dict:
     """Retrieves the must-gather archive for a specified job.
 
+    Must-gathers are kept in a managed workspace under target_folder: a build
+    is only downloaded once, partially downloaded builds are never reused and
+    least recently used builds are evicted once MUST_GATHER_CACHE_MAX_BYTES is exceeded.
+
     Args:
         job_name: The name of the job
         build_id: The build ID for which to get install logs
-        test_name: The name of the test for which to get install logs
+        test_name: The name of the test for which to get install logs, the --target of the Prow job
+        target_folder: The workspace folder holding downloaded must-gathers, /tmp/must-gather by default
     Returns:
         dict: A dictionary containing the must-gather information.
               Includes a 'status' key ('success' or 'error').
               If 'success', includes a 'path' key pointing to must-gather logs.
               If 'error', includes an 'error_message' key.
     """
-   
-
     gsURL = "gs://test-platform-results/logs/"+job_name+"/"+build_id+"/artifacts/"+test_name+"/gather-must-gather/artifacts"
-    destination_folder = target_folder+"/"+job_name+"/"+build_id+"/"+test_name
+    workspace = get_workspace(target_folder)
     try:
-        download_from_gs(gsURL, destination_folder)
+        destination_folder = workspace.acquire(
+            job_name, build_id, test_name,
+            lambda staging_folder: _populate_must_gather(gsURL, staging_folder),
+        )
     except Exception as e:
-        return {"status": "error", "error_message": f"Error downloading from GCS: {e}"}
-    
-    print(f"Downloaded must-gather tar to {destination_folder}")
-    
-    # Look for must-gather.tar in the destination folder
-    must_gather_tar_path = os.path.join(destination_folder, "must-gather.tar")
-    
-    if os.path.exists(must_gather_tar_path):
-        try:
-            # Extract the tar file
-            with tarfile.open(must_gather_tar_path, 'r') as tar:
-                tar.extractall(path=destination_folder)
-        except Exception as e:
-            return {"status": "error", "error_message": f"Error extracting must-gather.tar: {e}"}
-    else:
-         return {"status": "error", "error_message": f"must-gather.tar not found in {destination_folder}"}
-    return  {"status": "success", "path": destination_folder}
-    
+        return {"status": "error", "error_message": str(e)}
+
+    print(f"Must-gather available in {destination_folder}")
+    return {"status": "success", "path": destination_folder}
+
+
+def _populate_must_gather(gs_url: str, staging_folder: str) -> None:
+    """Download and extract a must-gather into an empty staging folder."""
+    try:
+        with span("must_gather.download", url=gs_url) as download_span:
+            blobs, size = download_from_gs(gs_url, staging_folder)
+            download_span.set_attribute("count", blobs)
+            download_span.set_attribute("bytes", size)
+    except Exception as e:
+        raise RuntimeError(f"Error downloading from GCS: {e}") from e
+
+    # Look for must-gather.tar in the staging folder
+    must_gather_tar_path = os.path.join(staging_folder, "must-gather.tar")
+    if not os.path.exists(must_gather_tar_path):
+        raise RuntimeError("must-gather.tar not found in the downloaded artifacts")
+    try:
+        # Extract the tar file
+        with span("must_gather.extract", bytes=os.path.getsize(must_gather_tar_path)) as extract_span, \
+                tarfile.open(must_gather_tar_path, 'r') as tar:
+            members = tar.getmembers()
+            extract_span.set_attribute("count", len(members))
+            tar.extractall(path=staging_folder, members=members)
+    except Exception as e:
+        raise RuntimeError(f"Error extracting must-gather.tar: {e}") from e
+    # The extracted tree holds the same data, don't count it twice against the quota
+    os.remove(must_gather_tar_path)
 
 
 def download_from_gs(gs_url, destination_folder):
     """Downloads a file or directory from Google Cloud Storage.
 
+    Errors are raised to the caller so that an incomplete download is never
+    mistaken for a complete one.
+
     Args:
         gs_url: The Google Cloud Storage URL (e.g., gs://bucket-name/path/to/file).
         destination_folder: The local folder where the file(s) will be downloaded.
+    Returns:
+        tuple: The number of files and bytes downloaded.
     """
-    print(f"download_from_gs called with{gs_url} to {destination_folder}")
-    try:
-        # Initialize the Google Cloud Storage client
-        storage_client = storage.Client(project="openshift-gce-devel")
-
-        # Parse the GCS URL
-        bucket_name = gs_url.split('/')[2]
-        blob_prefix = '/'.join(gs_url.split('/')[3:])
-        bucket = storage_client.bucket(bucket_name)
-        print(f"bucket_name: {bucket_name}, blob_prefix: {blob_prefix}")
-        # Create the destination folder if it doesn't exist
-        if os.path.exists(destination_folder):
-            return
-        else:
-            os.makedirs(destination_folder)
-
-        # List all blobs with the given prefix
-        blobs = bucket.list_blobs(prefix=blob_prefix)
-        print(f" {blobs} ")
-        for blob in blobs:
-            # Create the full destination path
-            destination_path = os.path.join(destination_folder, blob.name.replace(blob_prefix, '', 1).lstrip('/'))
-            print(f"Downloading {gs_url}/{blob.name} to {destination_path}")
-
-            # Create any necessary subdirectories
-            os.makedirs(os.path.dirname(destination_path), exist_ok=True)
-
-            # Download the blob to the destination path
-            blob.download_to_filename(destination_path)
-            print(f"Downloaded {gs_url}/{blob.name} to {destination_path}")
+    print(f"download_from_gs called with {gs_url} to {destination_folder}")
+    storage_client = get_storage_client()
 
-    except Exception as e:
-        print(f"Error downloading from GCS: {e}")
+    # Parse the GCS URL
+    bucket_name = gs_url.split('/')[2]
+    blob_prefix = '/'.join(gs_url.split('/')[3:])
+    bucket = storage_client.bucket(bucket_name)
+    print(f"bucket_name: {bucket_name}, blob_prefix: {blob_prefix}")
+    # Create the destination folder if it doesn't exist
+    os.makedirs(destination_folder, exist_ok=True)
 
+    # List all blobs with the given prefix
+    blobs = bucket.list_blobs(prefix=blob_prefix)
+    count = 0
+    size = 0
+    for blob in blobs:
+        # Create the full destination path
+        destination_path = os.path.join(destination_folder, blob.name.replace(blob_prefix, '', 1).lstrip('/'))
+        print(f"Downloading {gs_url}/{blob.name} to {destination_path}")
 
+        # Create any necessary subdirectories
+        os.makedirs(os.path.dirname(destination_path), exist_ok=True)
 
-        
+        # Download the blob to the destination path
+        blob.download_to_filename(destination_path)
+        print(f"Downloaded {gs_url}/{blob.name} to {destination_path}")
+        count += 1
+        size += os.path.getsize(destination_path)
+    return count, size
 
 
 def read_drained_file(path: str) -> dict:
     """Read contents of a file
+
+    Files larger than MUST_GATHER_READ_MAX_BYTES are sampled (head, tail and
+    evenly spaced windows) and mining stops after MUST_GATHER_READ_MAX_SECONDS.
+
     Args:
         path: The path to the file to read
     Returns:
         dict: A dictionary containing the file contents.
               Includes a 'status' key ('success' or 'error').
-              If 'success', includes a 'patterns' key pointing to a list of patterns found in the file.
+              If 'success', includes a 'patterns' key pointing to a list of patterns found in the file,
+              a 'sampled' key telling whether only parts of the file were read and a 'truncated'
+              key telling whether the time budget ran out. Patterns of sampled files carry the
+              'region' they were found in and its 'region_offset' in bytes, their 'line_number'
+              is relative to that region.
               If 'error', includes an 'error_message' key.
     """
     try:
-        with open(path, 'r', encoding='utf-8') as f:
-            content= f.read()
-            patterns = _drain_extractor(content)
-    
-    # Convert patterns to a more structured format
-        pattern_results = []
-        for line_number, chunk in patterns:
-            pattern_results.append({
-                "line_number": line_number,
-                "chunk": chunk.strip(),
-                "chunk_length": len(chunk)
-            })
+        with LogReader(path) as reader:
+            pattern_results, truncated = drain_log(get_drain_extractor(), reader)
     except Exception as e:
         return {"status": "error", "error_message": f"Error reading file {path}: {e}"}
-    return {"status": "success", "patterns": pattern_results}
+    return {
+        "status": "success",
+        "patterns": pattern_results,
+        "file_size": reader.size,
+        "sampled": reader.sampled,
+        "truncated": truncated,
+    }
 
     
 
+def get_cluster_summary(path: str, section: str = "problems", namespace: str = "") -> dict:
+    """Get a structured status summary of the cluster captured in a must-gather.
+
+    The summary covers ClusterOperators (available/progressing/degraded), nodes
+    (readiness, pressure conditions, architecture), pods (phase, restart counts,
+    waiting reasons) and failing conditions. It is computed once per must-gather
+    and answered from the stored index afterwards, use it before browsing raw files.
+
+    Args:
+        path: The must-gather path returned by get_must_gather
+        section: One of 'problems' (only unhealthy resources, the default),
+                 'operators', 'nodes', 'pods', 'conditions' or 'all'
+        namespace: Restrict pods and conditions to this namespace
+    Returns:
+        dict: A dictionary containing the cluster summary.
+              Includes a 'status' key ('success' or 'error').
+              If 'success', includes a 'summary' key with 'counts' and the requested section(s).
+              If 'error', includes an 'error_message' key.
+    """
+    if section not in SECTIONS:
+        return {"status": "error", "error_message": f"Unknown section {section}, expected one of {', '.join(SECTIONS)}"}
+    try:
+        summary = load_cluster_summary(path)
+    except Exception as e:
+        return {"status": "error", "error_message": f"Error summarizing must-gather {path}: {e}"}
+    return {"status": "success", "summary": query_cluster_summary(summary, section, namespace)}
+
+
+def read_drained_files(path: str, top_n: int = 50, sort_by: str = "occurrences") -> dict:
+    """Find the dominant log templates across many files at once.
+
+    All matching files are drained in parallel and similar templates from
+    different files are merged, so a single call covers every pod log of a
+    namespace or of the whole must-gather.
+
+    Args:
+        path: A directory (all *.log files below it are used) or a glob pattern,
+              e.g. '<must-gather>/namespaces/openshift-etcd/**/*.log'
+        top_n: Number of templates to return
+        sort_by: Rank by 'occurrences' (default) or by 'files' the template shows up in
+    Returns:
+        dict: A dictionary containing the ranked templates.
+              Includes a 'status' key ('success' or 'error').
+              If 'success', includes a 'templates' key pointing to a list of templates,
+              each with 'occurrences', 'file_count' and an 'example' location.
+              If 'error', includes an 'error_message' key.
+    """
+    if sort_by not in SORT_KEYS:
+        return {"status": "error", "error_message": f"Unknown sort_by {sort_by}, expected one of {', '.join(SORT_KEYS)}"}
+    try:
+        result = drain_files(path, top_n=top_n, sort_by=sort_by)
+    except Exception as e:
+        return {"status": "error", "error_message": f"Error draining files {path}: {e}"}
+    if not result["files_processed"] and not result["files_failed"]:
+        return {"status": "error", "error_message": f"No log files found for {path}"}
+    return {"status": "success", **result}
+
+
+def query_timeline(path: str, start: str = "", end: str = "", around: str = "",
+                   seconds_before: int = 120, seconds_after: int = 30, namespace: str = "",
+                   kind: str = "", name: str = "", reason: str = "", limit: int = DEFAULT_LIMIT) -> dict:
+    """Query the time sorted events of a must-gather.
+
+    The timeline combines events.yaml files, pod and container start/termination
+    times and condition transitions (e.g. a ClusterOperator becoming Degraded).
+    It is indexed once per must-gather, so queries don't re-read any YAML.
+
+    Args:
+        path: The must-gather path returned by get_must_gather
+        start: Only return rows at or after this time (RFC 3339, e.g. 2025-07-01T10:00:00Z)
+        end: Only return rows at or before this time (RFC 3339)
+        around: Instead of start/end, return rows from seconds_before before to seconds_after after this time
+        seconds_before: Window size before 'around' in seconds
+        seconds_after: Window size after 'around' in seconds
+        namespace: Only return rows of this namespace
+        kind: Only return rows about this object kind, e.g. Pod, Node or ClusterOperator
+        name: Only return rows whose object name contains this text
+        reason: Only return rows whose reason contains this text, e.g. BackOff
+        limit: Maximum number of rows to return
+    Returns:
+        dict: A dictionary containing the timeline rows.
+              Includes a 'status' key ('success' or 'error').
+              If 'success', includes a 'rows' key pointing to a list of rows in time order
+              and a 'matched' key with the number of rows matching the query.
+              If 'error', includes an 'error_message' key.
+    """
+    window_start = window_end = None
+    if around:
+        anchor = parse_time(around)
+        if anchor is None:
+            return {"status": "error", "error_message": f"Invalid time {around}"}
+        window_start, window_end = anchor - seconds_before, anchor + seconds_after
+    else:
+        if start:
+            window_start = parse_time(start)
+            if window_start is None:
+                return {"status": "error", "error_message": f"Invalid time {start}"}
+        if end:
+            window_end = parse_time(end)
+            if window_end is None:
+                return {"status": "error", "error_message": f"Invalid time {end}"}
+    try:
+        timeline = load_timeline(path)
+    except Exception as e:
+        return {"status": "error", "error_message": f"Error indexing timeline of {path}: {e}"}
+    result = timeline.query(window_start, window_end, namespace=namespace, kind=kind, name=name,
+                            reason=reason, limit=max(1, min(limit, MAX_LIMIT)))
+    return {"status": "success", **result}
+
+
 def list_directory( path: str) -> dict:
     """List contents of a directory
     Args:
@@ -140,6 +293,9 @@ def list_directory( path: str) -> dict:
         entries = []
         with os.scandir(path) as it:
             for entry in it:
+                # Bookkeeping of the must-gather workspace, nothing to analyze
+                if entry.name == MARKER_FILE:
+                    continue
                 prefix = "[DIR]" if entry.is_dir() else "[FILE]"
                 entries.append(f"{prefix} {entry.name}")
         return {"status": "success", "entries": entries}
@@ -0,0 +1,318 @@
+import os
+import json
+import array
+import bisect
+import logging
+import threading
+import concurrent.futures
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    from .cluster_summary import MAX_MESSAGE_LENGTH, find_resource_files, load_yaml_objects
+    from .workspace import MARKER_FILE, refresh_entry_size
+except ImportError:
+    from cluster_summary import MAX_MESSAGE_LENGTH, find_resource_files, load_yaml_objects
+    from workspace import MARKER_FILE, refresh_entry_size
+
+# Set up logging
+LOG = logging.getLogger("must_gather")
+
+TIMELINE_DIR = ".timeline"
+TIMELINE_VERSION = 1
+
+# Columns holding indexes into the shared string table
+STRING_COLUMNS = ("source", "namespace", "kind", "name", "reason", "detail", "message")
+
+# Default and maximum number of rows returned by a query
+DEFAULT_LIMIT = 200
+MAX_LIMIT = 2000
+
+# A row before it is dictionary encoded:
+# (time, count, source, namespace, kind, name, reason, detail, message)
+Row = Tuple[int, int, str, str, str, str, str, str, str]
+
+
+def parse_time(value: Any) -> Optional[int]:
+    """Convert a Kubernetes timestamp into seconds since the epoch."""
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, str) and value:
+        try:
+            parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    else:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+def format_time(seconds: int) -> str:
+    return datetime.fromtimestamp(seconds, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _message(message: Any) -> str:
+    message = " ".join(str(message or "").split())
+    return message[:MAX_MESSAGE_LENGTH]
+
+
+def _event_rows(obj: dict) -> Iterable[Row]:
+    metadata = obj.get("metadata") or {}
+    involved = obj.get("involvedObject") or obj.get("regarding") or {}
+    when = parse_time(obj.get("lastTimestamp")) or parse_time(obj.get("eventTime")) or \
+        parse_time(obj.get("firstTimestamp")) or parse_time(metadata.get("creationTimestamp"))
+    if when is None:
+        return
+    yield (
+        when, obj.get("count") or 1, "event",
+        involved.get("namespace") or metadata.get("namespace", ""),
+        involved.get("kind", ""), involved.get("name", ""),
+        obj.get("reason", ""), obj.get("type", ""), _message(obj.get("message") or obj.get("note")),
+    )
+
+
+def _condition_rows(obj: dict) -> Iterable[Row]:
+    metadata = obj.get("metadata") or {}
+    for condition in (obj.get("status") or {}).get("conditions") or []:
+        when = parse_time(condition.get("lastTransitionTime"))
+        if when is None:
+            continue
+        yield (
+            when, 1, "condition", metadata.get("namespace", ""), obj.get("kind", ""), metadata.get("name", ""),
+            condition.get("reason", ""), f"{condition.get('type')}={condition.get('status')}",
+            _message(condition.get("message")),
+        )
+
+
+def _container_rows(obj: dict) -> Iterable[Row]:
+    metadata = obj.get("metadata") or {}
+    status = obj.get("status") or {}
+    namespace = metadata.get("namespace", "")
+    name = metadata.get("name", "")
+    started = parse_time(status.get("startTime"))
+    if started is not None:
+        yield (started, 1, "pod", namespace, "Pod", name, "Started", "pod", "")
+    for container in (status.get("initContainerStatuses") or []) + (status.get("containerStatuses") or []):
+        container_name = container.get("name", "")
+        for state_key in ("state", "lastState"):
+            state = container.get(state_key) or {}
+            running = state.get("running") or {}
+            when = parse_time(running.get("startedAt"))
+            if when is not None:
+                yield (when, 1, "pod", namespace, "Pod", name, "ContainerStarted", f"container {container_name}", "")
+            terminated = state.get("terminated") or {}
+            when = parse_time(terminated.get("finishedAt"))
+            if when is not None:
+                yield (
+                    when, 1, "pod", namespace, "Pod", name, terminated.get("reason") or "ContainerTerminated",
+                    f"container {container_name}",
+                    _message(f"exit code {terminated.get('exitCode')} {terminated.get('message') or ''}"),
+                )
+
+
+def timeline_rows(path: str) -> List[Row]:
+    """Extract the timestamped rows of one must-gather file."""
+    rows: List[Row] = []
+    try:
+        objects = load_yaml_objects(path)
+    except Exception as e:
+        LOG.warning("Could not parse %s: %s", path, e)
+        return rows
+    for obj in objects:
+        kind = obj.get("kind")
+        if kind == "Event":
+            found = _event_rows(obj)
+        elif kind == "Pod":
+            found = list(_condition_rows(obj)) + list(_container_rows(obj))
+        else:
+            found = _condition_rows(obj)
+        for row in found:
+            rows.append((int(row[0]), int(row[1])) + tuple(str(value or "") for value in row[2:]))
+    return rows
+
+
+def find_timeline_files(root: str) -> List[str]:
+    """Find events.yaml files along with the resources carrying condition timestamps."""
+    found = find_resource_files(root)
+    for dirpath, _, files in os.walk(root):
+        if "events.yaml" in files:
+            found.append(os.path.join(dirpath, "events.yaml"))
+    return sorted(set(found))
+
+
+class Timeline:
+    """A time sorted, dictionary encoded columnar table of must-gather events."""
+
+    def __init__(self, columns: Dict[str, array.array], strings: List[str]):
+        self.columns = columns
+        self.strings = strings
+        self._string_ids = {value: index for index, value in enumerate(strings)}
+
+    @classmethod
+    def from_rows(cls, rows: List[Row]) -> "Timeline":
+        rows = sorted(set(rows))
+        strings: List[str] = []
+        string_ids: Dict[str, int] = {}
+        columns = {"time": array.array('q'), "count": array.array('q')}
+        columns.update({column: array.array('I') for column in STRING_COLUMNS})
+        for row in rows:
+            columns["time"].append(row[0])
+            columns["count"].append(row[1])
+            for column, value in zip(STRING_COLUMNS, row[2:]):
+                index = string_ids.get(value)
+                if index is None:
+                    index = string_ids[value] = len(strings)
+                    strings.append(value)
+                columns[column].append(index)
+        return cls(columns, strings)
+
+    def __len__(self) -> int:
+        return len(self.columns["time"])
+
+    def save(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        meta_path = os.path.join(directory, "meta.json")
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        for column, values in self.columns.items():
+            with open(os.path.join(directory, f"{column}.bin"), 'wb') as f:
+                values.tofile(f)
+        with open(os.path.join(directory, "strings.json"), 'w', encoding='utf-8') as f:
+            json.dump(self.strings, f)
+        # Written last, a timeline without metadata is incomplete
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": TIMELINE_VERSION, "rows": len(self)}, f)
+
+    @classmethod
+    def load(cls, directory: str) -> Optional["Timeline"]:
+        try:
+            with open(os.path.join(directory, "meta.json"), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get("version") != TIMELINE_VERSION:
+                return None
+            with open(os.path.join(directory, "strings.json"), 'r', encoding='utf-8') as f:
+                strings = json.load(f)
+            columns = {}
+            for column, typecode in [("time", 'q'), ("count", 'q')] + [(c, 'I') for c in STRING_COLUMNS]:
+                values = array.array(typecode)
+                with open(os.path.join(directory, f"{column}.bin"), 'rb') as f:
+                    values.fromfile(f, meta["rows"])
+                columns[column] = values
+        except (OSError, ValueError, EOFError):
+            return None
+        return cls(columns, strings)
+
+    def _matching_ids(self, value: str, exact: bool) -> Optional[set]:
+        if not value:
+            return None
+        if exact:
+            index = self._string_ids.get(value)
+            return set() if index is None else {index}
+        return {index for index, candidate in enumerate(self.strings) if value in candidate}
+
+    def query(self, start: Optional[int] = None, end: Optional[int] = None, namespace: str = "",
+              kind: str = "", name: str = "", reason: str = "", limit: int = DEFAULT_LIMIT) -> Dict[str, Any]:
+        """Return the rows within [start, end] matching all given filters.
+
+        namespace and kind are matched exactly, name and reason as substrings.
+        """
+        times = self.columns["time"]
+        low = 0 if start is None else bisect.bisect_left(times, start)
+        high = len(times) if end is None else bisect.bisect_right(times, end)
+        filters = [
+            (self.columns["namespace"], self._matching_ids(namespace, True)),
+            (self.columns["kind"], self._matching_ids(kind, True)),
+            (self.columns["name"], self._matching_ids(name, False)),
+            (self.columns["reason"], self._matching_ids(reason, False)),
+        ]
+        filters = [(column, ids) for column, ids in filters if ids is not None]
+
+        rows = []
+        matched = 0
+        for index in range(low, high):
+            if any(column[index] not in ids for column, ids in filters):
+                continue
+            matched += 1
+            if len(rows) < limit:
+                row = {"time": format_time(times[index])}
+                for column in STRING_COLUMNS:
+                    row[column] = self.strings[self.columns[column][index]]
+                row["count"] = self.columns["count"][index]
+                rows.append(row)
+        return {"matched": matched, "returned": len(rows), "rows": rows}
+
+
+def build_timeline(root: str, max_workers: Optional[int] = None) -> Timeline:
+    """Parse events and resource timestamps of a must-gather in parallel into a timeline."""
+    files = find_timeline_files(root)
+    if max_workers is None:
+        max_workers = int(os.environ.get("MUST_GATHER_SUMMARY_WORKERS", os.cpu_count() or 1))
+    rows: List[Row] = []
+    if max_workers <= 1 or len(files) < 2 * max_workers:
+        for file_rows in map(timeline_rows, files):
+            rows.extend(file_rows)
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+            for file_rows in executor.map(timeline_rows, files, chunksize=8):
+                rows.extend(file_rows)
+    return Timeline.from_rows(rows)
+
+
+# Number of timelines kept in memory
+MAX_CACHED_TIMELINES = 8
+
+# Timelines by must-gather path and the creation time in its workspace marker, a
+# must-gather evicted and downloaded again is a new entry (the marker itself is
+# rewritten on every access)
+_timelines: "OrderedDict[Tuple[str, Optional[float]], Timeline]" = OrderedDict()
+_timelines_lock = threading.Lock()
+# One build at a time per must-gather, builds of different must-gathers run concurrently
+_build_locks: Dict[str, threading.Lock] = {}
+
+
+def _cache_key(root: str) -> Tuple[str, Optional[float]]:
+    try:
+        with open(os.path.join(root, MARKER_FILE), 'r', encoding='utf-8') as f:
+            return root, json.load(f).get("created")
+    except (OSError, ValueError):
+        return root, None
+
+
+def _cached_timeline(key: Tuple[str, Optional[float]]) -> Optional[Timeline]:
+    with _timelines_lock:
+        timeline = _timelines.get(key)
+        if timeline is not None:
+            _timelines.move_to_end(key)
+        return timeline
+
+
+def load_timeline(root: str) -> Timeline:
+    """Return the timeline of a must-gather, building and storing it on first use."""
+    root = os.path.abspath(root)
+    timeline = _cached_timeline(_cache_key(root))
+    if timeline is not None:
+        return timeline
+    with _timelines_lock:
+        build_lock = _build_locks.setdefault(root, threading.Lock())
+    with build_lock:
+        directory = os.path.join(root, TIMELINE_DIR)
+        timeline = _cached_timeline(_cache_key(root)) or Timeline.load(directory)
+        if timeline is None:
+            timeline = build_timeline(root)
+            try:
+                timeline.save(directory)
+            except OSError as e:
+                LOG.warning("Could not store timeline in %s: %s", directory, e)
+            else:
+                # The stored timeline counts against the workspace quota
+                refresh_entry_size(root)
+        key = _cache_key(root)
+        with _timelines_lock:
+            _timelines[key] = timeline
+            _timelines.move_to_end(key)
+            while len(_timelines) > MAX_CACHED_TIMELINES:
+                _timelines.popitem(last=False)
+        return timeline
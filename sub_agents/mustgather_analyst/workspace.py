@@ -0,0 +1,287 @@
+import os
+import json
+import time
+import shutil
+import logging
+import tempfile
+import threading
+from typing import Callable, Dict, List, Optional, Set
+
+# Set up logging
+LOG = logging.getLogger("must_gather")
+
+# Workspace root used when none is given, the one the coordinator prompt names
+DEFAULT_ROOT = "/tmp/must-gather"
+# Default quota for all must-gathers kept under one workspace root (10 GiB)
+DEFAULT_QUOTA_BYTES = 10 * 1024 ** 3
+
+# Marker written into an entry once it has been fully populated
+MARKER_FILE = ".workspace.json"
+STAGING_DIR = ".staging"
+# Seconds after which a staging directory of another process is removed even if that process still runs
+STAGING_MAX_AGE_SECONDS = float(os.environ.get("MUST_GATHER_STAGING_MAX_AGE", 24 * 3600))
+
+
+def _directory_size(path: str) -> int:
+    """Return the total size in bytes of all regular files below path."""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                continue
+    return total
+
+
+def _process_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class MustGatherWorkspace:
+    """A size-bounded cache of extracted must-gathers on local disk.
+
+    Every entry lives in <root>/<job_name>/<build_id>/<test_name> and is only
+    considered complete once it carries a marker file. Entries are populated
+    in a private staging directory and moved into place with an atomic rename,
+    so an interrupted download never shows up as a complete must-gather.
+    When the total size exceeds the quota, least recently used entries are evicted.
+    Staging directories are named after the process populating them; those
+    left behind by a process that was killed are removed on startup and on
+    every eviction, and count against the quota until then.
+    """
+
+    def __init__(self, root: str, quota_bytes: Optional[int] = None):
+        self.root = os.path.abspath(root)
+        if quota_bytes is None:
+            quota_bytes = int(os.environ.get("MUST_GATHER_CACHE_MAX_BYTES", DEFAULT_QUOTA_BYTES))
+        self.quota_bytes = quota_bytes
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        # Staging directories this process is populating right now
+        self._staging: Set[str] = set()
+        self.remove_stale_staging()
+
+    def entry_path(self, job_name: str, build_id: str, test_name: str) -> str:
+        return os.path.join(self.root, job_name, build_id, test_name)
+
+    def _key_lock(self, path: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(path, threading.Lock())
+
+    def _read_marker(self, path: str) -> Optional[dict]:
+        try:
+            with open(os.path.join(path, MARKER_FILE), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_marker(self, path: str, marker: dict) -> None:
+        marker_path = os.path.join(path, MARKER_FILE)
+        tmp_path = marker_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(marker, f)
+        os.replace(tmp_path, marker_path)
+
+    def is_complete(self, job_name: str, build_id: str, test_name: str) -> bool:
+        return self._read_marker(self.entry_path(job_name, build_id, test_name)) is not None
+
+    def touch(self, path: str) -> None:
+        """Record an access to a complete entry."""
+        marker = self._read_marker(path)
+        if marker is not None:
+            marker["last_access"] = time.time()
+            self._write_marker(path, marker)
+
+    def acquire(self, job_name: str, build_id: str, test_name: str,
+                populate: Callable[[str], None]) -> str:
+        """Return the path of a complete entry, populating it if needed.
+
+        Args:
+            job_name: The name of the job
+            build_id: The build ID of the must-gather
+            test_name: The name of the test that gathered it
+            populate: Callable that fills the directory it is given. Any
+                      exception it raises aborts the entry and is re-raised.
+        Returns:
+            str: The path of the complete entry.
+        """
+        path = self.entry_path(job_name, build_id, test_name)
+        with self._key_lock(path):
+            if self._read_marker(path) is not None:
+                self.touch(path)
+                return path
+
+            staging_root = os.path.join(self.root, STAGING_DIR)
+            os.makedirs(staging_root, exist_ok=True)
+            # Created and registered at once, remove_stale_staging would otherwise take it for a leftover
+            with self._lock:
+                staging = tempfile.mkdtemp(prefix=f"{build_id}-{os.getpid()}-", dir=staging_root)
+                self._staging.add(staging)
+            try:
+                populate(staging)
+                now = time.time()
+                self._write_marker(staging, {
+                    "job_name": job_name,
+                    "build_id": build_id,
+                    "test_name": test_name,
+                    "size": _directory_size(staging),
+                    "created": now,
+                    "last_access": now,
+                })
+                # A leftover folder without marker is an interrupted download
+                if os.path.exists(path):
+                    shutil.rmtree(path)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.rename(staging, path)
+            except BaseException:
+                shutil.rmtree(staging, ignore_errors=True)
+                raise
+            finally:
+                with self._lock:
+                    self._staging.discard(staging)
+
+        self.evict(keep=path)
+        return path
+
+    def refresh_size(self, path: str) -> None:
+        """Recount the size of a complete entry, e.g. after a derived index was stored in it, and evict if needed."""
+        with self._key_lock(path):
+            marker = self._read_marker(path)
+            if marker is None:
+                return
+            marker["size"] = _directory_size(path)
+            self._write_marker(path, marker)
+        self.evict(keep=path)
+
+    def entries(self) -> List[dict]:
+        """List all complete entries with their path, size and last access time."""
+        found = []
+        if not os.path.isdir(self.root):
+            return found
+        for job_name in os.listdir(self.root):
+            if job_name == STAGING_DIR:
+                continue
+            job_path = os.path.join(self.root, job_name)
+            if not os.path.isdir(job_path):
+                continue
+            for build_id in os.listdir(job_path):
+                build_path = os.path.join(job_path, build_id)
+                if not os.path.isdir(build_path):
+                    continue
+                for test_name in os.listdir(build_path):
+                    path = os.path.join(build_path, test_name)
+                    marker = self._read_marker(path)
+                    if marker is not None:
+                        marker["path"] = path
+                        found.append(marker)
+        return found
+
+    def _remove_empty_parents(self, path: str) -> None:
+        parent = os.path.dirname(path)
+        while parent != self.root and parent.startswith(self.root):
+            try:
+                os.rmdir(parent)
+            except OSError:
+                return
+            parent = os.path.dirname(parent)
+
+    def _is_stale_staging(self, path: str) -> bool:
+        """Whether a staging directory was left behind by an interrupted download."""
+        parts = os.path.basename(path).split("-")
+        if len(parts) != 3 or not parts[1].isdigit():
+            return True
+        pid = int(parts[1])
+        if pid == os.getpid():
+            # A directory of a previous process that had the same PID, e.g. PID 1 of a restarted container
+            return path not in self._staging
+        try:
+            age = time.time() - os.stat(path).st_mtime
+        except OSError:
+            return False
+        return not _process_running(pid) or age > STAGING_MAX_AGE_SECONDS
+
+    def remove_stale_staging(self) -> List[str]:
+        """Remove the staging directories of downloads that were interrupted, e.g. by a killed process.
+
+        Returns:
+            list: The paths of the removed staging directories.
+        """
+        staging_root = os.path.join(self.root, STAGING_DIR)
+        removed = []
+        if not os.path.isdir(staging_root):
+            return removed
+        with self._lock:
+            for name in os.listdir(staging_root):
+                path = os.path.join(staging_root, name)
+                if os.path.isdir(path) and self._is_stale_staging(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                    removed.append(path)
+                    LOG.info("Removed stale must-gather staging directory %s", path)
+        return removed
+
+    def staging_size(self) -> int:
+        return _directory_size(os.path.join(self.root, STAGING_DIR))
+
+    def total_size(self) -> int:
+        return sum(entry.get("size", 0) for entry in self.entries()) + self.staging_size()
+
+    def evict(self, keep: Optional[str] = None) -> List[str]:
+        """Remove least recently used entries until the workspace fits the quota.
+
+        Args:
+            keep: Path of an entry that must not be evicted
+        Returns:
+            list: The paths of the evicted entries.
+        """
+        evicted = []
+        self.remove_stale_staging()
+        with self._lock:
+            entries = sorted(self.entries(), key=lambda it: it.get("last_access", 0))
+            # Downloads in progress take up space too
+            total = sum(entry.get("size", 0) for entry in entries) + self.staging_size()
+            for entry in entries:
+                if total <= self.quota_bytes:
+                    break
+                if entry["path"] == keep:
+                    continue
+                # Drop the marker first so a partial removal is never served
+                try:
+                    os.remove(os.path.join(entry["path"], MARKER_FILE))
+                except OSError:
+                    continue
+                shutil.rmtree(entry["path"], ignore_errors=True)
+                self._remove_empty_parents(entry["path"])
+                total -= entry.get("size", 0)
+                evicted.append(entry["path"])
+                LOG.info("Evicted must-gather %s", entry["path"])
+        return evicted
+
+
+_workspaces: Dict[str, MustGatherWorkspace] = {}
+_workspaces_lock = threading.Lock()
+
+
+def refresh_entry_size(path: str) -> None:
+    """Recount the size of the workspace entry at path; paths outside a workspace are ignored."""
+    path = os.path.abspath(path)
+    if not os.path.isfile(os.path.join(path, MARKER_FILE)):
+        return
+    # Entries live in <root>/<job_name>/<build_id>/<test_name>
+    root = os.path.dirname(os.path.dirname(os.path.dirname(path)))
+    get_workspace(root).refresh_size(path)
+
+
+def get_workspace(root: str) -> MustGatherWorkspace:
+    """Return the shared workspace managing the given root folder."""
+    root = os.path.abspath(root)
+    with _workspaces_lock:
+        if root not in _workspaces:
+            _workspaces[root] = MustGatherWorkspace(root)
+        return _workspaces[root]
@@ -0,0 +1,338 @@
+"""Tracing of triages: spans around HTTP fetches, downloads, extraction and Drain.
+
+ADK already records OpenTelemetry spans for agent runs, tool calls and model
+calls. The spans added here nest below them, so a trace shows where the time
+of a triage went. Every span carries its duration and, where it applies, the
+bytes and items processed.
+
+Setting CI_ANALYSIS_TRACE_FILE enables the export: finished spans are appended
+to that file as OTLP/JSON lines (one ExportTraceServiceRequest per line, the
+format of the OpenTelemetry Collector file exporter), and a summary of the top
+time sinks of each trace is logged when its root span ends.
+"""
+
+import os
+import json
+import inspect
+import logging
+import threading
+import functools
+import contextlib
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import httpx
+from opentelemetry import trace
+from opentelemetry.sdk.trace import ReadableSpan, SpanProcessor, TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter, SpanExportResult
+from opentelemetry.trace import Status, StatusCode
+
+LOG = logging.getLogger("ci_analysis")
+
+tracer = trace.get_tracer("ci_analysis")
+
+# Number of time sinks in a trace summary, and of summaries kept in memory
+SUMMARY_TOP_N = 10
+MAX_SUMMARIES = 100
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes: Any) -> Iterator[trace.Span]:
+    """Record the enclosed block as a span, nested in the current one.
+
+    Attributes can be added while the span is open with span.set_attribute.
+    """
+    with tracer.start_as_current_span(name, attributes=_attributes(attributes)) as current:
+        yield current
+
+
+def traced(name: Optional[str] = None):
+    """Decorate a function, sync or async, so that every call is recorded as a span."""
+    def decorator(func):
+        span_name = name or func.__name__
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _attributes(attributes: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in attributes.items() if isinstance(value, (str, bool, int, float))}
+
+
+class _TracedStream(httpx.AsyncByteStream):
+    """Response body counting the bytes read, ending the span of its request when closed."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, request_span: trace.Span):
+        self._stream = stream
+        self._span = request_span
+        self._bytes = 0
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            self._bytes += len(chunk)
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            self._span.set_attribute("http.response.body.size", self._bytes)
+            self._span.end()
+
+
+class TracedTransport(httpx.AsyncBaseTransport):
+    """httpx transport recording one "http GET" span per request, until its body is closed."""
+
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self._transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        request_span = tracer.start_span(f"http {request.method}", attributes={
+            "http.request.method": request.method,
+            "url.full": str(request.url),
+            "http.request.header.range": request.headers.get("range", ""),
+        })
+        try:
+            with trace.use_span(request_span, end_on_exit=False):
+                response = await self._transport.handle_async_request(request)
+        except Exception as e:
+            request_span.record_exception(e)
+            request_span.set_status(Status(StatusCode.ERROR, str(e)))
+            request_span.end()
+            raise
+        request_span.set_attribute("http.response.status_code", response.status_code)
+        if response.status_code >= 400:
+            request_span.set_status(Status(StatusCode.ERROR))
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_TracedStream(response.stream, request_span),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+def async_client(**kwargs: Any) -> httpx.AsyncClient:
+    """An httpx.AsyncClient whose requests are traced."""
+    return httpx.AsyncClient(transport=TracedTransport(), **kwargs)
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_otlp_value(item) for item in value]}}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in (attributes or {}).items()]
+
+
+def otlp_span(span: ReadableSpan) -> Dict[str, Any]:
+    """A finished span in OTLP/JSON encoding."""
+    context = span.get_span_context()
+    data = {
+        "traceId": format(context.trace_id, "032x"),
+        "spanId": format(context.span_id, "016x"),
+        "name": span.name,
+        "kind": span.kind.value + 1,  # OTLP counts from SPAN_KIND_UNSPECIFIED = 0
+        "startTimeUnixNano": str(span.start_time),
+        "endTimeUnixNano": str(span.end_time),
+        "attributes": _otlp_attributes(span.attributes),
+        "status": {"code": span.status.status_code.value},
+    }
+    if span.parent is not None:
+        data["parentSpanId"] = format(span.parent.span_id, "016x")
+    if span.status.description:
+        data["status"]["message"] = span.status.description
+    if span.events:
+        data["events"] = [{
+            "timeUnixNano": str(event.timestamp),
+            "name": event.name,
+            "attributes": _otlp_attributes(event.attributes),
+        } for event in span.events]
+    return data
+
+
+class OtlpJsonFileExporter(SpanExporter):
+    """Appends every batch of spans to a file as one OTLP/JSON line."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        resource_spans: Dict[Any, Dict[Any, List[Dict[str, Any]]]] = OrderedDict()
+        for finished in spans:
+            scope = finished.instrumentation_scope
+            scope_key = (scope.name, scope.version) if scope else ("", None)
+            resource_spans.setdefault(finished.resource, OrderedDict()).setdefault(scope_key, []).append(
+                otlp_span(finished))
+        request = {"resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes(resource.attributes if resource else {})},
+            "scopeSpans": [{
+                "scope": {"name": name, **({"version": version} if version else {})},
+                "spans": scope_spans,
+            } for (name, version), scope_spans in scopes.items()],
+        } for resource, scopes in resource_spans.items()]}
+        try:
+            with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(request, ensure_ascii=False) + "\n")
+        except OSError as e:
+            LOG.warning("Could not write traces to %s: %s", self.path, e)
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        pass
+
+
+def _union_seconds(intervals: List[Tuple[int, int]]) -> float:
+    """Time covered by at least one of the (start, end) nanosecond intervals."""
+    total = 0
+    current_start = current_end = None
+    for start, end in sorted(intervals):
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                total += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        total += current_end - current_start
+    return total / 1e9
+
+
+class TimeSinkSummary(SpanProcessor):
+    """Aggregates the time of every span name per trace.
+
+    The self time of a span is its duration minus the time covered by its
+    children, so the time of a tool isn't counted again for the HTTP fetches
+    it makes. Self times of concurrent spans add up and can exceed the trace
+    duration; the wall time of a name is the time during which at least one
+    of its spans was running, and gives its share of the trace. When the root
+    span of a trace ends, its summary is logged and kept.
+    """
+
+    def __init__(self, top_n: int = SUMMARY_TOP_N):
+        self.top_n = top_n
+        self._lock = threading.Lock()
+        self._children: Dict[int, List[Tuple[int, int]]] = {}
+        self._traces: Dict[int, Dict[str, Dict[str, Any]]] = {}
+        self.summaries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def on_end(self, span: ReadableSpan) -> None:
+        interval = (span.start_time, span.end_time)
+        duration = (span.end_time - span.start_time) / 1e9
+        trace_id = span.context.trace_id
+        attributes = span.attributes or {}
+        with self._lock:
+            self_time = max(duration - _union_seconds(self._children.pop(span.context.span_id, [])), 0.0)
+            sinks = self._traces.setdefault(trace_id, {})
+            sink = sinks.setdefault(span.name, {"self_seconds": 0.0, "intervals": [], "count": 0, "bytes": 0})
+            sink["self_seconds"] += self_time
+            sink["intervals"].append(interval)
+            sink["count"] += 1
+            sink["bytes"] += int(attributes.get("http.response.body.size", 0) or attributes.get("bytes", 0))
+            if span.parent is not None:
+                self._children.setdefault(span.parent.span_id, []).append(interval)
+                return
+            del self._traces[trace_id]
+            summary = self._summary(span, duration, sinks)
+            self.summaries[summary["trace_id"]] = summary
+            while len(self.summaries) > MAX_SUMMARIES:
+                self.summaries.popitem(last=False)
+        LOG.info("%s", format_summary(summary))
+
+    def _summary(self, root: ReadableSpan, duration: float, sinks: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        top = sorted(sinks.items(), key=lambda it: it[1]["self_seconds"], reverse=True)[:self.top_n]
+        result = []
+        for name, sink in top:
+            wall = _union_seconds(sink["intervals"])
+            result.append({
+                "name": name,
+                "self_seconds": round(sink["self_seconds"], 3),
+                "wall_seconds": round(wall, 3),
+                "share": round(wall / duration, 3) if duration else 0.0,
+                "count": sink["count"],
+                "bytes": sink["bytes"],
+            })
+        return {
+            "trace_id": format(root.context.trace_id, "032x"),
+            "root": root.name,
+            "duration_seconds": round(duration, 3),
+            "top_sinks": result,
+        }
+
+
+def format_summary(summary: Dict[str, Any]) -> str:
+    lines = [f"Trace {summary['trace_id']} ({summary['root']}): {summary['duration_seconds']}s, "
+             f"top time sinks (self time, wall share):"]
+    for sink in summary["top_sinks"]:
+        line = f"  {sink['self_seconds']:>9.3f}s {sink['share']:>6.1%}  {sink['name']} x{sink['count']}"
+        if sink["bytes"]:
+            line += f", {sink['bytes']} bytes"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+_summary_processor: Optional[TimeSinkSummary] = None
+
+
+def configure_tracing(path: Optional[str] = None) -> Optional[TimeSinkSummary]:
+    """Export spans to path (default: CI_ANALYSIS_TRACE_FILE) and summarize every trace.
+
+    An SDK tracer provider already set, by adk web for instance, is reused.
+    Returns the summary processor, or None when tracing is not enabled.
+    """
+    global _summary_processor
+    path = path or os.environ.get("CI_ANALYSIS_TRACE_FILE")
+    if not path:
+        return None
+    if _summary_processor is not None:
+        return _summary_processor
+    provider = trace.get_tracer_provider()
+    is_proxy = isinstance(provider, trace.ProxyTracerProvider)
+    if is_proxy:
+        provider = TracerProvider()
+    add_span_processor = getattr(provider, "add_span_processor", None)
+    if not callable(add_span_processor):
+        LOG.warning("The tracer provider %s doesn't accept span processors, tracing not enabled", provider)
+        return None
+    _summary_processor = TimeSinkSummary()
+    add_span_processor(BatchSpanProcessor(OtlpJsonFileExporter(path)))
+    add_span_processor(_summary_processor)
+    if is_proxy:
+        trace.set_tracer_provider(provider)
+    return _summary_processor
+
+
+def trace_summaries() -> List[Dict[str, Any]]:
+    """Summaries of the last traces, oldest first."""
+    return list(_summary_processor.summaries.values()) if _summary_processor else []
+
+
+def trace_summary(root: trace.Span) -> Optional[Dict[str, Any]]:
+    """Summary of the trace of a root span that ended, None when tracing is not enabled."""
+    if _summary_processor is None:
+        return None
+    return _summary_processor.summaries.get(format(root.get_span_context().trace_id, "032x"))